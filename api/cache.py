@@ -0,0 +1,255 @@
+"""
+Response cache for the read-only GET routes.
+
+Entries hold the serialized response body and are keyed on the catalogue
+version, the route path, the normalized query string and any ``vary`` headers.
+Bumping the catalogue version after a scrape therefore invalidates the whole
+cache at once; the entries of older versions are then dropped. Every entry carries an ETag and ``If-None-Match`` gets a 304.
+
+Two backends are available through ``CACHE_BACKEND``:
+
+- ``memory``: per-worker LRU bounded by ``CACHE_MAX_BYTES``;
+- ``sqlite``: a file (``CACHE_SQLITE_PATH``) shared by every worker on the host,
+  also bounded by ``CACHE_MAX_BYTES`` with least-recently-used eviction.
+
+Usage::
+
+    @router.get("/")
+    @cached()
+    def handler(...): ...
+
+Lookups run on the event loop (or a worker thread for ``sqlite``). On a miss a
+plain ``def`` handler, which is what the database-bound routes are, runs and is
+encoded to JSON in the threadpool; an ``async def`` one runs on the loop.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from api.config import settings
+from api.services.catalogue_service import catalogue_version
+
+# Headers set by handlers (e.g. pagination cursors) that are replayed on hits
+REPLAYED_HEADERS = ("x-next-cursor", "link", "content-disposition")
+
+
+@dataclass
+class CacheEntry:
+    etag: str
+    body: bytes
+    media_type: str
+    headers: dict
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + 256
+
+
+class MemoryCacheBackend:
+    blocking = False
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def drop_older_than(self, version: int) -> None:
+        # per-worker: nothing of the new version can be cached yet
+        self.clear()
+
+
+class SQLiteCacheBackend:
+    """Cache stored in a SQLite file so every uvicorn worker on the host shares hits."""
+
+    blocking = True
+
+    def __init__(self, path: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY, etag TEXT, media_type TEXT, headers TEXT,"
+            " body BLOB, size INTEGER, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_accessed ON response_cache (accessed)")
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, body, media_type, headers FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE response_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+        etag, body, media_type, headers = row
+        return CacheEntry(etag, body, media_type, json.loads(headers))
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, entry.etag, entry.media_type, json.dumps(entry.headers),
+                 entry.body, entry.size, time.time()),
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(total - self.max_bytes)
+
+    def _evict(self, excess: int) -> None:
+        freed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM response_cache ORDER BY accessed").fetchall():
+            if freed >= excess:
+                break
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            freed += size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+
+    def drop_older_than(self, version: int) -> None:
+        # shared by every worker: keep what the ones already on this version (or a
+        # later one) have written, instead of emptying the file once per worker
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM response_cache"
+                " WHERE CAST(substr(key, 2, instr(key, ':') - 2) AS INTEGER) < ?",
+                (version,),
+            )
+
+
+def make_backend():
+    if settings.CACHE_BACKEND == "sqlite":
+        return SQLiteCacheBackend(settings.CACHE_SQLITE_PATH, settings.CACHE_MAX_BYTES)
+    return MemoryCacheBackend(settings.CACHE_MAX_BYTES)
+
+
+def render(result) -> Response:
+    if isinstance(result, Response):
+        return result
+    return JSONResponse(jsonable_encoder(result))
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, request: Request, version: int, vary: tuple[str, ...]) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        varied = "|".join(request.headers.get(h, "") for h in vary)
+        return f"v{version}:{request.url.path}?{query}|{varied}"
+
+    async def _call(self, method, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    def cached(self, vary: tuple[str, ...] = ()):
+        """
+        Decorator for GET handlers. Runs after the route's dependencies (so auth is
+        still enforced) and returns the cached body on a hit. A ``Response``
+        returned by the handler (e.g. a binary encoding) is cached with its media
+        type; streaming responses and statuses other than 200 are never cached.
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+            wants_request = "request" in signature.parameters
+            wants_response = "response" in signature.parameters
+            parameters = list(signature.parameters.values())
+            if not wants_request:
+                parameters.append(inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+            if not wants_response:
+                parameters.append(inspect.Parameter("response", inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request: Request = kwargs["request"] if wants_request else kwargs.pop("request")
+                response: Response = kwargs["response"] if wants_response else kwargs.pop("response")
+
+                version = catalogue_version.peek()
+                if version is None:
+                    # a query, at most once per TTL: off the loop like the handler
+                    version = await run_in_threadpool(catalogue_version.get)
+                key = self.key(request, version, vary)
+                entry = await self._call(self.backend.get, key)
+                if entry is None:
+                    self.misses += 1
+                    if inspect.iscoroutinefunction(func):
+                        result = render(await func(*args, **kwargs))
+                    else:
+                        # encoding a large list is as slow as the query: keep both off the loop
+                        result = await run_in_threadpool(lambda: render(func(*args, **kwargs)))
+                    if isinstance(result, StreamingResponse) or result.status_code != 200:
+                        # only 200s are replayed: other statuses go out once, as returned
+                        return result
+                    headers = {**response.headers, **result.headers}
+                    entry = CacheEntry(
+                        etag=f'"{hashlib.blake2b(result.body, digest_size=12).hexdigest()}"',
+                        body=result.body,
+                        media_type=result.media_type,
+                        headers={k: v for k, v in headers.items() if k in REPLAYED_HEADERS},
+                    )
+                    await self._call(self.backend.set, key, entry)
+                else:
+                    self.hits += 1
+
+                headers = {**entry.headers, "ETag": entry.etag}
+                if request.headers.get("if-none-match") == entry.etag:
+                    return Response(status_code=304, headers=headers)
+                return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+            wrapper.__signature__ = signature.replace(parameters=parameters)
+            return wrapper
+
+        return decorator
+
+
+response_cache = ResponseCache(make_backend())
+catalogue_version.on_change(lambda version: response_cache.backend.drop_older_than(version))
+cached = response_cache.cached
@@ -6,6 +6,74 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Route handlers that query the database are plain ``def`` and run in anyio's
+    # worker threads; this caps how many run at once (anyio's default is 40)
+    THREADPOOL_SIZE: int = 40
+
+    # Read replicas (comma-separated URLs) for the read-only routes, the stats and the
+    # ML loaders; writes always go to DATABASE_URL. A replica is skipped while it
+    # replays more than REPLICA_MAX_LAG_SECONDS behind (Postgres) or has not caught
+    # up with the catalogue version this worker has seen on the primary.
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_CHECK_SECONDS: float = 1.0  # how often each worker re-checks its replicas
+
+    # Database connection pool, per engine and worker process
+    DB_POOL_SIZE: int = 10  # connections kept open
+    DB_MAX_OVERFLOW: int = 20  # extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # wait for a free connection before failing
+    # Postgres only
+    DB_POOL_PRE_PING: bool = True  # test each connection on checkout (survives server restarts)
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # reopen older connections, before proxies/LBs drop them
+    DATABASE_SSLMODE: str | None = "require"  # libpq sslmode unless the URL sets one; empty = libpq default
+    # SQLite only, set on every connection: WAL lets the API read while a scrape writes
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # with WAL: never corrupts, a power loss may undo the last commits
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # bytes of the file read through mmap
+    SQLITE_CACHE_SIZE: int = -16384  # page cache per connection; negative = KiB
+    SQLITE_BUSY_TIMEOUT_SECONDS: float = 5.0  # wait for a writer's lock before "database is locked"
+
+    # Scraping
+    SCRAPE_BASE_URL: str = "https://books.toscrape.com/"
+    SCRAPE_MAX_CONNECTIONS: int = 20
+    SCRAPE_PER_HOST_LIMIT: int = 10
+    SCRAPE_QUEUE_SIZE: int = 100
+    # Pipeline stages: fetch tasks -> parser processes -> a single DB writer
+    SCRAPE_FETCH_WORKERS: int = 20
+    SCRAPE_PARSE_WORKERS: int | None = None  # processes; None = one per spare core, 0 = a thread
+    SCRAPE_INGEST_CHUNK_SIZE: int = 200
+    SCRAPE_WRITE_QUEUE_SIZE: int = 2  # chunks waiting for the writer
+    # Conditional requests + early pagination stop on the hourly run; a full crawl
+    # still runs once a day to pick up books past the first known listing page
+    SCRAPE_INCREMENTAL: bool = True
+    SCRAPE_PARSER: str = "lxml"  # "lxml" or "bs4", see scripts/parsers.py
+    SCRAPE_RUN_MAX_FAILURES: int = 100  # failed pages listed on each scrape_run row
+
+    # Response cache
+    CACHE_BACKEND: str = "memory"  # "memory" (per worker) or "sqlite" (shared by workers)
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_SQLITE_PATH: str = "data/response_cache.db"
+    CATALOGUE_VERSION_TTL_SECONDS: float = 2.0
+
+    # ML models
+    MODEL_DIR: str = "/tmp/models"
+    MODEL_KEEP_VERSIONS: int = 5  # versions kept on disk for pinning/rollback
+    PREDICTION_BATCH_MAX_ROWS: int = 4096  # micro-batch size that triggers an immediate predict_proba
+    PREDICTION_BATCH_WAIT_MS: float = 2.0  # how long concurrent requests are collected; 0 disables batching
+    TRAINING_WORKERS: int = 1  # processes running training jobs
+    TRAINING_CV_JOBS: int = -1  # parallel cross-validation folds per job (-1 = all cores)
+    TRAINING_JOB_TIMEOUT_SECONDS: int = 3600  # a job silent for longer is considered dead
+    SCORING_CHUNK_SIZE: int = 5000  # rows per predict_proba call when storing the catalogue predictions
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000  # records waiting for the writer thread; more are dropped
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0  # share of requests logged (5xx always are)
+
+    # Request metrics
+    METRICS_DIR: str | None = None  # per-worker metric files; None = /dev/shm/book-api-metrics
+    METRICS_FLUSH_SECONDS: float = 1.0  # how often each worker publishes its metrics to the others
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8"
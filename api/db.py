@@ -1,34 +1,193 @@
+import itertools
 import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
 
+from sqlalchemy import Engine, event, select, text
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 from sqlmodel import SQLModel, create_engine, Session
 
+from api.config import settings
+from api.metrics import pool_metrics
+from api.migrations import run_migrations
+from api.models.catalogue_state import CatalogueState
+
 os.makedirs("data", exist_ok=True)
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/bookapi.db")
 
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def normalize_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
 
 
-if DATABASE_URL.startswith("sqlite"):
-    os.makedirs("data", exist_ok=True)
-    engine = create_engine(
-        DATABASE_URL,
-        echo=False,
-        connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(
-        DATABASE_URL,
+DATABASE_URL = normalize_url(os.getenv("DATABASE_URL", "sqlite:///./data/bookapi.db"))
+REPLICA_URLS = [normalize_url(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+
+class InstrumentedQueuePool(QueuePool):
+    """``QueuePool`` that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record("checkout", self.logging_name, 503, time.perf_counter() - start)
+            raise
+        pool_metrics.record("checkout", self.logging_name, 200, time.perf_counter() - start)
+        return connection
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}")
+    cursor.close()
+
+
+def create_db_engine(url: str, name: str = "primary"):
+    """Engine for ``url`` with the SQLite or Postgres profile from the settings."""
+    pool_options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_logging_name": name,  # labels the pool metrics
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+    if url.startswith("sqlite"):
+        os.makedirs("data", exist_ok=True)
+        engine = create_engine(
+            url,
+            echo=False,
+            connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_SECONDS},
+            **pool_options,
+        )
+        event.listen(engine, "connect", set_sqlite_pragmas)
+        return engine
+
+    connect_args = {}
+    if settings.DATABASE_SSLMODE and "sslmode=" not in url:
+        connect_args["sslmode"] = settings.DATABASE_SSLMODE
+    return create_engine(
+        url,
         echo=False,
-        connect_args={"sslmode": "require"}
+        connect_args=connect_args,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        **pool_options,
     )
 
+
+# Seconds the replica's replay is behind the primary; 0 when it has replayed all it received
+POSTGRES_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+@dataclass
+class Replica:
+    engine: Engine
+    version: int = -1  # catalogue version at the last check; -1 = never checked or unreachable
+    lag_seconds: float = 0.0
+    reachable: bool = True
+
+    def fresh(self, version: int, max_lag_seconds: float) -> bool:
+        return self.version >= version and self.lag_seconds <= max_lag_seconds
+
+
+class ReadReplicas:
+    """
+    Picks the engine of read-only sessions: the replicas in turn, skipping those
+    that lag behind, or the primary when none is fresh enough.
+
+    A replica must have replayed the catalogue version this worker has seen on the
+    primary (``version_source``), since responses and feature matrices are cached
+    under that version, and be at most ``max_lag_seconds`` behind. Replicas are
+    checked every ``check_seconds`` by whichever request thread gets there first;
+    the others use the previous results meanwhile.
+    """
+
+    def __init__(self, primary: Engine, replicas: list[Engine], max_lag_seconds: float, check_seconds: float):
+        self.primary = primary
+        self.replicas = [Replica(replica) for replica in replicas]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.version_source: Callable[[], int] | None = None
+        self._turn = itertools.count()
+        self._checked_at = 0.0
+        self._check_lock = threading.Lock()
+
+    def engine(self) -> Engine:
+        if not self.replicas:
+            return self.primary
+        self._check_if_due()
+        version = self.version_source() if self.version_source else 0
+        fresh = [replica for replica in self.replicas if replica.fresh(version, self.max_lag_seconds)]
+        if not fresh:
+            return self.primary
+        return fresh[next(self._turn) % len(fresh)].engine
+
+    def _check_if_due(self) -> None:
+        if time.monotonic() - self._checked_at < self.check_seconds:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            for replica in self.replicas:
+                self._check(replica)
+            self._checked_at = time.monotonic()
+        finally:
+            self._check_lock.release()
+
+    def _check(self, replica: Replica) -> None:
+        name = replica.engine.pool.logging_name
+        try:
+            with replica.engine.connect() as connection:
+                version = connection.execute(
+                    select(CatalogueState.version).where(CatalogueState.id == 1)
+                ).scalar()
+                lag = 0.0
+                if replica.engine.dialect.name == "postgresql":
+                    lag = float(connection.execute(POSTGRES_LAG_SQL).scalar())
+        except SQLAlchemyError as e:
+            if replica.reachable:
+                print(f"⚠️ Réplica {name} indisponível: {e}")
+            replica.version, replica.reachable = -1, False
+            return
+        replica.version, replica.lag_seconds, replica.reachable = version or 0, lag, True
+
+
+engine = create_db_engine(DATABASE_URL)
+read_replicas = ReadReplicas(
+    engine,
+    [create_db_engine(url, name=f"replica-{number}") for number, url in enumerate(REPLICA_URLS, 1)],
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_seconds=settings.REPLICA_CHECK_SECONDS,
+)
+
 def init_db():
     """Create all tables. Call this at app startup."""
     SQLModel.metadata.create_all(engine)
 
+    # create_all skips tables that already exist; indexes and other changes to
+    # existing tables are applied as migrations.
+    run_migrations(engine)
+
 def get_session():
     """FastAPI dependency to get a DB session."""
     with Session(engine) as session:
         yield session
+
+def get_read_session():
+    """FastAPI dependency to get a read-only DB session, on a read replica when one is fresh enough."""
+    with Session(read_replicas.engine()) as session:
+        yield session
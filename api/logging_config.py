@@ -1,21 +1,85 @@
+import atexit
 import logging
+import queue
 import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
 import structlog
 
-def setup_logging():
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=logging.INFO,
-    )
+from api.config import settings
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread as they are: rendering (JSON) and the
+    write happen there, and a full queue drops the record instead of blocking.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the queue never leaves the process, so the record needs no pickling-safe copy
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def add_record_timestamp(logger, method_name, event_dict):
+    # the time the event was logged, not the time the listener got to it
+    record = event_dict.get("_record")
+    created = record.created if record is not None else datetime.now(timezone.utc).timestamp()
+    event_dict["timestamp"] = datetime.fromtimestamp(created, timezone.utc).isoformat()
+    return event_dict
+
+
+_listener: QueueListener | None = None
+
+
+def setup_logging() -> QueueListener:
+    """
+    Route structlog and stdlib logging through a queue to a background thread that
+    renders JSON lines to stdout. Idempotent; returns the listener.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
 
     structlog.configure(
         processors=[
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.JSONRenderer()
+            structlog.stdlib.filter_by_level,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(structlog.stdlib.ProcessorFormatter(
+        processors=[
+            add_record_timestamp,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            structlog.processors.JSONRenderer(),
+        ],
+    ))
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    root.handlers[:] = [NonBlockingQueueHandler(log_queue)]
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # flush what is still queued on exit
+    atexit.register(_listener.stop)
+    return _listener
@@ -1,22 +1,27 @@
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
-import time
 
+from anyio import to_thread
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-import structlog
 
 from api.config import settings
 from api.db import init_db, engine
-from api.metrics_store import metrics_lock, metrics
+from api.logging_config import setup_logging
+from api.metrics import pool_metrics, prometheus_text, request_metrics
+from api.middleware import ObservabilityMiddleware
 from api.routers import books, auth, categories, scraping, stats, ml
+from api.services.stats_service import stats_store
+from api.services.training_service import training_jobs
 from api.services.user_service import UserService
 from api.tasks import perform_scrape, perform_initial_scrape
 
+setup_logging()
+
 scheduler = AsyncIOScheduler(timezone="UTC")
-logger = structlog.get_logger()
 
 def setup_database():
     print("Setting Up Database...")
@@ -36,6 +41,9 @@ def setup_database():
             user_service.create_user(username="admin", password=default_password, is_admin=True)
             print("Admin user created with username='admin' and password=", default_password)
 
+    # 3) load (or build) the stats snapshot before the scheduler starts writing
+    stats_store.current()
+
 def setup_scheduler():
     print("Setting Up Scheduler...")
     scheduler.add_job(
@@ -56,14 +64,28 @@ def setup_scheduler():
         misfire_grace_time=600,
         next_run_time=datetime.now(timezone.utc) + timedelta(minutes=5),
     )
+
+    # the hourly job is incremental; a full crawl catches anything it stopped short of
+    scheduler.add_job(
+        perform_scrape,
+        trigger=CronTrigger(hour=3, minute=30),
+        kwargs={"incremental": False},
+        id="full_scrape_job",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
     scheduler.start()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
     print("Starting up...")
+    # sync handlers, sync dependencies and run_in_threadpool all share this limiter
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
     setup_database()
     setup_scheduler()
+    request_metrics.start()
+    pool_metrics.start()
     print("Setup Completed!")
 
     try:
@@ -72,6 +94,9 @@ async def lifespan(app: FastAPI):
         print("Shutting down...")
         scheduler.shutdown(wait=False)
         print("Scheduler stopped.")
+        training_jobs.shutdown()
+        request_metrics.stop()
+        pool_metrics.stop()
 
 app = FastAPI(
     title="Book Scraper API",
@@ -89,6 +114,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# outermost, so the timing covers the whole stack
+app.add_middleware(
+    ObservabilityMiddleware,
+    metrics=request_metrics,
+    sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+)
+
 app.include_router(books.router, prefix="/api/v1/books", tags=["Books"])
 app.include_router(categories.router, prefix="/api/v1/categories", tags=["Categories"])
 app.include_router(scraping.router, prefix="/api/v1/scraping", tags=["Scraping"])
@@ -96,39 +128,18 @@ app.include_router(stats.router, prefix="/api/v1/stats", tags=["Stats"])
 app.include_router(auth.router)
 app.include_router(ml.router, prefix="/api/v1/ml", tags=["ML"])
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-
-    response = await call_next(request)
-
-    duration = time.time() - start_time
-    logger.info(
-        "api_call",
-        method=request.method,
-        path=request.url.path,
-        status_code=response.status_code,
-        duration_ms=round(duration * 1000, 2)
-    )
-
-    return response
-
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    duration = time.time() - start_time
-
-    with metrics_lock:
-        metrics["total_requests"] += 1
-        metrics["total_time"] += duration
-        path = request.url.path
-        metrics["per_path"][path]["count"] += 1
-        metrics["per_path"][path]["total_time"] += duration
-
-    return response
-
 # --- Healthcheck ---
 @app.get("/api/v1/health", tags=["Health"], status_code=200)
 async def health():
     return {"status": "ok"}
+
+# --- Prometheus ---
+@app.get("/api/v1/metrics", tags=["Stats"], response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Métricas de requisições no formato texto do Prometheus, somadas entre todos os workers:
+    `http_requests_total`, `http_request_errors_total` e o histograma
+    `http_request_duration_seconds`, por método e rota, além de
+    `db_pool_checkout_wait_seconds` e `db_pool_checkout_timeouts_total` por pool do banco.
+    """
+    return PlainTextResponse(prometheus_text(), media_type="text/plain; version=0.0.4")
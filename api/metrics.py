@@ -0,0 +1,379 @@
+"""
+Request metrics: counts, status classes and latency histograms per route.
+
+Series are keyed on ``(method, route template)`` (``/api/v1/books/{book_id}``,
+not the raw path) so their number is bounded by the routes of the app. Each
+thread records into its own shard, which only that thread writes, so recording
+takes no lock; readers merge the shards. When a thread exits (the threadpool
+retires idle workers) its shard is folded into a retired total, so the shards
+are bounded by the live threads.
+
+Latencies go in fixed log-spaced buckets (four per doubling, 0.1 ms to ~105 s),
+which bounds the error of the p50/p95/p99 estimates to the width of one bucket
+(~19%) and makes histograms of different threads and processes mergeable by
+adding them up.
+
+With several uvicorn workers every process writes its merged shards to
+``METRICS_DIR/<pid>.json`` (on ``/dev/shm`` by default, so in memory) every
+``METRICS_FLUSH_SECONDS``. Reading the metrics adds up the live series of the
+current process and the files of the other live workers; files of dead
+processes are removed.
+
+``pool_metrics`` reuses the same machinery for the database connection pools
+(``api.db.InstrumentedQueuePool``): one series per pool, keyed
+``("checkout", pool name)``, whose latencies are the waits for a connection and
+whose errors are the checkouts that timed out.
+"""
+import bisect
+import json
+import os
+import tempfile
+import threading
+import weakref
+from dataclasses import dataclass, field
+
+from api.config import settings
+
+# Upper bounds of the latency buckets, in seconds; the last bucket is +Inf
+BUCKET_BOUNDS = [0.0001 * 2 ** (i / 4) for i in range(81)]
+# Exposed to Prometheus: one bound per doubling
+PROMETHEUS_BOUNDS = range(0, len(BUCKET_BOUNDS), 4)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+@dataclass(slots=True)
+class Series:
+    count: int = 0
+    total_time: float = 0.0
+    errors: int = 0  # 5xx responses and unhandled exceptions
+    statuses: list[int] = field(default_factory=lambda: [0] * 5)  # 1xx .. 5xx
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(BUCKET_BOUNDS) + 1))
+
+    def record(self, status_code: int, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        status_class = min(max(status_code // 100, 1), 5)
+        self.statuses[status_class - 1] += 1
+        if status_class == 5:
+            self.errors += 1
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, duration)] += 1
+
+    def merge(self, other: "Series") -> None:
+        self.count += other.count
+        self.total_time += other.total_time
+        self.errors += other.errors
+        self.statuses = [a + b for a, b in zip(self.statuses, other.statuses)]
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def copy(self) -> "Series":
+        return Series(self.count, self.total_time, self.errors, list(self.statuses), list(self.buckets))
+
+    def quantile(self, q: float) -> float:
+        """Estimated ``q`` quantile in seconds, interpolated inside its bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, in_bucket in enumerate(self.buckets):
+            if in_bucket and seen + in_bucket >= rank:
+                lower = BUCKET_BOUNDS[index - 1] if index > 0 else 0.0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else lower
+                return lower + (upper - lower) * (rank - seen) / in_bucket
+            seen += in_bucket
+        return BUCKET_BOUNDS[-1]
+
+    def to_json(self) -> list:
+        return [self.count, self.total_time, self.errors, self.statuses, self.buckets]
+
+    @classmethod
+    def from_json(cls, data: list) -> "Series":
+        return cls(*data)
+
+
+def _merge_into(merged: dict[tuple[str, str], Series], series: dict[tuple[str, str], Series]) -> None:
+    # list() copies the items in one step, safe against the owner inserting
+    for key, value in list(series.items()):
+        # copied before merging: the owner thread may be updating it
+        value = value.copy()
+        if key in merged:
+            merged[key].merge(value)
+        else:
+            merged[key] = value
+
+
+class _ShardOwner:
+    """Held only by a thread's local storage: it is freed when the thread exits."""
+
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self):
+        self.shard: dict[tuple[str, str], Series] = {}
+
+
+class RequestMetrics:
+    def __init__(self, directory: str, flush_seconds: float):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._local = threading.local()
+        self._shards: dict[int, dict[tuple[str, str], Series]] = {}
+        self._retired: dict[tuple[str, str], Series] = {}  # shards of threads that exited
+        # only taken when a thread creates or retires its shard, and by readers
+        self._shards_lock = threading.Lock()
+        self._flusher: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    # --- recording ---------------------------------------------------------
+
+    def _shard(self) -> dict[tuple[str, str], Series]:
+        owner = getattr(self._local, "owner", None)
+        if owner is None:
+            owner = self._local.owner = _ShardOwner()
+            with self._shards_lock:
+                self._shards[id(owner)] = owner.shard
+            weakref.finalize(owner, self._retire, id(owner)).atexit = False
+        return owner.shard
+
+    def _retire(self, shard_id: int) -> None:
+        # the owner thread is gone, so nothing writes this shard any more
+        with self._shards_lock:
+            shard = self._shards.pop(shard_id)
+            _merge_into(self._retired, shard)
+
+    def record(self, method: str, route: str, status_code: int, duration: float) -> None:
+        shard = self._shard()
+        series = shard.get((method, route))
+        if series is None:
+            series = shard[(method, route)] = Series()
+        series.record(status_code, duration)
+
+    # --- reading -----------------------------------------------------------
+
+    def local_series(self) -> dict[tuple[str, str], Series]:
+        """Series of this process, all shards merged."""
+        merged: dict[tuple[str, str], Series] = {}
+        with self._shards_lock:
+            shards = list(self._shards.values())
+            _merge_into(merged, self._retired)
+        for shard in shards:
+            _merge_into(merged, shard)
+        return merged
+
+    def collect(self) -> tuple[dict[tuple[str, str], Series], int]:
+        """Series of all live worker processes merged, and the number of processes."""
+        merged = self.local_series()
+        processes = 1
+        for pid, series in self._read_other_processes():
+            processes += 1
+            for key, value in series.items():
+                if key in merged:
+                    merged[key].merge(value)
+                else:
+                    merged[key] = value
+        return merged, processes
+
+    # --- multi-process -----------------------------------------------------
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def flush(self) -> None:
+        """Write this process's series for the other workers to read."""
+        os.makedirs(self.directory, exist_ok=True)
+        data = {"|".join(key): series.to_json() for key, series in self.local_series().items()}
+        path = self._path(os.getpid())
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f)
+        os.replace(temporary, path)
+
+    def _read_other_processes(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            pid_text, _, extension = name.partition(".")
+            if extension != "json" or not pid_text.isdigit() or int(pid_text) == os.getpid():
+                continue
+            path = os.path.join(self.directory, name)
+            if not _is_alive(int(pid_text)):
+                _remove(path)
+                continue
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield int(pid_text), {
+                tuple(key.split("|", 1)): Series.from_json(value) for key, value in data.items()
+            }
+
+    def start(self) -> None:
+        """Start flushing this process's series every ``flush_seconds``."""
+        if self._flusher is not None:
+            return
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def stop(self) -> None:
+        if self._flusher is None:
+            return
+        self._stop.set()
+        self._flusher.join()
+        self._flusher = None
+        _remove(self._path(os.getpid()))
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"⚠️ Falha ao gravar métricas em {self.directory}: {e}")
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def default_directory() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "book-api-metrics")
+
+
+request_metrics = RequestMetrics(settings.METRICS_DIR or default_directory(), settings.METRICS_FLUSH_SECONDS)
+# a subdirectory: its name has no ".json", so request_metrics skips it
+pool_metrics = RequestMetrics(os.path.join(request_metrics.directory, "db-pool"), settings.METRICS_FLUSH_SECONDS)
+
+
+# --- rendering -------------------------------------------------------------
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def _summary(series: Series) -> dict:
+    return {
+        "count": series.count,
+        "errors": series.errors,
+        "average_time_ms": _ms(series.total_time / series.count) if series.count else 0.0,
+        "p50_ms": _ms(series.quantile(0.50)),
+        "p95_ms": _ms(series.quantile(0.95)),
+        "p99_ms": _ms(series.quantile(0.99)),
+    }
+
+
+def pool_report() -> dict:
+    """Connection checkouts, timeouts and waits per database pool, all workers merged."""
+    series, _ = pool_metrics.collect()
+    report = {}
+    for (_, pool), value in sorted(series.items()):
+        summary = _summary(value)
+        report[pool] = {
+            "checkouts": value.count,
+            "timeouts": value.errors,
+            "average_wait_ms": summary["average_time_ms"],
+            "p50_wait_ms": summary["p50_ms"],
+            "p95_wait_ms": summary["p95_ms"],
+            "p99_wait_ms": summary["p99_ms"],
+        }
+    return report
+
+
+def performance_report() -> dict:
+    """Totals and per-route summaries for ``/stats/performance``."""
+    series, processes = request_metrics.collect()
+    total = Series()
+    for value in series.values():
+        total.merge(value)
+    overall = _summary(total)
+    return {
+        "total_requests": total.count,
+        "average_response_time_ms": overall["average_time_ms"],
+        "p50_ms": overall["p50_ms"],
+        "p95_ms": overall["p95_ms"],
+        "p99_ms": overall["p99_ms"],
+        "errors": total.errors,
+        "workers": processes,
+        "per_path": {
+            f"{method} {route}": _summary(value)
+            for (method, route), value in sorted(series.items(), key=lambda item: item[0][::-1])
+        },
+        "db_pool": pool_report(),
+    }
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    """All series in the Prometheus text exposition format (version 0.0.4)."""
+    series, _ = request_metrics.collect()
+    lines = [
+        "# HELP http_requests_total Requests handled, by status class.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route), value in sorted(series.items()):
+        labels = f'method="{method}",route="{_label(route)}"'
+        for index, count in enumerate(value.statuses):
+            if count:
+                lines.append(f'http_requests_total{{{labels},status="{index + 1}xx"}} {count}')
+
+    lines += [
+        "# HELP http_request_errors_total Requests that ended in a 5xx or an unhandled exception.",
+        "# TYPE http_request_errors_total counter",
+    ]
+    for (method, route), value in sorted(series.items()):
+        lines.append(f'http_request_errors_total{{method="{method}",route="{_label(route)}"}} {value.errors}')
+
+    lines += [
+        "# HELP http_request_duration_seconds Request latency.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), value in sorted(series.items()):
+        lines += _histogram("http_request_duration_seconds", f'method="{method}",route="{_label(route)}"', value)
+
+    pools, _ = pool_metrics.collect()
+    lines += [
+        "# HELP db_pool_checkout_timeouts_total Connection checkouts that timed out waiting for a free connection.",
+        "# TYPE db_pool_checkout_timeouts_total counter",
+    ]
+    for (_, pool), value in sorted(pools.items()):
+        lines.append(f'db_pool_checkout_timeouts_total{{pool="{_label(pool)}"}} {value.errors}')
+    lines += [
+        "# HELP db_pool_checkout_wait_seconds Time waited for a database connection.",
+        "# TYPE db_pool_checkout_wait_seconds histogram",
+    ]
+    for (_, pool), value in sorted(pools.items()):
+        lines += _histogram("db_pool_checkout_wait_seconds", f'pool="{_label(pool)}"', value)
+    return "\n".join(lines) + "\n"
+
+
+def _histogram(name: str, labels: str, value: Series) -> list[str]:
+    lines = []
+    cumulative = 0
+    seen = 0
+    for index in PROMETHEUS_BOUNDS:
+        # the exposed bounds are a subset of ours, so these counts are exact
+        cumulative += sum(value.buckets[seen:index + 1])
+        seen = index + 1
+        lines.append(f'{name}_bucket{{{labels},le="{BUCKET_BOUNDS[index]:.6g}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {value.count}')
+    lines.append(f"{name}_sum{{{labels}}} {value.total_time}")
+    lines.append(f"{name}_count{{{labels}}} {value.count}")
+    return lines
@@ -0,0 +1,60 @@
+"""
+Request instrumentation as a single pure ASGI middleware.
+
+One timing (``perf_counter_ns``) per request feeds both the request metrics
+(``api.metrics``) and the access log. Unlike ``@app.middleware("http")`` there is
+no ``BaseHTTPMiddleware`` layer: the response is not wrapped in a stream and
+the request runs in the caller's task.
+
+Access log lines are only created for sampled requests (``ACCESS_LOG_SAMPLE_RATE``;
+5xx responses are always logged) and are rendered and written by the logging
+listener thread, see ``api.logging_config``.
+"""
+import random
+import time
+
+import structlog
+
+from api.metrics import UNMATCHED_ROUTE, RequestMetrics
+
+
+class ObservabilityMiddleware:
+    def __init__(self, app, metrics: RequestMetrics, sample_rate: float = 1.0):
+        self.app = app
+        self.metrics = metrics
+        self.sample_rate = sample_rate
+        self.logger = structlog.get_logger("api.access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ns = time.perf_counter_ns() - start
+            # the router leaves the matched route in the scope: key on its template
+            route = scope.get("route")
+            route_path = route.path if route is not None else UNMATCHED_ROUTE
+            self.metrics.record(scope["method"], route_path, status_code, duration_ns / 1e9)
+
+            if status_code >= 500 or random.random() < self.sample_rate:
+                self.logger.info(
+                    "api_call",
+                    method=scope["method"],
+                    path=scope["path"],
+                    route=route_path,
+                    status_code=status_code,
+                    duration_ms=round(duration_ns / 1e6, 2),
+                    sample_rate=self.sample_rate,
+                )
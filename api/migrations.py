@@ -0,0 +1,171 @@
+"""
+Versioned schema migrations.
+
+``SQLModel.metadata.create_all`` only creates missing tables, so anything that
+changes an existing table (indexes, columns, triggers) is a migration here.
+Applied versions are recorded in the ``schema_version`` table and every
+migration must be safe to run on a database freshly built by ``create_all``.
+
+Apply pending migrations (``init_db`` does this at startup)::
+
+    python -m api.migrations
+
+Print the query plan of every BookService query and fail on full table scans::
+
+    python -m api.migrations --explain
+"""
+import argparse
+import re
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import Connection, Engine, event, inspect, text
+from sqlmodel import Session, select
+
+from api.models.book import Book
+from api.models.schema_version import SchemaVersion
+from api.services.search_service import SQLITE_FTS_DDL, POSTGRES_FTS_DDL
+
+
+def create_table_indexes(conn: Connection, table) -> None:
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def book_indexes(conn: Connection) -> None:
+    # Older databases may hold duplicated detail pages, which would make the
+    # unique index fail. Keep the oldest row of each.
+    conn.execute(text(
+        "DELETE FROM book WHERE id NOT IN "
+        "(SELECT MIN(id) FROM book GROUP BY detail_page)"
+    ))
+    create_table_indexes(conn, Book.__table__)
+
+
+def book_full_text_search(conn: Connection) -> None:
+    ddl = {"sqlite": SQLITE_FTS_DDL, "postgresql": POSTGRES_FTS_DDL}.get(conn.dialect.name, [])
+    for statement in ddl:
+        conn.exec_driver_sql(statement)
+
+
+def book_predictions(conn: Connection) -> None:
+    # create_all already added the columns on a fresh database
+    existing = {column["name"] for column in inspect(conn).get_columns("book")}
+    for column in Book.__table__.columns:
+        if column.name not in existing:
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE book ADD COLUMN {column.name} {column_type}")
+    book = Book.__table__
+    conn.execute(book.update().where(book.c.updated_at.is_(None)).values(updated_at=datetime.now(timezone.utc)))
+    create_table_indexes(conn, Book.__table__)
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "book indexes: unique detail_page, price, rating, category, (rating, id), (category, price)",
+     book_indexes),
+    (2, "book full-text search: FTS5 table on SQLite, tsvector + GIN index on Postgres",
+     book_full_text_search),
+    (3, "book predictions: updated_at, prediction, probability, model_version, scored_at, "
+        "(prediction, probability, id) index",
+     book_predictions),
+]
+
+
+def run_migrations(engine: Engine) -> list[int]:
+    """Apply pending migrations in order, each in its own transaction. Returns the applied versions."""
+    SchemaVersion.__table__.create(engine, checkfirst=True)
+    with Session(engine) as session:
+        applied = set(session.exec(select(SchemaVersion.version)).all())
+
+    done = []
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                SchemaVersion.__table__.insert(),
+                {"version": version, "description": description,
+                 "applied_at": datetime.now(timezone.utc)},
+            )
+        print(f"Migration {version} applied: {description}")
+        done.append(version)
+    return done
+
+
+def explain(conn: Connection, statement: str, parameters) -> list[str]:
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        return [row[-1] for row in rows]
+    return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()]
+
+
+def is_full_scan(plan_line: str) -> bool:
+    # SQLite: "SCAN book" (vs "SCAN book USING [COVERING] INDEX ..." or "SEARCH ...")
+    # Postgres: "Seq Scan on book"
+    return bool(re.match(r"^SCAN \w+$", plan_line.strip())) or "Seq Scan on book" in plan_line
+
+
+def explain_book_queries(engine: Engine) -> dict[str, list[str]]:
+    """Run the indexed BookService queries and return the plan of every statement they execute."""
+    from api.services.book_service import BookService
+
+    queries = {
+        "get_by_detail_page": lambda s: s.get_by_detail_page("https://books.toscrape.com/"),
+        "get_top_books": lambda s: s.get_top_books(),
+        "filter_by_price_range": lambda s: s.filter_by_price_range(min_price=10, max_price=20),
+        "get_overview_stats": lambda s: s.get_overview_stats(),
+        "get_category_stats": lambda s: s.get_category_stats(),
+        "search_books": lambda s: s.search_books(title="light attic", category="poetry"),
+        "get_predicted_books": lambda s: s.get_predicted_books(label=1),
+    }
+
+    plans = {}
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # Small tables are always cheaper to seq scan; ask whether an index *can* be used.
+            conn.exec_driver_sql("SET enable_seqscan = off")
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        event.listen(conn, "before_cursor_execute", capture)
+        session = Session(bind=conn)
+        for name, query in queries.items():
+            captured.clear()
+            query(BookService(session))
+            statements = list(captured)
+            plans[name] = [line for statement, parameters in statements
+                           for line in explain(conn, statement, parameters)]
+        event.remove(conn, "before_cursor_execute", capture)
+        session.close()
+    return plans
+
+
+def main():
+    from api.db import engine, init_db
+
+    parser = argparse.ArgumentParser(description="Apply schema migrations")
+    parser.add_argument("--explain", action="store_true",
+                        help="print BookService query plans and fail on full table scans")
+    args = parser.parse_args()
+
+    init_db()
+    if not args.explain:
+        return
+
+    failures = []
+    for name, plan in explain_book_queries(engine).items():
+        print(f"{name}:")
+        for line in plan:
+            print(f"    {line}")
+            if is_full_scan(line):
+                failures.append(name)
+    if failures:
+        raise SystemExit(f"Full table scan in: {', '.join(sorted(set(failures)))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,33 @@
+from datetime import datetime, timezone
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 class Book(SQLModel, table=True):
+    __table_args__ = (
+        # get_top_books orders by rating with id as tie-breaker
+        Index("ix_book_rating_id", "rating", "id"),
+        # category stats group by category and average the price
+        Index("ix_book_category_price", "category", "price"),
+        # books by predicted class, most probable first
+        Index("ix_book_prediction_probability", "prediction", "probability", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
-    price: float
-    rating: int
+    price: float = Field(index=True)
+    rating: int = Field(index=True)
     availability: str
-    category: str
+    category: str = Field(index=True)
     image_url: str
-    detail_page: str
+    detail_page: str = Field(unique=True, index=True)
+
+    # last time the scraped fields changed, compared with scored_at to find the
+    # books the scoring pass has to re-score
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    # Stored model output, written by api.services.scoring_service
+    prediction: Optional[int] = None
+    probability: Optional[float] = None
+    model_version: Optional[int] = None
+    scored_at: Optional[datetime] = None
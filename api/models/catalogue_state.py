@@ -0,0 +1,9 @@
+from datetime import datetime, timezone
+from sqlmodel import SQLModel, Field
+
+class CatalogueState(SQLModel, table=True):
+    __tablename__ = "catalogue_state"
+
+    id: int = Field(default=1, primary_key=True)
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,15 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class PageState(SQLModel, table=True):
+    __tablename__ = "page_state"
+
+    url: str = Field(primary_key=True)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: str
+    # JSON of what was extracted from home/listing pages (categories, book links)
+    # so an unchanged page does not need to be downloaded or parsed again
+    links: Optional[str] = None
+    fetched_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,9 @@
+from datetime import datetime, timezone
+from sqlmodel import SQLModel, Field
+
+class SchemaVersion(SQLModel, table=True):
+    __tablename__ = "schema_version"
+
+    version: int = Field(primary_key=True)
+    description: str
+    applied_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
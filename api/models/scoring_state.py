@@ -0,0 +1,12 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class ScoringState(SQLModel, table=True):
+    __tablename__ = "scoring_state"
+
+    id: int = Field(default=1, primary_key=True)
+    # Fingerprint of the category dictionary the stored predictions were computed
+    # with; a new category shifts the encoding, so every book is scored again
+    categories_hash: Optional[str] = None
+    scored_at: Optional[datetime] = None
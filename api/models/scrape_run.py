@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class ScrapeRun(SQLModel, table=True):
+    __tablename__ = "scrape_run"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # "running", "succeeded" or "failed"
+    status: str = Field(default="running", index=True)
+    incremental: bool
+    started_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+
+    categories: int = 0
+    books_crawled: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    scored: int = 0
+
+    requests: int = 0
+    retries: int = 0
+    bytes_fetched: int = 0
+    pages_changed: int = 0
+    pages_skipped: int = 0
+    failures: int = 0
+
+    # JSON encoded {stage: {calls, busy_seconds, wall_seconds}}
+    stages: str = "{}"
+    # JSON encoded {HTTP status or transport error: count}
+    status_counts: str = "{}"
+    # JSON encoded [{stage, url, reason}], the first SCRAPE_RUN_MAX_FAILURES only
+    failed_pages: str = "[]"
+    error: Optional[str] = None
@@ -0,0 +1,12 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class StatsSnapshot(SQLModel, table=True):
+    __tablename__ = "stats_snapshot"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    version: int = Field(index=True, unique=True)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # JSON encoded aggregates, see api.services.stats_service
+    aggregates: str
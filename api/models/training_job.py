@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class TrainingJob(SQLModel, table=True):
+    __tablename__ = "training_job"
+
+    id: str = Field(primary_key=True)
+    test_size: float
+    seed: int
+    # "queued", "running", "cancelling", "succeeded", "failed" or "cancelled"
+    status: str = Field(default="queued", index=True)
+    phase: str = "queued"
+    # Set to the parameters key while the job is queued/running and cleared when
+    # it finishes, so the unique index collapses identical concurrent requests
+    active_key: Optional[str] = Field(default=None, unique=True)
+    # JSON encoded {phase: seconds}
+    timings: str = "{}"
+    # JSON encoded metrics of train_logistic_model
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
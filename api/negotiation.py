@@ -0,0 +1,53 @@
+"""
+Content negotiation on the ``Accept`` header.
+
+Routes that can answer in several formats (JSON by default, or a streaming or
+binary encoding) pick one with :func:`negotiate`, which honours q-values:
+``Accept: application/json;q=0.1, text/csv;q=0`` refuses CSV.
+"""
+from typing import Sequence
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def accept_ranges(accept: str) -> dict[str, float]:
+    """Map each media range of an Accept header to its q-value (the highest, if repeated)."""
+    ranges: dict[str, float] = {}
+    for part in accept.split(","):
+        media_range, *params = part.split(";")
+        media_range = media_range.strip().lower()
+        if not media_range:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges[media_range] = max(q, ranges.get(media_range, 0.0))
+    return ranges
+
+
+def negotiate(accept: str | None, media_types: Sequence[str]) -> str:
+    """
+    Pick the media type of ``media_types`` the Accept header prefers.
+
+    Each type takes the q-value of its most specific matching range (``text/csv``,
+    then ``text/*``, then ``*/*``); types with q=0 are refused. The first type is
+    the default: it wins ties and is returned when the header accepts none.
+    """
+    default = media_types[0]
+    if not accept:
+        return default
+    ranges = accept_ranges(accept)
+
+    def quality(media_type: str) -> float:
+        for media_range in (media_type, media_type.split("/")[0] + "/*", "*/*"):
+            if media_range in ranges:
+                return ranges[media_range]
+        return 0.0
+
+    best = max(media_types, key=quality)
+    return best if quality(best) > 0 else default
@@ -0,0 +1,48 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor encodes the sort key of the last row of a page, e.g. ``(rating, id)``.
+The next page continues strictly after that key, so it costs the same as the
+first page and is not shifted by rows inserted in between.
+"""
+import base64
+import json
+from typing import Any, Sequence
+
+from fastapi import HTTPException, Request, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None, length: int = 2) -> tuple | None:
+    """Decode a cursor into its key tuple; 400 if it was not produced by ``encode_cursor``."""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        key = None
+    if (not isinstance(key, list) or len(key) != length
+            or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in key)):
+        # every sort key is numeric: anything else would 500 or compare as text
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(key)
+
+
+def set_next_cursor(request: Request, response: Response, rows: Sequence, size: int, key) -> None:
+    """
+    Expose the cursor of the page after ``rows`` through the ``X-Next-Cursor``
+    and ``Link: rel="next"`` headers. ``key(row)`` returns the row's sort key.
+    Nothing is set on the last page.
+    """
+    if len(rows) < size:
+        return
+    cursor = encode_cursor(key(rows[-1]))
+    next_url = request.url.remove_query_params("page").include_query_params(cursor=cursor)
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
@@ -30,7 +30,7 @@ class TokenRefreshRequest(BaseModel):
         401: {"description": "Invalid credentials"},
     },
 )
-async def login(
+def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     session: Session = Depends(get_session),
 ):
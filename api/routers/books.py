@@ -1,11 +1,14 @@
-from http.client import HTTPException
 from typing import Optional, List
 
-from fastapi import APIRouter, Depends, Path, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
+from api.cache import cached
 from api.models.book import Book
+from api.pagination import decode_cursor, set_next_cursor
 from api.security import get_current_user
 from api.services.book_service import BookService, get_book_service
+from api.services.export_service import EXPORTERS, CSV_MEDIA_TYPE, negotiate_export
 
 router = APIRouter()
 
@@ -13,10 +16,13 @@ router = APIRouter()
     "/",
     summary="List all books",
     status_code=200,
-    response_model=List[Book]
+    response_model=List[Book],
+    responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}},
 )
-async def list_books(current_user: dict = Depends(get_current_user),
-                     book_service: BookService = Depends(get_book_service)):
+@cached(vary=("accept",))
+def list_books(accept: Optional[str] = Header(None),
+               current_user: dict = Depends(get_current_user),
+               book_service: BookService = Depends(get_book_service)):
     """
     Retorna todos os livros cadastrados no sistema.
 
@@ -42,27 +48,46 @@ async def list_books(current_user: dict = Depends(get_current_user),
       ]
       ```
     - **401 Unauthorized**: Token inválido ou ausente.
+
+    ### Exportação em streaming
+    Com `Accept: application/x-ndjson` (um livro JSON por linha) ou `Accept: text/csv`, o
+    catálogo completo é enviado em streaming, lido do banco em blocos. O uso de memória
+    é constante e os primeiros bytes chegam antes do fim da consulta.
+    A escolha respeita os valores `q` do Accept (`q=0` recusa o tipo); em empate, vale o JSON.
     """
+    media_type = negotiate_export(accept)
+    if media_type:
+        headers = {"Content-Disposition": "attachment; filename=books.csv"} if media_type == CSV_MEDIA_TYPE else None
+        return StreamingResponse(EXPORTERS[media_type](), media_type=media_type, headers=headers)
     return book_service.list_books()
 
 @router.get(
-    "/",
-    summary="List all books",
+    "/search",
+    summary="Search books by title and/or category",
     status_code=200,
     response_model=List[Book]
 )
-async def search_books(title: Optional[str] = Query(None, description="Title to search"),
-                       category: Optional[str] = Query(None, description="Category to search"),
-                       page: int = Query(1, ge=1, description="Page number"),
-                       size: int = Query(10, ge=1, le=100, description="Number of results per page"),
-                       current_user: dict = Depends(get_current_user),
-                       book_service: BookService = Depends(get_book_service)):
+@cached()
+def search_books(request: Request,
+                 response: Response,
+                 title: Optional[str] = Query(None, description="Title to search"),
+                 category: Optional[str] = Query(None, description="Category to search"),
+                 page: int = Query(1, ge=1, description="Page number"),
+                 size: int = Query(10, ge=1, le=100, description="Number of results per page"),
+                 cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor (replaces page)"),
+                 prediction: Optional[int] = Query(None, ge=0, le=1, description="Predicted class (0/1) to keep"),
+                 current_user: dict = Depends(get_current_user),
+                 book_service: BookService = Depends(get_book_service)):
     """
-       Busca livros por título e/ou categoria.
+       Busca livros por título e/ou categoria usando busca full-text.
 
        ### Parâmetros de busca
-       - **title** *(opcional)*: Texto a ser buscado no título dos livros.
-       - **category** *(opcional)*: Nome exato da categoria.
+       - **title** *(opcional)*: Palavras a serem buscadas no título dos livros.
+       - **category** *(opcional)*: Palavras a serem buscadas no nome da categoria.
+       - **prediction** *(opcional)*: Mantém só os livros com essa classe prevista pelo modelo (`0`/`1`).
+
+       Cada palavra é buscada como prefixo (`trav` encontra `Travel`) e sem diferenciar
+       acentos (`cafe` encontra `Café`). Os resultados são ordenados por relevância.
 
        ### Requisitos de autenticação
        - Necessário autenticar via **JWT Bearer Token**.
@@ -71,28 +96,84 @@ async def search_books(title: Optional[str] = Query(None, description="Title to
        - **200 OK**: Lista de livros que correspondem aos filtros informados.
        - **401 Unauthorized**: Token inválido ou ausente.
        - **200 OK** com lista vazia: Nenhum livro encontrado.
+
+       ### Paginação
+       Quando há uma próxima página, o header **X-Next-Cursor** (e `Link: rel="next"`) traz o
+       cursor a ser enviado em `cursor`. Com cursor, o custo de cada página é constante;
+       `page` continua funcionando, mas fica mais lento em páginas profundas.
        """
-    return book_service.search_books(title=title, category=category)
-    offset = (page - 1) * size
-    return book_service.search_books(title=title, category=category, limit=size, offset=offset)
+    after = decode_cursor(cursor)
+    offset = 0 if after else (page - 1) * size
+    results = book_service.search_books_ranked(title=title, category=category,
+                                               limit=size, offset=offset, after=after,
+                                               prediction=prediction)
+    set_next_cursor(request, response, results, size, key=lambda r: (r[1], r[0].id))
+    return [book for book, _ in results]
 
 @router.get("/top-rated", summary="Get the top-rated books", status_code=200)
-async def top_rated(page: int = Query(1, ge=1, description="Page number"),
+@cached()
+def top_rated(request: Request,
+              response: Response,
+              page: int = Query(1, ge=1, description="Page number"),
+              size: int = Query(10, ge=1, le=100, description="Number of results per page"),
+              cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor (replaces page)"),
+              current_user: dict = Depends(get_current_user),
+              book_service: BookService = Depends(get_book_service)):
+    after = decode_cursor(cursor)
+    offset = 0 if after else (page - 1) * size
+    books = book_service.get_top_books(limit=size, offset=offset, after=after)
+    set_next_cursor(request, response, books, size, key=lambda b: (b.rating, b.id))
+    return books
+
+@router.get("/price-range", summary="Filter books by price range", status_code=200)
+@cached()
+def filter_books_by_price(request: Request,
+                          response: Response,
+                          min: Optional[float] = Query(None, description="Minimum price"),
+                          max: Optional[float] = Query(None, description="Maximum price"),
+                          page: int = Query(1, ge=1, description="Page number"),
+                          size: int = Query(10, ge=1, le=100, description="Number of results per page"),
+                          cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor (replaces page)"),
+                          current_user: dict = Depends(get_current_user),
+                          book_service: BookService = Depends(get_book_service)):
+    after = decode_cursor(cursor)
+    offset = 0 if after else (page - 1) * size
+    books = book_service.filter_by_price_range(min_price=min, max_price=max,
+                                               limit=size, offset=offset, after=after)
+    set_next_cursor(request, response, books, size, key=lambda b: (b.price, b.id))
+    return books
+
+@router.get(
+    "/predicted",
+    summary="Books by predicted class, most confident first",
+    status_code=200,
+    response_model=List[Book]
+)
+@cached()
+def predicted_books(request: Request,
+                    response: Response,
+                    label: int = Query(1, ge=0, le=1, description="Predicted class (0/1)"),
+                    page: int = Query(1, ge=1, description="Page number"),
                     size: int = Query(10, ge=1, le=100, description="Number of results per page"),
+                    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor (replaces page)"),
                     current_user: dict = Depends(get_current_user),
                     book_service: BookService = Depends(get_book_service)):
-    offset = (page - 1) * size
-    return book_service.get_top_books(limit=size, offset=offset)
+    """
+    Retorna os livros que o modelo ativo classificou com a classe `label`, do mais provável
+    ao menos provável.
 
-@router.get("/price-range", summary="Filter books by price range", status_code=200)
-async def filter_books_by_price(min: Optional[float] = Query(None, description="Minimum price"),
-                                max: Optional[float] = Query(None, description="Maximum price"),
-                                page: int = Query(1, ge=1, description="Page number"),
-                                size: int = Query(10, ge=1, le=100, description="Number of results per page"),
-                                current_user: dict = Depends(get_current_user),
-                                book_service: BookService = Depends(get_book_service)):
-    offset = (page - 1) * size
-    return book_service.filter_by_price_range(min_price=min, max_price=max, limit=size, offset=offset)
+    As predições (`prediction`, `probability` da classe 1 e `model_version`) ficam gravadas
+    em cada livro e são recalculadas após cada scraping e cada treino, só para os livros
+    alterados desde a última passada. Nenhuma inferência roda durante a requisição.
+
+    ### Paginação
+    Mesma do `/search`: use o header **X-Next-Cursor** em `cursor`.
+    """
+    after = decode_cursor(cursor)
+    offset = 0 if after else (page - 1) * size
+    books = book_service.get_predicted_books(label=label, limit=size, offset=offset, after=after)
+    set_next_cursor(request, response, books, size, key=lambda b: (b.probability, b.id))
+    return books
 
 @router.get(
     "/{book_id}",
@@ -100,9 +181,10 @@ async def filter_books_by_price(min: Optional[float] = Query(None, description="
     status_code=200,
     response_model=Book
 )
-async def get_book(book_id: int = Path(..., description="ID of the book to retrieve"),
-                   current_user: dict = Depends(get_current_user),
-                   book_service: BookService = Depends(get_book_service)):
+@cached()
+def get_book(book_id: int = Path(..., description="ID of the book to retrieve"),
+             current_user: dict = Depends(get_current_user),
+             book_service: BookService = Depends(get_book_service)):
 
     """
     Retorna os detalhes de um livro específico pelo seu ID.
@@ -2,6 +2,7 @@ from typing import List
 
 from fastapi import APIRouter, Depends
 
+from api.cache import cached
 from api.models.category import Category
 from api.security import get_current_user
 from api.services.category_service import CategoryService, get_category_service
@@ -14,7 +15,8 @@ router = APIRouter()
     status_code=200,
     response_model=List[Category]
 )
-async def list_categories(
+@cached()
+def list_categories(
     current_user: dict = Depends(get_current_user),
     category_service: CategoryService = Depends(get_category_service)
 ):
@@ -1,25 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session
+from typing import Optional
 
-from api.db import get_session
-from api.schemas.ml import BatchRequest
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from api.cache import cached
+from api.negotiation import JSON_MEDIA_TYPE, negotiate
+from api.schemas.ml import BatchRequest, BookPredictionRequest, BookPredictionResponse
 from api.security import get_current_user
 from api.services.ml_service import (
-    get_category_mapping,
-    train_logistic_model,
     predict_logistic,
     get_feature_data,
     get_training_data,
+    get_feature_npy,
+    get_training_npz,
 )
+from api.services.feature_service import NPY_MEDIA_TYPE, NPZ_MEDIA_TYPE, feature_store
+from api.services.prediction_service import UnknownBooksError, encode_books, lookup_books, score
+from api.services.model_registry import ModelNotFoundError, model_registry
+from api.services.scoring_service import score_catalogue
+from api.services.training_service import job_view, training_jobs
 
 router = APIRouter()
 
 @router.get(
     "/features",
     summary="Obter somente as features numéricas",
-    responses={200: {"description": "OK"}},
+    responses={200: {"description": "OK", "content": {NPY_MEDIA_TYPE: {}}}},
 )
+@cached(vary=("accept",))
 def get_features(
+    accept: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -32,15 +41,28 @@ def get_features(
       - `category_encoded`: índice inteiro da categoria
 
     Use este endpoint quando você só precisa das entradas **X** (sem labels).
+
+    ### Formato binário
+    Com `Accept: application/x-npy` a matriz vem como um `.npy` `float64` de shape `(n, 4)`,
+    gerado direto dos arrays NumPy, sem objetos por linha:
+
+    ```python
+    X = np.load(io.BytesIO(resp.content))
+    ```
     """
+    if negotiate(accept, [JSON_MEDIA_TYPE, NPY_MEDIA_TYPE]) == NPY_MEDIA_TYPE:
+        return Response(get_feature_npy(), media_type=NPY_MEDIA_TYPE,
+                        headers={"Content-Disposition": "attachment; filename=features.npy"})
     return get_feature_data()
 
 @router.get(
     "/training-data",
     summary="Obter features + labels para treino",
-    responses={200: {"description": "OK"}},
+    responses={200: {"description": "OK", "content": {NPZ_MEDIA_TYPE: {}}}},
 )
+@cached(vary=("accept",))
 def get_training(
+    accept: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -48,7 +70,19 @@ def get_training(
 
     - **Label (y)**: por padrão é `1` quando `rating >= 4` e `0` caso contrário.
     - Útil para análises rápidas, validação e para clientes que queiram treinar modelos externamente.
+
+    ### Formato binário
+    Com `Accept: application/x-npz` a resposta é um `.npz` sem compressão com os arrays
+    `features` (`float64`, `(n, 4)`), `labels` (`int64`), `ids` (id do livro) e `feature_names`:
+
+    ```python
+    data = np.load(io.BytesIO(resp.content))
+    X, y = data["features"], data["labels"]
+    ```
     """
+    if negotiate(accept, [JSON_MEDIA_TYPE, NPZ_MEDIA_TYPE]) == NPZ_MEDIA_TYPE:
+        return Response(get_training_npz(), media_type=NPZ_MEDIA_TYPE,
+                        headers={"Content-Disposition": "attachment; filename=training-data.npz"})
     return get_training_data()
 
 @router.post(
@@ -56,16 +90,22 @@ def get_training(
     summary="Obter predições do modelo treinado",
     responses={
         200: {"description": "Lista de predições (0/1) na mesma ordem do batch"},
+        404: {"description": "Nenhum modelo treinado ou versão inexistente"},
+        422: {"description": "Batch com formato inválido"},
         500: {"description": "Erro interno ao executar a predição"},
     },
 )
 def post_predictions(
     payload: BatchRequest,
+    response: Response,
+    model_version: int | None = Query(
+        None, ge=1, description="Fixa uma versão do modelo (padrão: a versão ativa)."
+    ),
     current_user: dict = Depends(get_current_user),
 ):
     """
     Recebe um **batch** de features e retorna as **predições (0/1)** do modelo de Regressão Logística
-    previamente treinado.
+    previamente treinado. A versão usada vai no header `X-Model-Version`.
 
     ### Formato do batch
     `[[price, rating, availability, category_encoded], ...]`
@@ -81,14 +121,74 @@ def post_predictions(
     ```
     """
     try:
-        return predict_logistic(payload.batch)
+        model = model_registry.get(model_version)
+        predictions = predict_logistic(payload.batch, model)
+    except ModelNotFoundError as e:
+        raise HTTPException(404, str(e))
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Erro na predição: {e}")
+    response.headers["X-Model-Version"] = str(model.version)
+    return predictions
+
+def _book_features(payload: BookPredictionRequest, model_version: int | None):
+    """Model and feature rows of a ``/predictions/books`` request; loads and encodes, so runs in the threadpool."""
+    model = model_registry.get(model_version)
+    matrix = feature_store.current()
+    if payload.books:
+        X = encode_books([book.model_dump() for book in payload.books], matrix)
+    elif payload.ids:
+        X = lookup_books(payload.ids, matrix.index_by_id, matrix)
+    else:
+        X = lookup_books(payload.detail_pages, matrix.index_by_detail_page, matrix)
+    return model, X
+
+@router.post(
+    "/predictions/books",
+    summary="Predições a partir de livros (campos brutos, ids ou detail_page)",
+    response_model=BookPredictionResponse,
+    responses={
+        404: {"description": "Nenhum modelo treinado, versão ou livros inexistentes"},
+        422: {"description": "Requisição inválida"},
+    },
+)
+async def post_book_predictions(
+    payload: BookPredictionRequest,
+    model_version: int | None = Query(
+        None, ge=1, description="Fixa uma versão do modelo (padrão: a versão ativa)."
+    ),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Retorna **predições (0/1)** e a **probabilidade** da classe 1 sem exigir features já codificadas.
+    Informe exatamente um destes campos:
+
+    - `books`: campos brutos, codificados no servidor (categoria desconhecida → `-1`)
+      ```json
+      {"books": [{"price": "£45.17", "rating": "Two", "availability": "In stock (19 available)", "category": "Travel"}]}
+      ```
+    - `ids`: ids de livros do catálogo, ex.: `{"ids": [1, 2, 3]}`
+    - `detail_pages`: URLs `detail_page` de livros do catálogo
+
+    Requisições pequenas e simultâneas são agrupadas em uma única chamada ao modelo (micro-batching).
+    """
+    try:
+        # only the model call stays on the loop, where concurrent requests are batched
+        model, X = await run_in_threadpool(_book_features, payload, model_version)
+        return await score(model, X)
+    except (ModelNotFoundError, UnknownBooksError) as e:
+        raise HTTPException(404, str(e))
+    except ValueError as e:
+        raise HTTPException(422, str(e))
     except Exception as e:
         raise HTTPException(500, f"Erro na predição: {e}")
 
 @router.post(
     "/train-logistic",
     summary="Treinar modelo de Regressão Logística",
-    responses={200: {"description": "Métricas e caminho do arquivo serializado do modelo"}},
+    status_code=202,
+    responses={202: {"description": "Job de treino agendado (ou o job idêntico já em andamento)"}},
 )
 def train_logistic(
     test_size: float = Query(
@@ -99,22 +199,109 @@ def train_logistic(
     current_user: dict = Depends(get_current_user),
 ):
     """
-    Treina o modelo de **Regressão Logística** sobre os livros do banco.
+    Agenda o treino do modelo de **Regressão Logística** sobre os livros do banco e retorna
+    imediatamente o **job** criado. O treino roda em um processo separado, com a validação
+    cruzada em paralelo.
 
-    **Retorna**:
-    - `accuracy`: acurácia no conjunto de teste
-    - `report`: classification report (precision/recall/f1/support)
-    - `model_path`: caminho do arquivo `.joblib` salvo em `models/`
+    - Pedidos com os mesmos parâmetros enquanto um job está na fila ou rodando retornam **o mesmo job**.
+    - Acompanhe em `GET /ml/train-logistic/jobs/{job_id}`; ao final, `result` traz:
+      - `accuracy`: acurácia no conjunto de teste
+      - `report`: classification report (precision/recall/f1/support)
+      - `model_path`: caminho do arquivo `.joblib` salvo em `models/`
+      - `model_version`: versão registrada, que passa a ser a ativa
+    - Ao final, as predições gravadas nos livros (`GET /books/predicted`) são recalculadas.
     """
-    return train_logistic_model(test_size=test_size, random_state=seed)
+    job, _ = training_jobs.submit(test_size=test_size, seed=seed)
+    return job_view(job)
+
+
+@router.get(
+    "/train-logistic/jobs/{job_id}",
+    summary="Status de um job de treino",
+    responses={404: {"description": "Job inexistente"}},
+)
+def get_training_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Retorna o estado do job:
+
+    - `status`: `queued`, `running`, `cancelling`, `succeeded`, `failed` ou `cancelled`
+    - `phase`: fase atual (`loading`, `fitting`, `evaluating`, `cross_validating`, `saving`, `done`)
+    - `timings`: segundos gastos em cada fase concluída
+    - `result`: métricas do treino, quando `succeeded`; `error` quando `failed`
+    """
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job não encontrado")
+    return job_view(job)
+
+
+@router.post(
+    "/train-logistic/jobs/{job_id}/cancel",
+    summary="Cancelar um job de treino",
+    responses={404: {"description": "Job inexistente"}},
+)
+def cancel_training_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Cancela o job. Se ainda estiver na fila ele é descartado; se estiver rodando, passa a
+    `cancelling` e para no início da próxima fase. Jobs já finalizados não mudam.
+    """
+    job = training_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(404, "Job não encontrado")
+    return job_view(job)
+
+
+@router.get(
+    "/models",
+    summary="Listar versões do modelo",
+)
+def list_models(
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Retorna as versões do modelo mantidas em disco (as `MODEL_KEEP_VERSIONS` mais recentes)
+    e qual delas está ativa.
+    """
+    return {
+        "active": model_registry.active_version(),
+        "versions": model_registry.versions(),
+    }
+
+
+@router.post(
+    "/models/{version}/activate",
+    summary="Ativar uma versão do modelo (rollback)",
+    responses={404: {"description": "Versão inexistente"}},
+)
+def activate_model(
+    version: int,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Torna `version` a versão ativa para todas as predições, em todos os workers.
+    As predições gravadas nos livros são recalculadas com ela logo após a resposta.
+    """
+    try:
+        model = model_registry.activate(version)
+    except ModelNotFoundError as e:
+        raise HTTPException(404, str(e))
+    background_tasks.add_task(score_catalogue)
+    return {"active": model.version}
 
 
 @router.get(
     "/category-encodings",
     summary="Mapeamento de categorias para índices"
 )
+@cached()
 def get_category_encodings(
-    session: Session = Depends(get_session),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -128,5 +315,7 @@ def get_category_encodings(
       "Historical Fiction": 21
     }
     ```
+
+    O dicionário vem da matriz de features em memória e é reconstruído após cada scraping.
     """
-    return get_category_mapping(session)
+    return feature_store.current().category_mapping
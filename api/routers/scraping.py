@@ -1,8 +1,12 @@
 from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends
+from typing import Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from api.pagination import decode_cursor, set_next_cursor
 from api.security import get_current_user
+from api.services.scrape_run_service import ScrapeRunService, get_scrape_run_service, run_view
 from api.tasks import perform_scrape
 
 router = APIRouter()
@@ -31,6 +35,7 @@ async def trigger_scraping(
     ### Observações
     - Essa rota **não executa o scraping imediatamente**; apenas agenda a execução.
     - O scraping coleta dados de livros e atualiza a base local.
+    - Se outro scraping (agendado ou disparado) estiver em andamento, este aguarda o fim dele.
     """
     from api.main import scheduler
     scheduler.add_job(
@@ -42,3 +47,46 @@ async def trigger_scraping(
     )
 
 
+@router.get("/runs", summary="List scraping runs with their telemetry", status_code=200)
+def list_scrape_runs(request: Request,
+                     response: Response,
+                     page: int = Query(1, ge=1, description="Page number"),
+                     size: int = Query(20, ge=1, le=100, description="Number of runs per page"),
+                     cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor (replaces page)"),
+                     current_user: dict = Depends(get_current_user),
+                     scrape_run_service: ScrapeRunService = Depends(get_scrape_run_service)):
+    """
+    Lista as execuções de scraping, da mais recente para a mais antiga.
+
+    ### Campos de cada execução
+    - `status`: `running`, `succeeded` ou `failed` (`error` traz o motivo)
+    - `incremental`, `started_at`, `finished_at`, `duration_seconds`
+    - Volume: `categories`, `books_crawled`, `inserted`, `updated`, `unchanged`, `scored`
+    - Rede: `requests`, `retries`, `bytes_fetched`, `pages_changed`, `pages_skipped`
+    - `stages`: por etapa (`category`, `listing`, `fetch`, `parse`, `write`), o número de
+      chamadas, `busy_seconds` (soma das chamadas concorrentes) e `wall_seconds` (do início da
+      primeira ao fim da última). `busy_seconds / wall_seconds` é a concorrência média da etapa.
+    - `status_counts`: histograma de status HTTP (e erros de transporte, ex.: `ConnectTimeout`)
+    - `failures` e `failed_pages`: páginas abandonadas, com etapa, URL e motivo
+
+    ### Paginação
+    Header **X-Next-Cursor** com o cursor da próxima página, como nas rotas de livros.
+    """
+    after = decode_cursor(cursor, length=1)
+    offset = 0 if after else (page - 1) * size
+    runs = scrape_run_service.list_runs(limit=size, offset=offset, after=after[0] if after else None)
+    set_next_cursor(request, response, runs, size, key=lambda run: (run.id,))
+    return [run_view(run) for run in runs]
+
+
+@router.get("/runs/{run_id}", summary="Get a scraping run", status_code=200)
+def get_scrape_run(run_id: int,
+                   current_user: dict = Depends(get_current_user),
+                   scrape_run_service: ScrapeRunService = Depends(get_scrape_run_service)):
+    """
+    Retorna uma execução de scraping com a telemetria descrita em `GET /scraping/runs`.
+    """
+    run = scrape_run_service.get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Scrape run not found")
+    return run_view(run)
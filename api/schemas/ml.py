@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Union
 
 class FeatureSchema(BaseModel):
     detail_page: str
@@ -18,4 +18,26 @@ class PredictionResponse(BaseModel):
     prediction: str
 
 class BatchRequest(BaseModel):
-    batch: List[List[float]]
\ No newline at end of file
+    batch: List[List[float]]
+
+class RawBook(BaseModel):
+    price: Union[float, str] = Field(description='Preço, ex.: 45.17 ou "£45.17"')
+    rating: Union[int, str] = Field(description='Nota, ex.: 2 ou "Two"')
+    availability: Union[int, str] = Field(description='Estoque, ex.: 19 ou "In stock (19 available)"')
+    category: str
+
+class BookPredictionRequest(BaseModel):
+    books: List[RawBook] = []
+    ids: List[int] = []
+    detail_pages: List[str] = []
+
+    @model_validator(mode="after")
+    def one_source(self):
+        if sum(1 for source in (self.books, self.ids, self.detail_pages) if source) != 1:
+            raise ValueError("Informe exatamente um de: books, ids, detail_pages")
+        return self
+
+class BookPredictionResponse(BaseModel):
+    model_version: int
+    predictions: List[int]
+    probabilities: List[float]
@@ -1,11 +1,17 @@
+from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi import Depends
-from sqlmodel import Session, select, and_, func
-from sqlalchemy import func
+from sqlmodel import Session, select, and_, or_, func
+from sqlalchemy import func, literal, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 
-from api.db import get_session
+from api.db import get_read_session
 from api.models.book import Book
+from api.services.search_service import search_clauses
+
+# Columns refreshed by upsert_books when a scraped book already exists
+UPSERT_FIELDS = ("price", "rating", "availability")
 
 
 class BookService:
@@ -27,6 +33,60 @@ class BookService:
         self.session.refresh(book)
         return book
 
+    def upsert_books(self, rows: list[dict], changes: Optional[list] = None) -> dict:
+        """
+        Write a chunk of scraped books with a single multi-row
+        ``INSERT ... ON CONFLICT (detail_page) DO UPDATE``.
+
+        Only new books and books whose price, rating or availability changed are
+        sent to the database. Returns the inserted/updated/unchanged counts.
+        When ``changes`` is given, an ``(old, new)`` pair of book dicts is appended
+        to it for every written row (``old`` is ``None`` for inserts).
+        """
+        rows = list({row["detail_page"]: row for row in rows}.values())
+        result = {"inserted": 0, "updated": 0, "unchanged": 0}
+        if not rows:
+            return result
+
+        existing = {
+            detail_page: dict(zip(("category", *UPSERT_FIELDS), values))
+            for detail_page, *values in self.session.exec(
+                select(Book.detail_page, Book.category, *(getattr(Book, f) for f in UPSERT_FIELDS))
+                .where(Book.detail_page.in_([row["detail_page"] for row in rows]))
+            )
+        }
+
+        changed = []
+        for row in rows:
+            current = existing.get(row["detail_page"])
+            if current is None:
+                result["inserted"] += 1
+            elif any(current[f] != row[f] for f in UPSERT_FIELDS):
+                result["updated"] += 1
+                # category is not part of the update
+                row = {**row, "category": current["category"]}
+            else:
+                result["unchanged"] += 1
+                continue
+            changed.append(row)
+            if changes is not None:
+                changes.append((current, row))
+
+        if changed:
+            # marks the rows for the next scoring pass
+            now = datetime.now(timezone.utc)
+            insert = postgresql.insert if self.session.get_bind().dialect.name == "postgresql" else sqlite.insert
+            stmt = insert(Book).values([{**row, "updated_at": now} for row in changed])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Book.detail_page],
+                set_={f: stmt.excluded[f] for f in (*UPSERT_FIELDS, "updated_at")},
+                where=or_(*(getattr(Book, f) != stmt.excluded[f] for f in UPSERT_FIELDS)),
+            )
+            self.session.execute(stmt)
+            self.session.commit()
+
+        return result
+
     def get_book(self, book_id: int) -> Book | None:
         return self.session.get(Book, book_id)
 
@@ -38,21 +98,42 @@ class BookService:
                      title: Optional[str] = None,
                      category: Optional[str] = None,
                      limit: int = 10,
-                     offset: int = 0) -> list[Book]:
-        stmt = select(Book)
-
-        filters = []
-        if title:
-            filters.append(func.lower(Book.title).like(f"%{title.lower()}%"))
-        if category:
-            filters.append(func.lower(Book.category).like(f"%{category.lower()}%"))
-
-        if filters:
-            stmt = stmt.where(and_(*filters))
+                     offset: int = 0,
+                     after: Optional[tuple] = None,
+                     prediction: Optional[int] = None) -> list[Book]:
+        """Full-text search on title and/or category, best matches first."""
+        return [book for book, _ in self.search_books_ranked(title, category, limit, offset, after, prediction)]
+
+    def search_books_ranked(self,
+                            title: Optional[str] = None,
+                            category: Optional[str] = None,
+                            limit: int = 10,
+                            offset: int = 0,
+                            after: Optional[tuple] = None,
+                            prediction: Optional[int] = None) -> list[tuple[Book, float]]:
+        """
+        Same as ``search_books`` but returns ``(book, rank)`` pairs, ``(rank, id)``
+        being the sort key. ``after`` continues strictly after such a key.
+        ``prediction`` keeps only the books the model scored with that class.
+        """
+        clauses = search_clauses(self.session.get_bind().dialect.name, title, category)
+        join, where, rank = clauses or (None, None, literal(0.0))
+
+        stmt = select(Book, rank)
+        if join is not None:
+            stmt = stmt.join(join, join.c.rowid == Book.id)
+        if where is not None:
+            stmt = stmt.where(where)
+        if prediction is not None:
+            stmt = stmt.where(Book.prediction == prediction)
+
+        stmt = stmt.order_by(rank, Book.id)
+        if after is not None:
+            stmt = stmt.where(tuple_(rank, Book.id) > tuple(after))
 
         stmt = stmt.offset(offset).limit(limit)
 
-        return self.session.exec(stmt).all()
+        return [(book, row_rank) for book, row_rank in self.session.exec(stmt).all()]
 
     def get_overview_stats(self) -> dict:
         total_books = self.session.exec(select(func.count()).select_from(Book)).one()
@@ -92,28 +173,53 @@ class BookService:
             for category, count, avg_price in results
         ]
 
-    def get_top_books(self, limit: int = 10, offset: int = 0) -> list[Book]:
-        stmt = (
-            select(Book)
-            .order_by(Book.rating.desc())
-            .offset(offset)
-            .limit(limit)
-        )
+    def get_top_books(self, limit: int = 10, offset: int = 0,
+                      after: Optional[tuple] = None) -> list[Book]:
+        """Books by rating, best first. ``after`` is a ``(rating, id)`` key to continue from."""
+        stmt = select(Book).order_by(Book.rating.desc(), Book.id.desc())
+        if after is not None:
+            stmt = stmt.where(tuple_(Book.rating, Book.id) < tuple(after))
+
+        stmt = stmt.offset(offset).limit(limit)
+        return self.session.exec(stmt).all()
+
+    def get_predicted_books(self, label: int = 1, limit: int = 10, offset: int = 0,
+                            after: Optional[tuple] = None) -> list[Book]:
+        """
+        Books the model scored with class ``label``, most confident first: highest
+        ``probability`` (of class 1) for ``label=1``, lowest for ``label=0``.
+        ``after`` is a ``(probability, id)`` key to continue from.
+        """
+        stmt = select(Book).where(Book.prediction == label)
+        if label == 1:
+            stmt = stmt.order_by(Book.probability.desc(), Book.id.desc())
+            if after is not None:
+                stmt = stmt.where(tuple_(Book.probability, Book.id) < tuple(after))
+        else:
+            stmt = stmt.order_by(Book.probability, Book.id)
+            if after is not None:
+                stmt = stmt.where(tuple_(Book.probability, Book.id) > tuple(after))
+
+        stmt = stmt.offset(offset).limit(limit)
         return self.session.exec(stmt).all()
 
     def filter_by_price_range(
             self,
             min_price: Optional[float] = None,
             max_price: Optional[float] = None,
-            limit: int = 10, offset: int = 0
+            limit: int = 10, offset: int = 0,
+            after: Optional[tuple] = None
     ) -> list[Book]:
-        stmt = select(Book)
+        """Books within the price range, cheapest first. ``after`` is a ``(price, id)`` key to continue from."""
+        stmt = select(Book).order_by(Book.price, Book.id)
 
         filters = []
         if min_price is not None:
             filters.append(Book.price >= min_price)
         if max_price is not None:
             filters.append(Book.price <= max_price)
+        if after is not None:
+            filters.append(tuple_(Book.price, Book.id) > tuple(after))
 
         if filters:
             stmt = stmt.where(and_(*filters))
@@ -122,5 +228,6 @@ class BookService:
 
         return self.session.exec(stmt).all()
 
-def get_book_service(session: Session = Depends(get_session)) -> BookService:
+def get_book_service(session: Session = Depends(get_read_session)) -> BookService:
+    # only the GET routes depend on it; the scrape writes through its own sessions
     return BookService(session)
\ No newline at end of file
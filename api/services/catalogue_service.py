@@ -0,0 +1,82 @@
+"""
+Catalogue version counter.
+
+The scrape bumps ``catalogue_state.version`` whenever it writes books; anything
+derived from the catalogue (cached responses, feature matrices, category
+dictionaries) is keyed on it. Readers see a bump made by another worker after at
+most ``CATALOGUE_VERSION_TTL_SECONDS``; bumps made in this process are seen at once.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from api.config import settings
+from api.db import engine, read_replicas
+from api.models.catalogue_state import CatalogueState
+
+
+class CatalogueVersion:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[int], None]] = []
+
+    def on_change(self, listener: Callable[[int], None]) -> None:
+        """Call ``listener(new_version)`` whenever this process sees a new version."""
+        self._listeners.append(listener)
+
+    def peek(self) -> int | None:
+        """The version if it was checked within the TTL, without querying; else ``None``."""
+        if self._version is not None and time.monotonic() - self._checked_at < self.ttl_seconds:
+            return self._version
+        return None
+
+    def get(self) -> int:
+        version = self.peek()
+        if version is not None:
+            return version
+        with Session(engine) as session:
+            state = session.get(CatalogueState, 1)
+            version = state.version if state else 0
+        return self._set(version)
+
+    def bump(self) -> int:
+        """Increment the version after the catalogue changed."""
+        with Session(engine) as session:
+            result = session.execute(
+                update(CatalogueState)
+                .where(CatalogueState.id == 1)
+                .values(version=CatalogueState.version + 1, updated_at=datetime.now(timezone.utc))
+            )
+            if result.rowcount == 0:
+                session.add(CatalogueState(id=1, version=1))
+            try:
+                session.commit()
+            except IntegrityError:
+                # first bump raced with another worker's; retry as an update
+                session.rollback()
+                return self.bump()
+            version = session.get(CatalogueState, 1).version
+        return self._set(version)
+
+    def _set(self, version: int) -> int:
+        with self._lock:
+            changed = self._version is not None and version != self._version
+            self._version = version
+            self._checked_at = time.monotonic()
+        if changed:
+            for listener in self._listeners:
+                listener(version)
+        return version
+
+
+catalogue_version = CatalogueVersion(settings.CATALOGUE_VERSION_TTL_SECONDS)
+# a replica behind the version seen here would get stale data cached under it
+read_replicas.version_source = catalogue_version.get
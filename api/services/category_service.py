@@ -1,7 +1,7 @@
 from fastapi import Depends
 from sqlmodel import Session, select
 
-from api.db import get_session
+from api.db import get_read_session
 from api.models.category import Category
 
 
@@ -31,5 +31,5 @@ class CategoryService:
         statement = select(Category)
         return self.session.exec(statement).all()
 
-def get_category_service(session: Session = Depends(get_session)) -> CategoryService:
+def get_category_service(session: Session = Depends(get_read_session)) -> CategoryService:
     return CategoryService(session)
\ No newline at end of file
@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Sequence
+
+from sqlmodel import Session, select
+
+from api.db import read_replicas
+from api.negotiation import JSON_MEDIA_TYPE, negotiate
+from api.models.book import Book
+
+EXPORT_COLUMNS = [column.name for column in Book.__table__.columns]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+
+def iter_book_rows(chunk_size: int = 1000) -> Iterator[Sequence[tuple]]:
+    """
+    Yield the whole catalogue in chunks of ``chunk_size`` plain row tuples.
+
+    Rows come from a server-side cursor (``yield_per``) and are not loaded as ORM
+    objects, so memory stays bounded by one chunk. The session is owned by the
+    generator because it outlives the request's dependency session.
+    """
+    columns = [Book.__table__.c[name] for name in EXPORT_COLUMNS]
+    with Session(read_replicas.engine()) as session:
+        result = session.execute(
+            select(*columns).order_by(Book.id).execution_options(yield_per=chunk_size)
+        )
+        for partition in result.partitions():
+            yield partition
+
+
+def ndjson_export(chunk_size: int = 1000) -> Iterator[str]:
+    for rows in iter_book_rows(chunk_size):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False, default=datetime.isoformat) + "\n"
+            for row in rows
+        )
+
+
+def csv_export(chunk_size: int = 1000) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in iter_book_rows(chunk_size):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORTERS = {
+    NDJSON_MEDIA_TYPE: ndjson_export,
+    CSV_MEDIA_TYPE: csv_export,
+}
+
+
+def negotiate_export(accept: str | None) -> str | None:
+    """Pick the exporter the Accept header prefers, or None for the plain JSON list."""
+    media_type = negotiate(accept, [JSON_MEDIA_TYPE, *EXPORTERS])
+    return None if media_type == JSON_MEDIA_TYPE else media_type
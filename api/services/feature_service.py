@@ -0,0 +1,169 @@
+"""
+Columnar feature matrix for the ML endpoints and training.
+
+The catalogue is read with a single query over the needed columns and every
+feature is computed on whole columns: availability with one regex pass over the
+joined distinct texts, categories with one sorted dictionary. The matrix is built
+once per catalogue version and shared by training, ``/ml/features`` and
+``/ml/training-data``.
+"""
+import io
+import re
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+from sqlmodel import Session, select
+
+from api.db import read_replicas
+from api.models.book import Book
+from api.services.catalogue_service import catalogue_version
+
+FEATURE_NAMES = ["price", "rating", "availability", "category_encoded"]
+
+# Binary encodings of the matrix for /ml/features and /ml/training-data
+NPY_MEDIA_TYPE = "application/x-npy"
+NPZ_MEDIA_TYPE = "application/x-npz"
+
+# First run of digits on each line ("In stock (19 available)" -> "19"); the line
+# anchor keeps a line without digits from borrowing the next line's number
+AVAILABILITY_PATTERN = re.compile(r"^[^\d\n]*(\d*)", re.MULTILINE)
+
+
+def encode_column(values, mapping: dict) -> np.ndarray:
+    return np.fromiter(map(mapping.__getitem__, values), dtype=np.int64, count=len(values))
+
+
+def parse_availability_column(values: list[str]) -> np.ndarray:
+    """Vectorized ``ml_helpers.parse_availability`` for a column of strings."""
+    # the scraped texts repeat a lot ("In stock (19 available)"), parse each once
+    distinct = list(set(values))
+    digits = AVAILABILITY_PATTERN.findall("\n".join(distinct))
+    if len(digits) != len(distinct):
+        # some value spans several lines
+        digits = [AVAILABILITY_PATTERN.match(value.replace("\n", " ")).group(1) for value in distinct]
+    parsed = {value: int(number) if number else 0 for value, number in zip(distinct, digits)}
+    return encode_column(values, parsed)
+
+
+@dataclass(frozen=True)
+class FeatureMatrix:
+    version: int
+    ids: np.ndarray
+    detail_pages: np.ndarray
+    price: np.ndarray
+    rating: np.ndarray
+    availability: np.ndarray
+    category_encoded: np.ndarray
+    categories: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @cached_property
+    def X(self) -> np.ndarray:
+        """``(n_books, 4)`` float matrix in ``FEATURE_NAMES`` order."""
+        return np.column_stack((self.price, self.rating, self.availability, self.category_encoded)).astype(np.float64)
+
+    @cached_property
+    def category_mapping(self) -> dict[str, int]:
+        return {category: index for index, category in enumerate(self.categories.tolist())}
+
+    @cached_property
+    def index_by_id(self) -> dict[int, int]:
+        return {book_id: position for position, book_id in enumerate(self.ids.tolist())}
+
+    @cached_property
+    def index_by_detail_page(self) -> dict[str, int]:
+        return {page: position for position, page in enumerate(self.detail_pages.tolist())}
+
+    def rating_labels(self) -> np.ndarray:
+        return (self.rating >= 4).astype(np.int64)
+
+    def price_labels(self) -> np.ndarray:
+        return (self.price > 30).astype(np.int64)
+
+    def rows(self) -> list[list]:
+        """The matrix as JSON-ready rows, keeping the integer features as ints."""
+        return [
+            list(row) for row in zip(self.price.tolist(), self.rating.tolist(),
+                                     self.availability.tolist(), self.category_encoded.tolist())
+        ]
+
+
+def to_npy(array: np.ndarray) -> bytes:
+    """``.npy`` bytes of ``array``; clients read it back with ``np.load`` (no pickling)."""
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def to_npz(**arrays: np.ndarray) -> bytes:
+    """Uncompressed ``.npz`` archive: each member is a plain ``.npy`` of one array."""
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def fetch_columns(session: Session, *columns) -> list[tuple]:
+    """Run ``SELECT columns FROM book ORDER BY id`` and return one tuple per column."""
+    statement = select(*columns).order_by(Book.id)
+    connection = session.connection()
+    # plain DB-API tuples: building a Row per book costs more than the query itself
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(str(statement.compile(dialect=connection.dialect)))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return list(zip(*rows)) if rows else [()] * len(columns)
+
+
+# Columns build_feature_matrix and matrix_from_columns work on, in order
+MATRIX_COLUMNS = (Book.id, Book.detail_page, Book.price, Book.rating, Book.availability, Book.category)
+
+
+def build_feature_matrix(session: Session, version: int = 0) -> FeatureMatrix:
+    columns = fetch_columns(session, *MATRIX_COLUMNS)
+    return matrix_from_columns(*columns, unique_categories=sorted(set(columns[-1])), version=version)
+
+
+def matrix_from_columns(ids, detail_pages, prices, ratings, availability, categories,
+                        unique_categories: list[str], version: int = 0) -> FeatureMatrix:
+    """
+    Feature matrix of some books, ``unique_categories`` being the sorted categories
+    of the whole catalogue so the encoding matches the full matrix.
+    """
+    return FeatureMatrix(
+        version=version,
+        ids=np.array(ids, dtype=np.int64),
+        detail_pages=np.array(detail_pages, dtype=object),
+        price=np.array(prices, dtype=np.float64),
+        rating=np.clip(np.array(ratings, dtype=np.int64), 1, 5),
+        availability=parse_availability_column(availability),
+        category_encoded=encode_column(categories, {c: i for i, c in enumerate(unique_categories)}),
+        categories=np.array(unique_categories, dtype=object),
+    )
+
+
+class FeatureStore:
+    """Keeps the matrix of the current catalogue version in memory."""
+
+    def __init__(self):
+        self._matrix: FeatureMatrix | None = None
+        self._lock = threading.Lock()
+
+    def current(self) -> FeatureMatrix:
+        version = catalogue_version.get()
+        matrix = self._matrix
+        if matrix is not None and matrix.version == version:
+            return matrix
+        with self._lock:
+            if self._matrix is None or self._matrix.version != version:
+                with Session(read_replicas.engine()) as session:
+                    self._matrix = build_feature_matrix(session, version)
+            return self._matrix
+
+
+feature_store = FeatureStore()
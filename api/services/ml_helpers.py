@@ -1,8 +1,5 @@
 import re
 
-from api.db import engine
-from sqlmodel import Session
-
 
 def parse_price(value) -> float:
     if isinstance(value, (int, float)):
@@ -37,8 +34,7 @@ def parse_availability(value) -> int:
 
 
 def encode_category(cat: str) -> int:
-    from api.services.ml_service import get_category_mapping
+    # the mapping comes with the cached feature matrix, no query per call
+    from api.services.feature_service import feature_store
 
-    with Session(engine) as session:
-        mapping = get_category_mapping(session)
-        return mapping.get(cat, -1)
\ No newline at end of file
+    return feature_store.current().category_mapping.get(cat, -1)
\ No newline at end of file
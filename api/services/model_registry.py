@@ -0,0 +1,186 @@
+"""
+Registry of the trained models.
+
+Every training run is stored as a new version, ``<name>.v<N>.joblib`` under
+``MODEL_DIR``, and a ``<name>.current`` file names the active one. Estimators
+are kept in memory once loaded. A lookup only stats the pointer file, so a
+version published by another worker, or a rollback, is picked up on the next
+request and swapped in atomically. The newest ``MODEL_KEEP_VERSIONS`` versions
+stay on disk so a request can pin one of them.
+"""
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+from api.config import settings
+
+
+class ModelNotFoundError(LookupError):
+    pass
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    version: int
+    estimator: object
+    path: str
+    n_features: int
+    loaded_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def check_input(self, batch) -> np.ndarray:
+        """Turn ``batch`` into a float matrix, rejecting anything not ``(n, n_features)``."""
+        try:
+            X = np.asarray(batch, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError("Formato inválido. Esperado: List[List[float]]")
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Cada entrada deve conter {self.n_features} valores. Recebido: shape {X.shape}")
+        return X
+
+    @property
+    def positive_column(self) -> int:
+        """Column of class 1 in ``predict_proba`` output (the last one if 1 is not a class)."""
+        classes = self.estimator.classes_
+        return int(np.flatnonzero(classes == 1)[0]) if (classes == 1).any() else len(classes) - 1
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str, name: str, keep: int):
+        self.model_dir = model_dir
+        self.name = name
+        self.keep = keep
+        self._pattern = re.compile(rf"^{re.escape(name)}\.v(\d+)\.joblib$")
+        self._loaded: OrderedDict[int, LoadedModel] = OrderedDict()
+        # (pointer file identity, model), replaced as a single reference so readers see
+        # the old or the new model, never a mix
+        self._active: tuple[tuple, LoadedModel] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def pointer_path(self) -> str:
+        return os.path.join(self.model_dir, f"{self.name}.current")
+
+    def path(self, version: int) -> str:
+        return os.path.join(self.model_dir, f"{self.name}.v{version}.joblib")
+
+    def versions(self) -> list[int]:
+        try:
+            names = os.listdir(self.model_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(self._pattern.match, names) if m)
+
+    def active_version(self) -> int | None:
+        try:
+            with open(self.pointer_path) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, estimator) -> LoadedModel:
+        """Store ``estimator`` as a new version and make it the active one."""
+        os.makedirs(self.model_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.model_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                joblib.dump(estimator, f)
+            with self._lock:
+                version = max(self.versions(), default=0) + 1
+                # a hard link fails if the name exists, so two trainings finishing together
+                # get distinct versions, and a version name only ever holds a complete file
+                while True:
+                    try:
+                        os.link(tmp_path, self.path(version))
+                        break
+                    except FileExistsError:
+                        version += 1
+                model = self._remember(version, estimator)
+        finally:
+            os.unlink(tmp_path)
+        self.activate(version)
+        self._prune()
+        return model
+
+    def activate(self, version: int) -> LoadedModel:
+        """Point the registry at ``version`` (e.g. to roll back)."""
+        model = self.get(version)
+        self._write_atomic(self.pointer_path, lambda f: f.write(str(version).encode()))
+        return model
+
+    def get(self, version: int | None = None) -> LoadedModel:
+        """The active model, or the pinned ``version``."""
+        if version is None:
+            return self.current()
+        model = self._loaded.get(version)
+        if model is not None:
+            return model
+        with self._lock:
+            if version not in self._loaded:
+                try:
+                    estimator = joblib.load(self.path(version))
+                except FileNotFoundError:
+                    raise ModelNotFoundError(f"Versão {version} do modelo não encontrada")
+                self._remember(version, estimator)
+            return self._loaded[version]
+
+    def current(self) -> LoadedModel:
+        try:
+            stat = os.stat(self.pointer_path)
+        except FileNotFoundError:
+            raise ModelNotFoundError(f"Nenhum modelo treinado em: {self.model_dir}")
+        # the pointer is replaced, not rewritten, so the inode changes on every activation
+        # even where mtimes are coarse
+        pointer = (stat.st_ino, stat.st_mtime_ns)
+        active = self._active
+        if active is not None and active[0] == pointer:
+            return active[1]
+
+        version = self.active_version()
+        if version is None:
+            raise ModelNotFoundError(f"Nenhum modelo treinado em: {self.model_dir}")
+        model = self.get(version)
+        self._active = (pointer, model)
+        return model
+
+    def _remember(self, version: int, estimator) -> LoadedModel:
+        model = LoadedModel(
+            version=version,
+            estimator=estimator,
+            path=self.path(version),
+            n_features=int(getattr(estimator, "n_features_in_", 0)),
+        )
+        self._loaded[version] = model
+        while len(self._loaded) > self.keep:
+            self._loaded.popitem(last=False)
+        return model
+
+    def _prune(self) -> None:
+        active = self.active_version()
+        with self._lock:
+            for version in self.versions()[:-self.keep]:
+                if version != active:
+                    try:
+                        os.remove(self.path(version))
+                    except FileNotFoundError:
+                        pass
+                    self._loaded.pop(version, None)
+
+    def _write_atomic(self, path: str, write) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.model_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+model_registry = ModelRegistry(settings.MODEL_DIR, "logistic_model", settings.MODEL_KEEP_VERSIONS)
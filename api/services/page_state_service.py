@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+
+from sqlmodel import Session, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.models.book import Book
+from api.models.page_state import PageState
+
+STATE_FIELDS = ("etag", "last_modified", "content_hash", "links")
+
+
+class PageStateService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def load_states(self) -> dict[str, dict]:
+        """Validators and extracted links of every crawled URL, keyed by URL."""
+        return {
+            state.url: {field: getattr(state, field) for field in STATE_FIELDS}
+            for state in self.session.exec(select(PageState))
+        }
+
+    def known_books(self) -> set[str]:
+        return set(self.session.exec(select(Book.detail_page)).all())
+
+    def save_states(self, states: dict[str, dict], chunk_size: int = 500) -> None:
+        rows = [
+            {"url": url, **{field: state.get(field) for field in STATE_FIELDS},
+             "fetched_at": datetime.now(timezone.utc)}
+            for url, state in states.items()
+        ]
+        insert = postgresql.insert if self.session.get_bind().dialect.name == "postgresql" else sqlite.insert
+        for start in range(0, len(rows), chunk_size):
+            stmt = insert(PageState).values(rows[start:start + chunk_size])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[PageState.url],
+                set_={field: stmt.excluded[field] for field in (*STATE_FIELDS, "fetched_at")},
+            )
+            self.session.execute(stmt)
+        self.session.commit()
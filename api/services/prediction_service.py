@@ -0,0 +1,122 @@
+"""
+Predictions from raw book fields or from books already in the catalogue.
+
+Rows are encoded server side with the category dictionary of the cached feature
+matrix (rebuilt when a scrape bumps the catalogue version) and scored with
+``predict_proba``. Concurrent small requests for the same model version are
+coalesced by ``MicroBatcher`` into a single ``predict_proba`` call.
+"""
+import asyncio
+from dataclasses import dataclass
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from api.config import settings
+from api.services.feature_service import FeatureMatrix
+from api.services.ml_helpers import parse_price, parse_rating, parse_availability
+from api.services.model_registry import LoadedModel
+
+
+class UnknownBooksError(LookupError):
+    def __init__(self, missing: list):
+        super().__init__(f"Livros não encontrados: {missing[:10]}")
+        self.missing = missing
+
+
+def encode_books(books: list[dict], matrix: FeatureMatrix) -> np.ndarray:
+    """``[price, rating, availability, category_encoded]`` rows for raw book fields."""
+    mapping = matrix.category_mapping
+    n = len(books)
+    return np.column_stack((
+        np.fromiter((parse_price(b["price"]) for b in books), dtype=np.float64, count=n),
+        np.fromiter((parse_rating(b["rating"]) for b in books), dtype=np.float64, count=n),
+        np.fromiter((parse_availability(b["availability"]) for b in books), dtype=np.float64, count=n),
+        np.fromiter((mapping.get(b["category"], -1) for b in books), dtype=np.float64, count=n),
+    ))
+
+
+def lookup_books(keys: list, index: dict[object, int], matrix: FeatureMatrix) -> np.ndarray:
+    """Rows of the feature matrix for book ids or detail pages."""
+    positions = [index.get(key, -1) for key in keys]
+    missing = [key for key, position in zip(keys, positions) if position < 0]
+    if missing:
+        raise UnknownBooksError(missing)
+    return matrix.X[np.array(positions, dtype=np.intp)]
+
+
+@dataclass
+class _Pending:
+    model: LoadedModel
+    chunks: list
+    futures: list
+    rows: int = 0
+    timer: asyncio.TimerHandle | None = None
+
+
+class MicroBatcher:
+    """
+    Collects the rows of concurrent requests for up to ``max_wait_ms`` (or until
+    ``max_rows``) and scores them with one ``predict_proba`` call per model version.
+    Requests at least ``max_rows`` long are scored on their own in the threadpool.
+    """
+
+    def __init__(self, max_rows: int, max_wait_ms: float):
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self._pending: dict[int, _Pending] = {}
+        self.batches = 0
+        self.requests = 0
+
+    async def predict_proba(self, model: LoadedModel, X: np.ndarray) -> np.ndarray:
+        self.requests += 1
+        if len(X) >= self.max_rows or self.max_wait <= 0:
+            self.batches += 1
+            return await run_in_threadpool(model.estimator.predict_proba, X)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.get(model.version)
+        if pending is None:
+            pending = self._pending[model.version] = _Pending(model, [], [])
+            pending.timer = loop.call_later(self.max_wait, self._flush, model.version)
+        pending.chunks.append(X)
+        pending.futures.append(future)
+        pending.rows += len(X)
+        if pending.rows >= self.max_rows:
+            self._flush(model.version)
+        return await future
+
+    def _flush(self, version: int) -> None:
+        pending = self._pending.pop(version, None)
+        if pending is None:
+            return
+        pending.timer.cancel()
+        self.batches += 1
+        try:
+            # a batch holds less than max_rows rows, cheap enough to score on the loop
+            proba = pending.model.estimator.predict_proba(np.vstack(pending.chunks))
+        except Exception as e:
+            for future in pending.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        start = 0
+        for chunk, future in zip(pending.chunks, pending.futures):
+            if not future.done():
+                future.set_result(proba[start:start + len(chunk)])
+            start += len(chunk)
+
+
+batcher = MicroBatcher(settings.PREDICTION_BATCH_MAX_ROWS, settings.PREDICTION_BATCH_WAIT_MS)
+
+
+async def score(model: LoadedModel, X: np.ndarray) -> dict:
+    """Labels and positive-class probabilities of the rows of ``X``."""
+    X = model.check_input(X)
+    proba = await batcher.predict_proba(model, X)
+    return {
+        "model_version": model.version,
+        "predictions": model.estimator.classes_[proba.argmax(axis=1)].tolist(),
+        "probabilities": proba[:, model.positive_column].tolist(),
+    }
@@ -0,0 +1,94 @@
+"""
+Stored predictions of the active model for every book.
+
+``score_catalogue`` runs after each scrape, after each training run and when a
+model version is activated. It reads and scores, in chunks of
+``SCORING_CHUNK_SIZE`` rows per ``predict_proba`` call, only the books whose
+stored prediction is out of date: never scored, changed by a scrape since
+(``updated_at > scored_at``) or scored by another model version. A new category shifts the category encoding of
+every book, so the whole catalogue is scored again in that case.
+
+The book endpoints then filter and sort on the stored columns (indexed on
+``(prediction, probability, id)``) without any inference on the request path.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import or_, update
+from sqlmodel import Session, select
+
+from api.config import settings
+from api.db import engine
+from api.models.book import Book
+from api.models.scoring_state import ScoringState
+from api.services.catalogue_service import catalogue_version
+from api.services.feature_service import MATRIX_COLUMNS, matrix_from_columns
+from api.services.model_registry import ModelNotFoundError, model_registry
+
+
+def categories_hash(categories: list[str]) -> str:
+    return hashlib.blake2b("\n".join(categories).encode(), digest_size=16).hexdigest()
+
+
+def stale_books(model_version: int):
+    """Books whose stored prediction does not reflect their data or ``model_version``."""
+    return or_(
+        Book.scored_at.is_(None),
+        Book.updated_at > Book.scored_at,
+        Book.model_version.is_(None),
+        Book.model_version != model_version,
+    )
+
+
+def score_catalogue(chunk_size: int | None = None) -> int:
+    """Score the out-of-date books with the active model. Returns how many were scored."""
+    chunk_size = chunk_size or settings.SCORING_CHUNK_SIZE
+    try:
+        model = model_registry.current()
+    except ModelNotFoundError:
+        print("🤖 Nenhum modelo treinado, predições não atualizadas")
+        return 0
+
+    start = time.perf_counter()
+    # taken before reading, so a book changed during the pass is scored again next time
+    scored_at = datetime.now(timezone.utc)
+    scored = 0
+    with Session(engine) as session:
+        unique_categories = session.exec(select(Book.category).distinct().order_by(Book.category)).all()
+        fingerprint = categories_hash(unique_categories)
+        state = session.get(ScoringState, 1) or ScoringState(id=1)
+
+        statement = select(*MATRIX_COLUMNS).order_by(Book.id)
+        if state.categories_hash == fingerprint:
+            statement = statement.where(stale_books(model.version))
+        # streamed like the export, so memory is bounded by one chunk; the updates run
+        # on the same connection and are committed with the state at the end, as a
+        # commit would close the cursor
+        result = session.execute(statement.execution_options(yield_per=chunk_size))
+
+        classes = model.estimator.classes_
+        for rows in result.partitions():
+            matrix = matrix_from_columns(*zip(*rows), unique_categories=unique_categories)
+            proba = model.estimator.predict_proba(model.check_input(matrix.X))
+            ids = matrix.ids.tolist()
+            predictions = classes[proba.argmax(axis=1)].tolist()
+            probabilities = proba[:, model.positive_column].tolist()
+            session.execute(update(Book), [
+                {"id": book_id, "prediction": prediction, "probability": probability,
+                 "model_version": model.version, "scored_at": scored_at}
+                for book_id, prediction, probability in zip(ids, predictions, probabilities)
+            ])
+            scored += len(ids)
+
+        state.categories_hash = fingerprint
+        state.scored_at = scored_at
+        session.add(state)
+        session.commit()
+
+    if scored:
+        # the book responses carry the predictions
+        catalogue_version.bump()
+    print(f"🤖 Predições atualizadas: {scored} livros (modelo v{model.version}, "
+          f"{time.perf_counter() - start:.2f}s)")
+    return scored
@@ -0,0 +1,62 @@
+import json
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import Depends
+from sqlmodel import Session, select
+
+from api.db import get_session
+from api.models.scrape_run import ScrapeRun
+
+JSON_FIELDS = ("stages", "status_counts", "failed_pages")
+
+
+def run_view(run: ScrapeRun) -> dict:
+    view = run.model_dump()
+    for field in JSON_FIELDS:
+        view[field] = json.loads(view[field])
+    return view
+
+
+class ScrapeRunService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def start_run(self, incremental: bool) -> ScrapeRun:
+        run = ScrapeRun(incremental=incremental)
+        self.session.add(run)
+        self.session.commit()
+        self.session.refresh(run)
+        return run
+
+    def finish_run(self, run_id: int, status: str, **values) -> ScrapeRun:
+        run = self.session.get(ScrapeRun, run_id)
+        finished_at = datetime.now(timezone.utc)
+        started_at = run.started_at if run.started_at.tzinfo else run.started_at.replace(tzinfo=timezone.utc)
+        for field in JSON_FIELDS:
+            if field in values:
+                values[field] = json.dumps(values[field])
+        for field, value in values.items():
+            setattr(run, field, value)
+        run.status = status
+        run.finished_at = finished_at
+        run.duration_seconds = round((finished_at - started_at).total_seconds(), 3)
+        self.session.add(run)
+        self.session.commit()
+        self.session.refresh(run)
+        return run
+
+    def get_run(self, run_id: int) -> ScrapeRun | None:
+        return self.session.get(ScrapeRun, run_id)
+
+    def list_runs(self, limit: int = 20, offset: int = 0,
+                  after: Optional[int] = None) -> list[ScrapeRun]:
+        """Most recent runs first. ``after`` is the id of the last run of the previous page."""
+        stmt = select(ScrapeRun).order_by(ScrapeRun.id.desc())
+        if after is not None:
+            stmt = stmt.where(ScrapeRun.id < after)
+        return self.session.exec(stmt.offset(offset).limit(limit)).all()
+
+
+def get_scrape_run_service(session: Session = Depends(get_session)) -> ScrapeRunService:
+    return ScrapeRunService(session)
@@ -0,0 +1,121 @@
+"""
+Full-text search over book titles and categories.
+
+SQLite uses the ``book_fts`` FTS5 table and Postgres the ``book.search_vector``
+tsvector column with its GIN index; both are created by migration 2 and kept in
+sync with ``book`` by triggers, so the scrape ingest updates them as it writes.
+Every search term is matched as an accent-insensitive prefix and results are
+ranked by relevance (title matches weigh more than category matches).
+"""
+import re
+
+from sqlalchemy import ColumnElement, and_, func, literal_column, table, column
+
+from api.models.book import Book
+
+book_fts = table("book_fts", column("rowid"), column("rank"))
+
+
+def search_terms(text: str | None) -> list[str]:
+    return re.findall(r"\w+", text.lower()) if text else []
+
+
+def fts5_query(title_terms: list[str], category_terms: list[str]) -> str:
+    """``title : ("a"* AND "b"*) AND category : ("c"*)``"""
+    groups = []
+    for name, terms in (("title", title_terms), ("category", category_terms)):
+        if terms:
+            phrases = " AND ".join(f'"{t}"*' for t in terms)
+            groups.append(f"{name} : ({phrases})")
+    return " AND ".join(groups)
+
+
+def tsquery(title_terms: list[str], category_terms: list[str]) -> str:
+    """``a:*A & b:*A & c:*B`` (title is weight A, category weight B)."""
+    return " & ".join(
+        [f"{t}:*A" for t in title_terms] + [f"{t}:*B" for t in category_terms]
+    )
+
+
+def search_clauses(dialect: str, title: str | None, category: str | None):
+    """
+    Return ``(join, where, rank)`` for a title/category search on ``dialect``.
+
+    ``join`` is a table to join on ``Book.id`` (or ``None``), ``where`` the match
+    condition and ``rank`` an expression where lower values are better matches.
+    Returns ``None`` when there is nothing to search for.
+    """
+    title_terms, category_terms = search_terms(title), search_terms(category)
+    if not title_terms and not category_terms:
+        return None
+
+    if dialect == "sqlite":
+        match = literal_column("book_fts").op("MATCH")(fts5_query(title_terms, category_terms))
+        return book_fts, match, book_fts.c.rank
+
+    if dialect == "postgresql":
+        vector = literal_column("book.search_vector")
+        query = func.to_tsquery("simple", func.unaccent(tsquery(title_terms, category_terms)))
+        return None, vector.op("@@")(query), -func.ts_rank(vector, query)
+
+    return None, like_filters(title_terms, category_terms), Book.id
+
+
+def like_filters(title_terms: list[str], category_terms: list[str]) -> ColumnElement:
+    filters = [func.lower(Book.title).like(f"%{t}%") for t in title_terms]
+    filters += [func.lower(Book.category).like(f"%{t}%") for t in category_terms]
+    return and_(*filters)
+
+
+SQLITE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5(
+        title, category,
+        content='book', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book BEGIN
+        INSERT INTO book_fts(rowid, title, category) VALUES (new.id, new.title, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book BEGIN
+        INSERT INTO book_fts(book_fts, rowid, title, category)
+        VALUES ('delete', old.id, old.title, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS book_fts_au AFTER UPDATE OF title, category ON book BEGIN
+        INSERT INTO book_fts(book_fts, rowid, title, category)
+        VALUES ('delete', old.id, old.title, old.category);
+        INSERT INTO book_fts(rowid, title, category) VALUES (new.id, new.title, new.category);
+    END
+    """,
+    "INSERT INTO book_fts(book_fts) VALUES ('rebuild')",
+    "INSERT INTO book_fts(book_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+]
+
+POSTGRES_FTS_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "ALTER TABLE book ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    CREATE OR REPLACE FUNCTION book_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', unaccent(coalesce(NEW.title, ''))), 'A') ||
+            setweight(to_tsvector('simple', unaccent(coalesce(NEW.category, ''))), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS book_search_vector_trigger ON book",
+    """
+    CREATE TRIGGER book_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, category ON book
+        FOR EACH ROW EXECUTE FUNCTION book_search_vector_update()
+    """,
+    "UPDATE book SET title = title",
+    "CREATE INDEX IF NOT EXISTS ix_book_search_vector ON book USING gin (search_vector)",
+]
@@ -0,0 +1,165 @@
+"""
+Materialized catalogue statistics.
+
+The aggregates behind ``/stats/overview`` and ``/stats/categories`` (book count,
+price sum, rating counts and per-category count/price sum) are stored as
+versioned rows of ``stats_snapshot``. A scrape applies the deltas of the rows
+it wrote to the latest snapshot and publishes a new version (a full scrape
+rebuilds the aggregates from the book table instead); the API serves the
+rendered snapshot from memory and only checks for a newer version every
+``STATS_REFRESH_SECONDS``.
+"""
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, func
+
+from api.db import engine, read_replicas
+from api.models.book import Book
+from api.models.stats_snapshot import StatsSnapshot
+
+STATS_REFRESH_SECONDS = 5.0
+
+
+def compute_aggregates(session: Session) -> dict:
+    """Full rebuild of the aggregates from the book table."""
+    categories = session.exec(
+        select(Book.category, func.count(), func.sum(Book.price)).group_by(Book.category)
+    ).all()
+    ratings = session.exec(select(Book.rating, func.count()).group_by(Book.rating)).all()
+    return {
+        "total_books": sum(count for _, count, _ in categories),
+        "price_sum": sum(price_sum or 0.0 for _, _, price_sum in categories),
+        "ratings": {str(rating): count for rating, count in ratings},
+        "categories": {category: [count, price_sum or 0.0] for category, count, price_sum in categories},
+    }
+
+
+def apply_changes(aggregates: dict, changes: list[tuple[dict | None, dict]]) -> dict:
+    """Apply the ``(old, new)`` book pairs collected by ``BookService.upsert_books``."""
+    for old, new in changes:
+        for book, sign in ((old, -1), (new, 1)):
+            if book is None:
+                continue
+            aggregates["total_books"] += sign
+            aggregates["price_sum"] += sign * book["price"]
+            rating = str(book["rating"])
+            aggregates["ratings"][rating] = aggregates["ratings"].get(rating, 0) + sign
+            category = aggregates["categories"].setdefault(book["category"], [0, 0.0])
+            category[0] += sign
+            category[1] += sign * book["price"]
+    return aggregates
+
+
+def render_overview(aggregates: dict) -> dict:
+    total = aggregates["total_books"]
+    return {
+        "total_books": total,
+        "average_price": round(aggregates["price_sum"] / total, 2) if total else 0.0,
+        "rating_distribution": [
+            {"rating": int(rating), "count": count}
+            for rating, count in sorted(aggregates["ratings"].items(), key=lambda item: int(item[0]))
+            if count > 0
+        ],
+    }
+
+
+def render_categories(aggregates: dict) -> list[dict]:
+    return [
+        {
+            "category": category,
+            "book_count": count,
+            "average_price": round(price_sum / count, 2) if count else 0.0,
+        }
+        for category, (count, price_sum) in sorted(aggregates["categories"].items())
+        if count > 0
+    ]
+
+
+def latest_snapshot(session: Session) -> StatsSnapshot | None:
+    return session.exec(select(StatsSnapshot).order_by(StatsSnapshot.version.desc()).limit(1)).first()
+
+
+def publish_snapshot(session: Session, changes: list | None = None) -> StatsSnapshot:
+    """
+    Store a new snapshot version: the latest one with ``changes`` applied, or a
+    full rebuild when there is no snapshot yet (or ``changes`` is ``None``).
+    """
+    latest = latest_snapshot(session)
+    if latest is None or changes is None:
+        aggregates = compute_aggregates(session)
+    else:
+        aggregates = apply_changes(json.loads(latest.aggregates), changes)
+
+    snapshot = StatsSnapshot(
+        version=(latest.version + 1) if latest else 1,
+        aggregates=json.dumps(aggregates),
+    )
+    session.add(snapshot)
+    session.commit()
+    session.refresh(snapshot)
+    stats_store.load(snapshot)
+    return snapshot
+
+
+@dataclass(frozen=True)
+class RenderedStats:
+    version: int
+    etag: str
+    overview: dict
+    categories: list[dict]
+
+
+class StatsStore:
+    """In-memory copy of the latest snapshot, rendered once per version."""
+
+    def __init__(self, refresh_seconds: float = STATS_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._stats: RenderedStats | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, snapshot: StatsSnapshot) -> RenderedStats:
+        aggregates = json.loads(snapshot.aggregates)
+        stats = RenderedStats(
+            version=snapshot.version,
+            etag=f'"stats-{snapshot.version}"',
+            overview=render_overview(aggregates),
+            categories=render_categories(aggregates),
+        )
+        with self._lock:
+            if self._stats is None or stats.version >= self._stats.version:
+                self._stats = stats
+            self._checked_at = time.monotonic()
+        return self._stats
+
+    def current(self) -> RenderedStats:
+        stats = self._stats
+        if stats is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return stats
+
+        # Another worker (or the scrape) may have published a newer version
+        with Session(read_replicas.engine()) as session:
+            version = session.exec(select(func.max(StatsSnapshot.version))).one()
+            if stats is not None and version == stats.version:
+                self._checked_at = time.monotonic()
+                return stats
+            snapshot = latest_snapshot(session)
+        if snapshot is None:
+            # the first version is published on the primary
+            with Session(engine) as session:
+                snapshot = latest_snapshot(session)
+                if snapshot is None:
+                    try:
+                        snapshot = publish_snapshot(session)
+                    except IntegrityError:
+                        # another worker published the first version concurrently
+                        session.rollback()
+                        snapshot = latest_snapshot(session)
+        return self.load(snapshot)
+
+
+stats_store = StatsStore()
@@ -0,0 +1,226 @@
+"""
+Background training jobs.
+
+``POST /ml/train-logistic`` only records a ``training_job`` row and hands the
+work to a process pool, so fitting never blocks an API worker. The job process
+reports each phase of ``train_logistic_model`` (with timings) on the row, which
+is also how a cancellation requested by any API worker reaches it: the job
+stops at the next phase boundary.
+
+While a job is queued or running its parameters are stored in the unique
+``active_key`` column, so identical requests, even from different workers,
+collapse into that job.
+"""
+import json
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from api.config import settings
+from api.db import engine
+from api.models.training_job import TrainingJob
+
+ACTIVE_STATUSES = ("queued", "running", "cancelling")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def params_key(test_size: float, seed: int) -> str:
+    return f"logistic:test_size={test_size}:seed={seed}"
+
+
+def job_view(job: TrainingJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "phase": job.phase,
+        "params": {"test_size": job.test_size, "seed": job.seed},
+        "timings": json.loads(job.timings),
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def finish_job(job_id: str, status: str, **values) -> None:
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        session.execute(
+            update(TrainingJob)
+            .where(TrainingJob.id == job_id, TrainingJob.status.in_(ACTIVE_STATUSES))
+            .values(status=status, phase="done", active_key=None, finished_at=now, updated_at=now, **values)
+        )
+        session.commit()
+
+
+def run_training_job(job_id: str, test_size: float, seed: int) -> None:
+    """Entry point of the job process."""
+    from api.services.ml_service import train_logistic_model
+
+    timings = {}
+    current = {"phase": None, "since": time.perf_counter()}
+
+    def close_phase():
+        if current["phase"] is not None:
+            timings[current["phase"]] = round(time.perf_counter() - current["since"], 4)
+
+    def progress(phase: str):
+        close_phase()
+        current.update(phase=None)
+        now = datetime.now(timezone.utc)
+        values = {"status": "running", "phase": phase, "timings": json.dumps(timings), "updated_at": now}
+        if len(timings) == 0:
+            values["started_at"] = now
+        with Session(engine) as session:
+            # conditional so a concurrent cancel is never overwritten
+            result = session.execute(
+                update(TrainingJob)
+                .where(TrainingJob.id == job_id, TrainingJob.status.in_(("queued", "running")))
+                .values(**values)
+            )
+            session.commit()
+        if result.rowcount == 0:
+            raise JobCancelled()
+        current.update(phase=phase, since=time.perf_counter())
+
+    try:
+        result = train_logistic_model(test_size=test_size, random_state=seed, progress=progress)
+    except JobCancelled:
+        close_phase()
+        finish_job(job_id, "cancelled", timings=json.dumps(timings))
+    except Exception as e:
+        close_phase()
+        finish_job(job_id, "failed", timings=json.dumps(timings), error=str(e))
+    else:
+        close_phase()
+        finish_job(job_id, "succeeded", timings=json.dumps(timings), result=json.dumps(result))
+        # the new version is active: refresh the stored predictions of the catalogue
+        from api.services.scoring_service import score_catalogue
+        score_catalogue()
+
+
+class TrainingJobManager:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: the API process runs threads, forking it is unsafe
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken pool so the next submit starts a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def get(self, job_id: str) -> TrainingJob | None:
+        with Session(engine) as session:
+            return session.get(TrainingJob, job_id)
+
+    def submit(self, test_size: float, seed: int) -> tuple[TrainingJob, bool]:
+        """Queue a job, or return the active one with the same parameters. Returns ``(job, created)``."""
+        key = params_key(test_size, seed)
+        while True:
+            job = TrainingJob(id=uuid.uuid4().hex, test_size=test_size, seed=seed, active_key=key)
+            with Session(engine) as session:
+                session.add(job)
+                try:
+                    session.commit()
+                    session.refresh(job)
+                    break
+                except IntegrityError:
+                    session.rollback()
+                    existing = session.exec(select(TrainingJob).where(TrainingJob.active_key == key)).first()
+            if existing is None:
+                continue
+            if not self._is_stale(existing):
+                return existing, False
+            # its process died without reporting back
+            finish_job(existing.id, "failed", error="Job sem atualização, considerado abandonado")
+
+        # a worker that crashed breaks the whole pool: retry once on a fresh one
+        for attempt in range(2):
+            executor = self._pool()
+            try:
+                future = executor.submit(run_training_job, job.id, test_size, seed)
+                break
+            except BrokenProcessPool:
+                self._discard(executor)
+                if attempt:
+                    return self._submit_failed(job.id, "Pool de treino indisponível"), True
+            except Exception as e:
+                self._discard(executor)
+                return self._submit_failed(job.id, str(e)), True
+        self._futures[job.id] = future
+        future.add_done_callback(lambda f, job_id=job.id: self._on_done(job_id, executor, f))
+        return job, True
+
+    def _submit_failed(self, job_id: str, error: str) -> TrainingJob:
+        # frees active_key, or identical requests would wait on a job that never runs
+        finish_job(job_id, "failed", error=error)
+        return self.get(job_id)
+
+    def cancel(self, job_id: str) -> TrainingJob | None:
+        job = self.get(job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return job
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            finish_job(job_id, "cancelled")
+        else:
+            # running, or queued in another API worker: the job process stops
+            # at its next phase
+            with Session(engine) as session:
+                session.execute(
+                    update(TrainingJob)
+                    .where(TrainingJob.id == job_id, TrainingJob.status.in_(ACTIVE_STATUSES))
+                    .values(status="cancelling", updated_at=datetime.now(timezone.utc))
+                )
+                session.commit()
+        return self.get(job_id)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _on_done(self, job_id: str, executor: ProcessPoolExecutor, future: Future) -> None:
+        self._futures.pop(job_id, None)
+        if not future.cancelled() and future.exception() is not None:
+            # the process itself failed (e.g. killed), so it could not report
+            finish_job(job_id, "failed", error=str(future.exception()) or type(future.exception()).__name__)
+            if isinstance(future.exception(), BrokenProcessPool):
+                self._discard(executor)
+
+    @staticmethod
+    def _is_stale(job: TrainingJob) -> bool:
+        updated_at = job.updated_at
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        timeout = timedelta(seconds=settings.TRAINING_JOB_TIMEOUT_SECONDS)
+        return datetime.now(timezone.utc) - updated_at > timeout
+
+
+training_jobs = TrainingJobManager(settings.TRAINING_WORKERS)
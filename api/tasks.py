@@ -1,28 +1,36 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 
 from sqlmodel import Session
 
+from api.config import settings
 from api.db import engine
 from api.services.book_service import BookService
+from api.services.catalogue_service import catalogue_version
 from api.services.category_service import CategoryService
-from scripts.scrape_books import list_categories, list_books_urls_by_category, fetch_book
+from api.services.page_state_service import PageStateService
+from api.services.scrape_run_service import ScrapeRunService
+from api.services.scoring_service import score_catalogue
+from api.services.stats_service import publish_snapshot
+from scripts.crawler import AsyncCrawler
 
-BASE_URL = "https://books.toscrape.com/"
+# Scrapes come from three scheduler jobs (hourly, nightly full, /scraping/trigger)
+# that may overlap; the stats deltas of one run assume the snapshot of the last.
+scrape_lock = asyncio.Lock()
 
-def perform_initial_scrape():
+async def perform_initial_scrape():
     print("🚀 Performing Initial Scrapping...")
+    if await asyncio.to_thread(has_categories):
+        print("Skipped Initial Scrapping Since the data already exists!")
+        return
+    await perform_scrape(incremental=False)
+
+def has_categories() -> bool:
     with Session(engine) as session:
         category_service = CategoryService(session)
-        if len(category_service.list_categories()) > 0:
-            print("Skipped Initial Scrapping Since the data already exists!")
-            return
-    perform_scrape()
-
-def perform_scrape():
-    categories = list_categories()
+        return len(category_service.list_categories()) > 0
 
+def save_categories(categories: list[dict]):
     with Session(engine) as session:
-        book_service = BookService(session)
         category_service = CategoryService(session)
 
         print("🚀 Atualizando Categorias...")
@@ -34,22 +42,178 @@ def perform_scrape():
                 'name': category['name']
             })
 
-        print("🚀 Listando URLs dos livros...")
-        books_urls = []
-        with ThreadPoolExecutor(max_workers=30) as executor:
-            futures = {executor.submit(list_books_urls_by_category, category['link']): category for category in categories}
-            for future in as_completed(futures):
-                result = future.result()
-                books_urls.extend(result)
-
-        # Retrieve the books in parallel
-        print("🚀 Atualizando Livros...")
-        with ThreadPoolExecutor(max_workers=30) as executor:
-            futures = {executor.submit(fetch_book, url): url for url in books_urls}
-            for future in as_completed(futures):
-                result = future.result()
-
-                book = book_service.create_book(**result)
-                print(f"{'🔄 Atualizado' if book.id else '✔ Salvo'}: {result['title']}")
-
-    print("✅ Job de scraping concluído.")
+def write_books(rows: list[dict], changes: list) -> dict:
+    chunk_changes = []
+    with Session(engine) as session:
+        book_service = BookService(session)
+        result = book_service.upsert_books(rows, chunk_changes)
+    # only once committed: a failed chunk must not reach the stats
+    changes.extend(chunk_changes)
+    print(f"📦 Lote de {len(rows)} livros: {result['inserted']} novos, "
+          f"{result['updated']} atualizados, {result['unchanged']} inalterados")
+    return result
+
+def load_page_states() -> tuple[dict, set]:
+    with Session(engine) as session:
+        page_state_service = PageStateService(session)
+        return page_state_service.load_states(), page_state_service.known_books()
+
+def save_page_states(states: dict):
+    with Session(engine) as session:
+        PageStateService(session).save_states(states)
+
+def start_scrape_run(incremental: bool) -> int:
+    with Session(engine) as session:
+        return ScrapeRunService(session).start_run(incremental).id
+
+def finish_scrape_run(run_id: int, status: str, values: dict):
+    with Session(engine) as session:
+        ScrapeRunService(session).finish_run(run_id, status, **values)
+
+def scrape_run_telemetry(crawler: AsyncCrawler | None, categories: list, totals: dict, scored: int) -> dict:
+    values = {
+        "categories": len(categories),
+        "books_crawled": sum(totals.values()),
+        "scored": scored,
+        **totals,
+    }
+    if crawler is not None:
+        values.update(
+            requests=crawler.stats["requests"],
+            retries=crawler.stats["retries"],
+            bytes_fetched=crawler.stats["bytes"],
+            pages_changed=crawler.stats["pages_changed"],
+            pages_skipped=crawler.stats["pages_skipped"],
+            failures=crawler.stats["failures"],
+            stages=crawler.timings.as_dict(),
+            status_counts=dict(crawler.status_counts),
+            failed_pages=crawler.failed,
+        )
+    return values
+
+def publish_changes(changes: list, rebuild: bool = False):
+    try:
+        with Session(engine) as session:
+            # a rebuild recomputes the aggregates from the table, repairing any drift
+            snapshot = publish_snapshot(session, None if rebuild else changes)
+        print(f"📊 Estatísticas atualizadas (versão {snapshot.version})")
+    finally:
+        # the rows are committed: invalidate the cached responses in every worker
+        # (and move the replicas' version guard) even if the snapshot failed
+        version = catalogue_version.bump()
+        print(f"📚 Catálogo na versão {version}")
+
+async def ingest_books(crawler: AsyncCrawler, categories: list[dict], totals: dict, changes: list) -> None:
+    """
+    Last stage of the scrape pipeline: a single writer upserts the crawled books in
+    chunks of ``SCRAPE_INGEST_CHUNK_SIZE`` while the crawl keeps fetching and
+    parsing the next ones. Counts are added to ``totals`` and the changes of the
+    committed chunks to ``changes`` as they go, so they survive a failed run.
+    """
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=settings.SCRAPE_WRITE_QUEUE_SIZE)
+
+    async def writer():
+        while (chunk := await chunks.get()) is not None:
+            with crawler.timings.measure("write"):
+                result = await asyncio.to_thread(write_books, chunk, changes)
+            for key, count in result.items():
+                totals[key] += count
+
+    async def send(chunk: list | None):
+        # waits for the writer too: if it died (e.g. "database is locked") the
+        # queue never drains, so its error is raised here instead
+        put = asyncio.create_task(chunks.put(chunk))
+        await asyncio.wait({put, writer_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            await writer_task
+
+    writer_task = asyncio.create_task(writer())
+    try:
+        chunk = []
+        async for result in crawler.crawl(categories, settings.SCRAPE_FETCH_WORKERS):
+            chunk.append(result)
+            if len(chunk) >= settings.SCRAPE_INGEST_CHUNK_SIZE:
+                await send(chunk)
+                chunk = []
+        if chunk:
+            await send(chunk)
+        await send(None)
+        await writer_task
+    finally:
+        writer_task.cancel()
+
+async def perform_scrape(incremental: bool | None = None):
+    # Network I/O runs on the scheduler's event loop, parsing in a process pool
+    # and the blocking DB calls in worker threads.
+    if incremental is None:
+        incremental = settings.SCRAPE_INCREMENTAL
+    if scrape_lock.locked():
+        print("⏳ Outro scraping em andamento, aguardando...")
+    async with scrape_lock:
+        await _perform_scrape(incremental)
+
+async def _perform_scrape(incremental: bool):
+    run_id = await asyncio.to_thread(start_scrape_run, incremental)
+    crawler = None
+    categories, totals, scored = [], {"inserted": 0, "updated": 0, "unchanged": 0}, 0
+    changes = []
+    status, error = "failed", None
+    try:
+        # A full crawl still records validators so the next incremental run can use them
+        page_states, known_books = await asyncio.to_thread(load_page_states)
+        crawler = AsyncCrawler(
+            settings.SCRAPE_BASE_URL,
+            max_connections=settings.SCRAPE_MAX_CONNECTIONS,
+            per_host_limit=settings.SCRAPE_PER_HOST_LIMIT,
+            queue_size=settings.SCRAPE_QUEUE_SIZE,
+            page_states=page_states if incremental else {},
+            known_books=known_books if incremental else set(),
+            parser=settings.SCRAPE_PARSER,
+            parse_workers=settings.SCRAPE_PARSE_WORKERS,
+            max_failures=settings.SCRAPE_RUN_MAX_FAILURES,
+        )
+        async with crawler:
+            categories = await crawler.list_categories()
+            if not categories:
+                error = "Homepage inacessível"
+                return
+
+            await asyncio.to_thread(save_categories, categories)
+
+            print("🚀 Atualizando Livros...")
+            await ingest_books(crawler, categories, totals, changes)
+
+            # saved after the books so a failed write is retried on the next run
+            if crawler.page_updates:
+                await asyncio.to_thread(save_page_states, crawler.page_updates)
+
+        # re-scores the books this run changed (and any left by a model change)
+        scored = await asyncio.to_thread(score_catalogue)
+        status = "succeeded"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        try:
+            # chunks are committed as they are written, so a failed run still
+            # publishes the stats of the ones that made it; a full crawl rebuilds them
+            rebuild = not incremental and status == "succeeded"
+            if changes or rebuild:
+                await asyncio.to_thread(publish_changes, changes, rebuild)
+        except Exception as e:
+            status, error = "failed", error or f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            await asyncio.to_thread(
+                finish_scrape_run, run_id, status,
+                {"error": error, **scrape_run_telemetry(crawler, categories, totals, scored)},
+            )
+
+    print(f"✅ Job de scraping concluído: {totals['inserted']} novos, "
+          f"{totals['updated']} atualizados, {totals['unchanged']} inalterados.")
+    print(f"🔁 Páginas: {crawler.stats['pages_changed']} alteradas, "
+          f"{crawler.stats['pages_skipped']} sem alteração "
+          f"({'incremental' if incremental else 'completo'}, {crawler.stats['bytes']} bytes baixados)")
+    print(f"⏱️ Execução {run_id}: {crawler.stats['requests']} requisições, "
+          f"{crawler.stats['failures']} falhas, detalhes em /api/v1/scraping/runs/{run_id}")
@@ -0,0 +1,72 @@
+"""
+Offline crawl benchmark: thread-pool scraper vs. the asyncio crawler, parsing in
+a thread and in a process pool.
+
+Both strategies crawl the synthetic catalogue served by ``benchmarks.fixture_site``
+and report wall time, books/sec and how many TCP connections the server accepted::
+
+    python -m benchmarks.crawl --books 1000 --parser bs4 --parse-workers 4
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fixture_site import Catalogue, FixtureSite
+from scripts import scrape_books
+from scripts.crawler import AsyncCrawler
+
+
+def crawl_threads(base_url: str, workers: int = 30, parser: str | None = None) -> int:
+    categories = scrape_books.list_categories(base_url, parser)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        books_urls = [url for urls in executor.map(lambda link: scrape_books.list_books_urls_by_category(link, parser),
+                                                   [c["link"] for c in categories])
+                      for url in urls]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(1 for book in executor.map(lambda url: scrape_books.fetch_book(url, parser), books_urls) if book)
+
+
+async def crawl_async(base_url: str, max_connections: int = 20,
+                      parser: str | None = None, parse_workers: int = 0) -> int:
+    async with AsyncCrawler(base_url, max_connections=max_connections,
+                            parser=parser, parse_workers=parse_workers) as crawler:
+        categories = await crawler.list_categories()
+        return len([book async for book in crawler.crawl(categories)])
+
+
+def run(name: str, site: FixtureSite, crawl) -> dict:
+    site.connections = site.requests = 0
+    start = time.perf_counter()
+    books = crawl()
+    elapsed = time.perf_counter() - start
+    result = {
+        "strategy": name,
+        "books": books,
+        "seconds": round(elapsed, 3),
+        "books_per_sec": round(books / elapsed, 1),
+        "requests": site.requests,
+        "connections": site.connections,
+    }
+    print(result)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--parser", default=None, help="parser backend (see scripts.parsers)")
+    parser.add_argument("--parse-workers", type=int, default=4, help="processes of the pipelined run")
+    args = parser.parse_args()
+
+    with FixtureSite(Catalogue(args.books, args.categories)) as site:
+        run("threads", site, lambda: crawl_threads(site.base_url, parser=args.parser))
+        run("asyncio", site, lambda: asyncio.run(crawl_async(site.base_url, args.connections, args.parser)))
+        run(f"asyncio+{args.parse_workers} processes", site, lambda: asyncio.run(
+            crawl_async(site.base_url, args.connections, args.parser, args.parse_workers)))
+
+
+if __name__ == "__main__":
+    main()
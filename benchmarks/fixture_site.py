@@ -0,0 +1,282 @@
+"""
+Local stand-in for books.toscrape.com.
+
+Serves a deterministic catalogue rendered with the same markup as the real site
+(home page with the category sidebar, paginated category listings and product
+pages), so the scraper can be benchmarked without network access::
+
+    python -m benchmarks.fixture_site --books 1000 --port 8765
+
+The server speaks HTTP/1.1 with keep-alive and counts the TCP connections it
+accepts, which makes connection reuse visible in the benchmarks. Pages carry an
+``ETag`` and conditional requests get a 304, like the real site.
+
+Instead of the synthetic catalogue it can replay pages saved from the real site
+by ``benchmarks.recorder``, and it can slow responses down or fail some of them
+to see how the scraper copes::
+
+    python -m benchmarks.fixture_site --recording data/recording --latency-ms 50 --error-rate 0.02
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RATINGS = ["One", "Two", "Three", "Four", "Five"]
+PAGE_SIZE = 20
+
+
+class Catalogue:
+    def __init__(self, books: int = 1000, categories: int = 50):
+        self.categories = [
+            {"name": f"Category {c}", "slug": f"category-{c}_{c + 2}"}
+            for c in range(categories)
+        ]
+        self.books = [
+            {
+                "id": b,
+                "slug": f"book-{b}_{b}",
+                "title": f"Book {b}",
+                "price": f"£{10 + (b * 37) % 4000 / 100:.2f}",
+                "rating": RATINGS[b % 5],
+                "stock": b % 23,
+                "category": self.categories[b % categories],
+            }
+            for b in range(1, books + 1)
+        ]
+        self.by_category = {c["slug"]: [] for c in self.categories}
+        for book in self.books:
+            self.by_category[book["category"]["slug"]].append(book)
+        self.by_slug = {b["slug"]: b for b in self.books}
+
+    def render(self, path: str) -> str | None:
+        parts = [p for p in path.split("?")[0].split("/") if p]
+        if parts in ([], ["index.html"]):
+            return self.home()
+        if parts[:3] == ["catalogue", "category", "books"] and len(parts) == 5:
+            return self.listing(parts[3], parts[4])
+        if parts[0] == "catalogue" and len(parts) == 3 and parts[2] == "index.html":
+            book = self.by_slug.get(parts[1])
+            return self.product(book) if book else None
+        return None
+
+    def home(self) -> str:
+        links = "".join(
+            f'<li><a href="catalogue/category/books/{c["slug"]}/index.html">\n'
+            f'    {c["name"]}\n</a></li>'
+            for c in self.categories
+        )
+        return _page(
+            '<div class="side_categories"><ul class="nav nav-list"><li>'
+            '<a href="catalogue/category/books_1/index.html">Books</a>'
+            f"<ul>{links}</ul></li></ul></div>"
+        )
+
+    def listing(self, slug: str, page_name: str) -> str | None:
+        books = self.by_category.get(slug)
+        if books is None:
+            return None
+        page = 1 if page_name == "index.html" else int(page_name[5:-5])
+        chunk = books[(page - 1) * PAGE_SIZE: page * PAGE_SIZE]
+        if not chunk and page > 1:
+            return None
+        pods = "".join(
+            '<li><article class="product_pod">'
+            f'<h3><a href="../../../{b["slug"]}/index.html" title="{b["title"]}">{b["title"]}</a></h3>'
+            f'<p class="price_color">{b["price"]}</p>'
+            "</article></li>"
+            for b in chunk
+        )
+        pager = ""
+        if page * PAGE_SIZE < len(books):
+            pager = f'<ul class="pager"><li class="next"><a href="page-{page + 1}.html">next</a></li></ul>'
+        return _page(f'<ol class="row">{pods}</ol>{pager}')
+
+    def product(self, book: dict) -> str:
+        category = book["category"]
+        return _page(
+            '<ul class="breadcrumb">'
+            '<li><a href="../../index.html">Home</a></li>'
+            '<li><a href="../category/books_1/index.html">Books</a></li>'
+            f'<li><a href="../category/books/{category["slug"]}/index.html">{category["name"]}</a></li>'
+            f'<li class="active">{book["title"]}</li></ul>'
+            '<div class="carousel-inner"><div class="item active">'
+            f'<img src="../../media/cache/{book["id"] % 97:02x}/{book["id"] % 89:02x}/{book["id"]}.jpg" '
+            f'alt="{book["title"]}" /></div></div>'
+            f'<div class="col-sm-6 product_main"><h1>{book["title"]}</h1>'
+            f'<p class="price_color">{book["price"]}</p>'
+            '<p class="instock availability">\n    <i class="icon-ok"></i>\n    \n'
+            f'        In stock ({book["stock"]} available)\n    \n</p>'
+            f'<p class="star-rating {book["rating"]}"><i class="icon-star"></i></p></div>'
+        )
+
+
+class RecordedSite:
+    """Pages saved by ``benchmarks.recorder``, served in place of a :class:`Catalogue`."""
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        with open(os.path.join(self.directory, "manifest.json")) as f:
+            self.manifest = json.load(f)
+
+    def render(self, path: str) -> str | None:
+        relative = recording_path(path)
+        file_path = os.path.abspath(os.path.join(self.directory, "pages", relative))
+        if not file_path.startswith(self.directory + os.sep) or not os.path.isfile(file_path):
+            return None
+        with open(file_path, encoding="utf-8") as f:
+            return f.read()
+
+
+def recording_path(url_path: str) -> str:
+    """File of a URL path inside a recording: ``/`` -> ``index.html``."""
+    path = unquote(url_path.split("?")[0]).lstrip("/")
+    if not path or path.endswith("/"):
+        path += "index.html"
+    return path
+
+
+def _page(body: str) -> str:
+    return (
+        '<!DOCTYPE html><html lang="en-us"><head><meta charset="utf-8" />'
+        "<title>All products | Books to Scrape - Sandbox</title></head>"
+        f'<body><div class="container-fluid page"><div class="page_inner">{body}</div></div></body></html>'
+    )
+
+
+class FixtureSite:
+    """
+    Threaded HTTP server for a :class:`Catalogue` (or a :class:`RecordedSite`),
+    usable as a context manager.
+
+    Every response waits ``latency_ms`` plus up to ``jitter_ms`` and a share
+    ``error_rate`` of the requests get a ``503``, drawn from ``seed``.
+    """
+
+    def __init__(self, catalogue: Catalogue | RecordedSite | None = None, host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.catalogue = catalogue or Catalogue()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.errors = 0
+        self.connections = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out in separate writes; with Nagle on, keep-alive
+            # clients wait ~40 ms for the delayed ACK on every response
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with site._lock:
+                    site.connections += 1
+
+            def do_GET(self):
+                with site._lock:
+                    delay = site.latency_ms + site._random.random() * site.jitter_ms
+                    fail = site.error_rate and site._random.random() < site.error_rate
+                if delay:
+                    time.sleep(delay / 1000)
+                if fail:
+                    with site._lock:
+                        site.requests += 1
+                        site.errors += 1
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                html = site.catalogue.render(self.path)
+                body = (html or "<h1>404 Not Found</h1>").encode("utf-8")
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if html and self.headers.get("If-None-Match") == etag:
+                    with site._lock:
+                        site.requests += 1
+                        site.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                with site._lock:
+                    site.requests += 1
+                    site.bytes_sent += len(body)
+                self.send_response(200 if html else 404)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                if html:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic books.toscrape.com catalogue")
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--recording", help="serve the pages saved by benchmarks.recorder in this directory")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    args = parser.parse_args()
+
+    source = RecordedSite(args.recording) if args.recording else Catalogue(args.books, args.categories)
+    site = FixtureSite(source, args.host, args.port, latency_ms=args.latency_ms,
+                       jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    if args.recording:
+        print(f"Serving {source.manifest['pages']} recorded pages of {source.manifest['base_url']} at {site.base_url}")
+    else:
+        print(f"Serving {args.books} books at {site.base_url}")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        site.stop()
+
+
+if __name__ == "__main__":
+    main()
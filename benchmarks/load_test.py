@@ -0,0 +1,382 @@
+"""
+API load test with a latency regression check.
+
+Seeds a synthetic catalogue of ``--books`` books (10k, 100k, 1M...) into SQLite
+or Postgres, trains and scores a model so the ML routes have one, starts the
+API under uvicorn and drives every route with ``--concurrency`` clients for
+``--duration`` seconds each. The clients log in through ``/api/v1/auth/login``
+like a real user, and vary ids, pages and filters so the response cache does not
+answer everything. Per route it reports throughput, p50/p95/p99/max latency and
+errors, plus ``health_p95_ms``: the latency of ``/api/v1/health`` polled during
+the load, which grows when handlers block the server's event loop::
+
+    python -m benchmarks.load_test --books 100000 --save-baseline load-baseline.json
+    python -m benchmarks.load_test --books 100000 --baseline load-baseline.json --threshold 0.2
+
+With ``--baseline`` the run fails (exit status 1) when a route's p95 latency
+grows, or its throughput drops, by more than ``--threshold`` (20% by default),
+or its error rate grows by more than a percentage point.
+
+SQLite databases are kept in ``data/loadtest/``, with their model, and reused
+while they hold ``--books`` books (``--reseed`` rebuilds them); pass
+``--database-url`` to use Postgres, and ``--replica-url`` for its read replicas.
+``--sqlite-replicas N`` serves the reads from N copies of the SQLite file. The
+clients share the machine with the server, so compare baselines taken on the
+same hardware.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable
+
+import httpx
+import numpy as np
+
+ADMIN_PASSWORD = "loadtest"
+SEED_CHUNK_SIZE = 20_000
+PROBE_INTERVAL = 0.01
+
+
+# --- catalogue --------------------------------------------------------------
+
+def synthetic_books(start: int, stop: int, categories: int) -> list[dict]:
+    return [
+        {
+            "title": f"Book {b} {('Light', 'Dark', 'Red', 'Blue', 'Old')[b % 5]} {('Attic', 'River', 'Night', 'City')[b % 4]}",
+            "price": 10 + (b * 37) % 4000 / 100,
+            "rating": b % 5 + 1,
+            "availability": f"In stock ({b % 23} available)" if b % 11 else "Out of stock",
+            "category": f"Category {b % categories}",
+            "image_url": f"https://example.com/{b}.jpg",
+            "detail_page": f"https://example.com/catalogue/book-{b}/index.html",
+        }
+        for b in range(start, stop)
+    ]
+
+
+def seed_catalogue(books: int, categories: int, reseed: bool) -> None:
+    """Fill the database the API modules point at (``DATABASE_URL``) and train a model."""
+    from sqlalchemy import delete, insert
+    from sqlmodel import Session, func, select
+
+    from api.db import engine, init_db
+    from api.models.book import Book
+    from api.models.category import Category
+    from api.services.catalogue_service import catalogue_version
+    from api.services.ml_service import train_logistic_model
+    from api.services.model_registry import ModelNotFoundError, model_registry
+    from api.services.scoring_service import score_catalogue
+    from api.services.stats_service import publish_snapshot
+
+    init_db()
+    with Session(engine) as session:
+        existing = session.exec(select(func.count()).select_from(Book)).one()
+        seeded = existing != books or reseed
+        if seeded:
+            session.execute(delete(Book))
+            session.execute(delete(Category))
+            session.commit()
+
+            start = time.perf_counter()
+            session.execute(insert(Category), [{"name": f"Category {c}"} for c in range(categories)])
+            for first in range(0, books, SEED_CHUNK_SIZE):
+                session.execute(insert(Book), synthetic_books(first, min(first + SEED_CHUNK_SIZE, books), categories))
+                session.commit()
+            publish_snapshot(session)
+            print(f"Seeded {books} books in {time.perf_counter() - start:.1f}s")
+            catalogue_version.bump()
+        else:
+            print(f"Reusing the seeded catalogue of {books} books")
+
+    try:
+        model_registry.get()
+        trained = True
+    except ModelNotFoundError:
+        trained = False
+    if seeded or not trained:
+        result = train_logistic_model(n_jobs=1)
+        print(f"Trained model v{result['model_version']} (accuracy {result['accuracy']})")
+    score_catalogue()
+
+
+def copy_sqlite_replicas(database_url: str, count: int) -> list[str]:
+    """Copies of the seeded SQLite file to serve as read replicas (nothing replicates to them)."""
+    source_path = database_url.removeprefix("sqlite:///")
+    urls = []
+    with contextlib.closing(sqlite3.connect(source_path)) as source:
+        for number in range(1, count + 1):
+            path = f"{os.path.splitext(source_path)[0]}-replica-{number}.db"
+            with contextlib.closing(sqlite3.connect(path)) as target:
+                source.backup(target)
+            urls.append(f"sqlite:///{path}")
+    return urls
+
+
+# --- routes -----------------------------------------------------------------
+
+@dataclass
+class Route:
+    name: str
+    method: str
+    # (rng, number of books, number of categories) -> (path, json body)
+    request: Callable[[random.Random, int, int], tuple[str, dict | None]]
+
+
+def _prediction_batch(rng: random.Random, categories: int) -> dict:
+    return {"batch": [[round(rng.uniform(10, 50), 2), rng.randint(1, 5), rng.randint(0, 22), rng.randrange(categories)]
+                      for _ in range(10)]}
+
+
+ROUTES = [
+    Route("books_get", "GET", lambda rng, n, c: (f"/api/v1/books/{rng.randint(1, n)}", None)),
+    Route("books_search", "GET", lambda rng, n, c: (
+        f"/api/v1/books/search?title={rng.choice(['light', 'dark attic', 'river', 'blue night'])}"
+        f"&page={rng.randint(1, 20)}&size=20", None)),
+    Route("books_top_rated", "GET", lambda rng, n, c: (f"/api/v1/books/top-rated?page={rng.randint(1, 50)}&size=20", None)),
+    Route("books_price_range", "GET", lambda rng, n, c: (
+        f"/api/v1/books/price-range?min={(low := rng.randint(10, 45))}&max={low + 5}&page={rng.randint(1, 20)}", None)),
+    Route("books_predicted", "GET", lambda rng, n, c: (
+        f"/api/v1/books/predicted?label={rng.randint(0, 1)}&page={rng.randint(1, 50)}&size=20", None)),
+    Route("stats_overview", "GET", lambda rng, n, c: ("/api/v1/stats/overview", None)),
+    Route("stats_categories", "GET", lambda rng, n, c: ("/api/v1/stats/categories", None)),
+    Route("categories", "GET", lambda rng, n, c: ("/api/v1/categories/", None)),
+    Route("ml_predictions", "POST", lambda rng, n, c: ("/api/v1/ml/predictions", _prediction_batch(rng, c))),
+    Route("ml_predictions_books", "POST", lambda rng, n, c: (
+        "/api/v1/ml/predictions/books", {"ids": [rng.randint(1, n) for _ in range(10)]})),
+    # the whole catalogue per request; only meant for small catalogues
+    Route("books_list", "GET", lambda rng, n, c: ("/api/v1/books/", None)),
+]
+DEFAULT_ROUTES = [route.name for route in ROUTES if route.name != "books_list"]
+
+
+# --- server -----------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(env: dict, port: int, workers: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--no-access-log", "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/v1/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.kill()
+    raise RuntimeError("uvicorn did not start in 120s")
+
+
+# --- load -------------------------------------------------------------------
+
+async def login(client: httpx.AsyncClient) -> dict:
+    resp = await client.post("/api/v1/auth/login", data={"username": "admin", "password": ADMIN_PASSWORD})
+    resp.raise_for_status()
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+async def drive(client: httpx.AsyncClient, probe_client: httpx.AsyncClient, route: Route, books: int,
+                categories: int, concurrency: int, duration: float, seed: int) -> dict:
+    latencies: list[float] = []
+    probes: list[float] = []
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def user(number: int):
+        rng = random.Random(seed * 1000 + number)
+        while time.perf_counter() < deadline:
+            path, body = route.request(rng, books, categories)
+            start = time.perf_counter()
+            try:
+                resp = await client.request(route.method, path, json=body)
+                statuses[str(resp.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    async def probe():
+        # /health touches neither the database nor auth: its latency under load is
+        # the time requests wait for the server's event loop
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await probe_client.get("/api/v1/health")
+                probes.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(PROBE_INTERVAL)
+
+    start = time.perf_counter()
+    await asyncio.gather(probe(), *(user(number) for number in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if latencies else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "health_p95_ms": round(float(np.percentile(probes, 95)) * 1000, 2) if probes else 0.0,
+        "statuses": dict(statuses),
+    }
+
+
+async def run_load(base_url: str, routes: list[Route], books: int, categories: int,
+                   concurrency: int, duration: float, warmup: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client, \
+            httpx.AsyncClient(base_url=base_url, timeout=60) as probe_client:
+        client.headers.update(await login(client))
+        results = {}
+        for route in routes:
+            args = (client, probe_client, route, books, categories, concurrency)
+            if warmup:
+                await drive(*args, warmup, seed=0)
+            results[route.name] = await drive(*args, duration, seed=1)
+            print(route.name, {k: v for k, v in results[route.name].items() if k != "statuses"}, flush=True)
+        return results
+
+
+# --- baseline ---------------------------------------------------------------
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    found = []
+    for name, result in results.items():
+        before = baseline["routes"].get(name)
+        if before is None:
+            continue
+        if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            found.append(f"{name}: p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+        if before["rps"] and result["rps"] < before["rps"] * (1 - threshold):
+            found.append(f"{name}: throughput {before['rps']} -> {result['rps']} req/s")
+        if result["error_rate"] > before["error_rate"] + 0.01:
+            found.append(f"{name}: error rate {before['error_rate']:.2%} -> {result['error_rate']:.2%}")
+    return found
+
+
+def print_table(results: dict, baseline: dict | None) -> None:
+    columns = ("rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "error_rate", "health_p95_ms")
+    print(f"\n{'route':<24}" + "".join(f"{column:>14}" for column in columns))
+    for name, result in results.items():
+        print(f"{name:<24}" + "".join(f"{result[column]:>14}" for column in columns))
+        before = baseline and baseline["routes"].get(name)
+        if before:
+            print(f"{'  baseline':<24}" + "".join(f"{before.get(column, 'n/a'):>14}" for column in columns))
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--database-url", help="default: a SQLite file in data/loadtest/")
+    parser.add_argument("--reseed", action="store_true", help="rebuild the catalogue even if it has --books books")
+    parser.add_argument("--replica-url", action="append", default=[], help="read replica of the database (repeatable)")
+    parser.add_argument("--sqlite-replicas", type=int, default=0, help="serve reads from N copies of the SQLite file")
+    parser.add_argument("--routes", nargs="+", choices=[route.name for route in ROUTES], default=DEFAULT_ROUTES)
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent authenticated clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per route")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unrecorded seconds of load before each route")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with this JSON file and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative p95/throughput regression")
+    args = parser.parse_args()
+
+    os.makedirs("data/loadtest", exist_ok=True)
+    database_url = args.database_url or f"sqlite:///data/loadtest/books-{args.books}.db"
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "loadtest"),
+        "ADMIN_PASSWORD": ADMIN_PASSWORD,
+        # next to the seeded database, so a reused catalogue keeps its model
+        "MODEL_DIR": f"data/loadtest/models-{args.books}",
+        "METRICS_DIR": os.path.join(workdir, "metrics"),
+        "CACHE_SQLITE_PATH": os.path.join(workdir, "response_cache.db"),
+        # nothing to scrape: a scheduled run fails at once instead of reaching the real site
+        "SCRAPE_BASE_URL": "http://127.0.0.1:9/",
+    }
+    os.environ.update(env)
+    seed_catalogue(args.books, args.categories, args.reseed)
+    replica_urls = args.replica_url
+    if args.sqlite_replicas:
+        replica_urls = replica_urls + copy_sqlite_replicas(database_url, args.sqlite_replicas)
+    env["DATABASE_REPLICA_URLS"] = ",".join(replica_urls)
+
+    port = free_port()
+    server = start_server(env, port, args.workers)
+    try:
+        routes = [route for route in ROUTES if route.name in args.routes]
+        results = asyncio.run(run_load(f"http://127.0.0.1:{port}", routes, args.books, args.categories,
+                                       args.concurrency, args.duration, args.warmup))
+    finally:
+        server.terminate()
+        server.wait(30)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        meta = {
+            "commit": git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "books": args.books,
+            "database": database_url.split(":", 1)[0],
+            "replicas": len(replica_urls),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "workers": args.workers,
+            "cpus": os.cpu_count(),
+        }
+        with open(args.save_baseline, "w") as f:
+            json.dump({"meta": meta, "routes": results}, f, indent=2)
+
+    if baseline is not None:
+        found = regressions(results, baseline, args.threshold)
+        if found:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for line in found:
+                print(f"  {line}")
+            raise SystemExit(1)
+        print(f"\nNo regression beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Per-request overhead of the instrumentation middleware.
+
+Calls a minimal FastAPI app directly through ASGI (no server, no HTTP client)
+and compares the time per request of:
+
+- no middleware (baseline)
+- the former pair of ``@app.middleware("http")`` functions: two ``BaseHTTPMiddleware``
+  layers, ``time.time()``, a locked metrics dict keyed on the raw path and a
+  synchronous structlog JSON render + write per request
+- ``ObservabilityMiddleware`` with the queued access log, logging every request
+  and a 10% sample
+
+Logs go to ``/dev/null`` in every variant::
+
+    python -m benchmarks.middleware --requests 20000
+
+Needs the same environment as the API (``SECRET_KEY``/``ADMIN_PASSWORD``), since
+it imports the middleware settings.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import structlog
+from fastapi import FastAPI, Request
+
+from api.logging_config import setup_logging
+from api.metrics import RequestMetrics
+from api.middleware import ObservabilityMiddleware
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/books/{book_id}")
+    async def get_book(book_id: int):
+        return {"id": book_id}
+
+    return app
+
+
+def add_legacy_middleware(app: FastAPI, devnull) -> None:
+    # what api.main registered before the ASGI middleware
+    logger = structlog.wrap_logger(
+        structlog.PrintLogger(devnull),
+        processors=[structlog.processors.TimeStamper(fmt="iso"), structlog.processors.JSONRenderer()],
+    )
+    metrics = {"total_requests": 0, "total_time": 0.0,
+               "per_path": defaultdict(lambda: {"count": 0, "total_time": 0.0})}
+    metrics_lock = threading.Lock()
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        duration = time.time() - start_time
+        logger.info("api_call", method=request.method, path=request.url.path,
+                    status_code=response.status_code, duration_ms=round(duration * 1000, 2))
+        return response
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        duration = time.time() - start_time
+        with metrics_lock:
+            metrics["total_requests"] += 1
+            metrics["total_time"] += duration
+            path = request.url.path
+            metrics["per_path"][path]["count"] += 1
+            metrics["per_path"][path]["total_time"] += duration
+        return response
+
+
+async def drive(app, requests: int) -> float:
+    """Seconds per request, calling the ASGI app directly."""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(requests):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": f"/books/{i % 1000}", "raw_path": b"",
+            "root_path": "", "query_string": b"", "headers": [],
+            "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w")
+    listener = setup_logging()
+    for handler in listener.handlers:
+        handler.setStream(devnull)
+    metrics = RequestMetrics(tempfile.mkdtemp(prefix="bench-metrics-"), flush_seconds=1.0)
+
+    baseline = make_app()
+    legacy = make_app()
+    add_legacy_middleware(legacy, devnull)
+    variants = {
+        "no middleware": baseline,
+        "2x BaseHTTPMiddleware (before)": legacy,
+        "ObservabilityMiddleware": ObservabilityMiddleware(make_app(), metrics, sample_rate=1.0),
+        "ObservabilityMiddleware, 10% logged": ObservabilityMiddleware(make_app(), metrics, sample_rate=0.1),
+    }
+
+    results = {}
+    for name, app in variants.items():
+        asyncio.run(drive(app, 200))  # warm up
+        results[name] = min(asyncio.run(drive(app, args.requests)) for _ in range(args.rounds))
+
+    base = results["no middleware"]
+    for name, seconds in results.items():
+        print({"variant": name, "us_per_request": round(seconds * 1e6, 1),
+               "overhead_us": round((seconds - base) * 1e6, 1)})
+    print("dropped log records:", sum(getattr(h, "dropped", 0) for h in logging.getLogger().handlers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Parser backend benchmark: BeautifulSoup/html.parser vs. lxml XPath.
+
+Parses the same home, listing and product pages with every backend of
+``scripts.parsers``, checks that they return identical results and reports
+pages/sec per page type::
+
+    python -m benchmarks.parsers --books 500
+    python -m benchmarks.parsers --html-dir saved_pages/
+
+Pages are rendered by ``benchmarks.fixture_site`` unless ``--html-dir`` points at
+HTML files saved from the real site (``index.html`` is the home page, files
+under ``category/`` are listings and every other file a product page).
+"""
+import argparse
+import time
+from pathlib import Path
+
+from benchmarks.fixture_site import Catalogue
+from scripts.parsers import PARSERS
+
+BASE_URL = "https://books.toscrape.com/"
+
+
+def fixture_pages(books: int, categories: int) -> dict[str, list[tuple[str, str]]]:
+    catalogue = Catalogue(books, categories)
+    listing_urls = [f"{BASE_URL}catalogue/category/books/{c['slug']}/index.html" for c in catalogue.categories]
+    book_urls = [f"{BASE_URL}catalogue/{b['slug']}/index.html" for b in catalogue.books]
+    return {
+        "categories": [(BASE_URL, catalogue.render("/"))],
+        "listing": [(url, catalogue.render(url[len(BASE_URL) - 1:])) for url in listing_urls],
+        "book": [(url, catalogue.render(url[len(BASE_URL) - 1:])) for url in book_urls],
+    }
+
+
+def saved_pages(html_dir: str) -> dict[str, list[tuple[str, str]]]:
+    pages = {"categories": [], "listing": [], "book": []}
+    root = Path(html_dir)
+    for path in sorted(root.rglob("*.html")):
+        relative = path.relative_to(root).as_posix()
+        kind = "categories" if relative == "index.html" else "listing" if relative.startswith("category/") else "book"
+        url = BASE_URL if kind == "categories" else f"{BASE_URL}catalogue/{relative}"
+        pages[kind].append((url, path.read_text(encoding="utf-8")))
+    return pages
+
+
+def run(pages: dict[str, list[tuple[str, str]]], repeat: int) -> dict:
+    results = {}
+    for name, parser in PARSERS.items():
+        results[name] = {}
+        for kind, items in pages.items():
+            if not items:
+                continue
+            parse = getattr(parser, kind)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                parsed = [parse(html, url) for url, html in items]
+            elapsed = time.perf_counter() - start
+            results[name][kind] = parsed
+            print({
+                "parser": name,
+                "pages": kind,
+                "count": len(items),
+                "seconds": round(elapsed, 3),
+                "pages_per_sec": round(len(items) * repeat / elapsed, 1),
+            })
+
+    reference, *others = results.values()
+    for name, parsed in zip(list(results)[1:], others):
+        mismatches = [kind for kind in parsed if parsed[kind] != reference[kind]]
+        print(f"{name} vs {next(iter(results))}: " + (f"DIFFERENT {mismatches}" if mismatches else "identical output"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--books", type=int, default=500)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--html-dir", help="directory of saved books.toscrape.com pages")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = saved_pages(args.html_dir) if args.html_dir else fixture_pages(args.books, args.categories)
+    run(pages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Record the pages ``scripts/scrape_books.py`` visits, for offline replay.
+
+Runs the synchronous scraper (``list_categories``, ``list_books_urls_by_category``
+and ``fetch_book``) against the live site while saving every page it downloads
+under ``<out>/pages/<url path>``, plus a ``manifest.json``::
+
+    python -m benchmarks.recorder --out data/recording --categories 10
+
+The recording is served by ``python -m benchmarks.fixture_site --recording data/recording``
+and used by ``benchmarks.scrape_suite --recording``. Links on the site are
+relative, so the replayed pages point back at the replay server. With
+``--categories`` the home page still lists every category; the ones left out
+answer 404 on replay.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from benchmarks.fixture_site import recording_path
+from scripts import scrape_books
+
+
+class Recorder:
+    def __init__(self, out: str, base_url: str):
+        self.pages_dir = os.path.join(out, "pages")
+        self.out = out
+        self.base_url = base_url
+        self.host = urlsplit(base_url).netloc
+        self.pages = 0
+        self.bytes = 0
+
+    def save(self, url: str, html: str) -> None:
+        parts = urlsplit(url)
+        if parts.netloc != self.host:
+            return
+        path = os.path.join(self.pages_dir, recording_path(parts.path))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        self.pages += 1
+        self.bytes += len(html.encode("utf-8"))
+
+    @contextmanager
+    def recording(self):
+        """Save every page ``scrape_books.get_html`` returns while active."""
+        get_html = scrape_books.get_html
+
+        def recording_get_html(url: str) -> str | None:
+            html = get_html(url)
+            if html is not None:
+                self.save(url, html)
+            return html
+
+        scrape_books.get_html = recording_get_html
+        try:
+            yield self
+        finally:
+            scrape_books.get_html = get_html
+
+    def write_manifest(self, categories: int, books: int) -> dict:
+        manifest = {
+            "base_url": self.base_url,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "pages": self.pages,
+            "bytes": self.bytes,
+            "categories": categories,
+            "books": books,
+        }
+        with open(os.path.join(self.out, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+
+def record(out: str, base_url: str, max_categories: int | None = None, workers: int = 4) -> dict:
+    recorder = Recorder(out, base_url)
+    with recorder.recording():
+        categories = scrape_books.list_categories(base_url) or []
+        # whole categories only, so a replay never links to a page that was not recorded
+        categories = categories[:max_categories]
+        books_urls = [url for category in categories
+                      for url in scrape_books.list_books_urls_by_category(category["link"])]
+        # a few threads, to stay polite with the real site
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            books = sum(1 for book in executor.map(scrape_books.fetch_book, books_urls) if book)
+    return recorder.write_manifest(len(categories), books)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", default="data/recording")
+    parser.add_argument("--base-url", default=scrape_books.BASE_URL)
+    parser.add_argument("--categories", type=int, default=None, help="record only the first N categories")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = record(args.out, args.base_url, args.categories, args.workers)
+    print({**manifest, "seconds": round(time.perf_counter() - start, 1)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Offline scrape benchmark suite.
+
+Times the scraper entry points against a local site: the synthetic catalogue of
+``benchmarks.fixture_site`` or pages recorded by ``benchmarks.recorder``,
+optionally with injected latency and errors. Cases:
+
+- ``list_categories``: the home page
+- ``list_books_urls_by_category``: every listing page, category by category
+- ``fetch_book``: the first ``--fetch-books`` product pages, one after another
+- ``perform_scrape``: the whole scheduled job (crawl, parse, write, score) into a
+  fresh SQLite database
+
+Like pytest-benchmark, each case runs for ``--rounds`` rounds and reports the
+min/median/mean wall time. Every round runs in a fresh process, untimed setup
+first, so ``cpu_seconds`` (process plus reaped children, i.e. the parser pool)
+and ``peak_rss_mb`` belong to that case alone. ``pages_per_sec`` counts the
+requests the server answered during the timed part::
+
+    python -m benchmarks.scrape_suite --books 1000 --rounds 3 --save before.json
+    python -m benchmarks.scrape_suite --books 1000 --rounds 3 --compare before.json
+    python -m benchmarks.scrape_suite --recording data/recording --latency-ms 20 --error-rate 0.01
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fixture_site import Catalogue, FixtureSite, RecordedSite
+
+
+# --- cases: setup runs untimed and returns the timed callable, which returns an item count ---
+
+def case_list_categories(base_url: str, options: dict):
+    from scripts import scrape_books
+    return lambda: len(scrape_books.list_categories(base_url) or [])
+
+
+def case_list_books_urls_by_category(base_url: str, options: dict):
+    from scripts import scrape_books
+    categories = scrape_books.list_categories(base_url) or []
+    return lambda: sum(len(scrape_books.list_books_urls_by_category(c["link"])) for c in categories)
+
+
+def case_fetch_book(base_url: str, options: dict):
+    from scripts import scrape_books
+    urls = []
+    for category in scrape_books.list_categories(base_url) or []:
+        urls.extend(scrape_books.list_books_urls_by_category(category["link"]))
+        if len(urls) >= options["fetch_books"]:
+            break
+    urls = urls[:options["fetch_books"]]
+    return lambda: sum(1 for url in urls if scrape_books.fetch_book(url))
+
+
+def case_perform_scrape(base_url: str, options: dict):
+    import asyncio
+
+    # a throwaway database and model directory, set before the API modules read them
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(options['workdir'], 'bench.db')}"
+    os.environ["MODEL_DIR"] = os.path.join(options["workdir"], "models")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+    from sqlmodel import Session, func, select
+
+    from api.config import settings
+    from api.db import engine, init_db
+    from api.models.book import Book
+    from api.tasks import perform_scrape
+
+    settings.SCRAPE_BASE_URL = base_url
+    init_db()
+
+    def run():
+        asyncio.run(perform_scrape(incremental=False))
+        with Session(engine) as session:
+            return session.exec(select(func.count()).select_from(Book)).one()
+
+    return run
+
+
+CASES = {
+    "list_categories": case_list_categories,
+    "list_books_urls_by_category": case_list_books_urls_by_category,
+    "fetch_book": case_fetch_book,
+    "perform_scrape": case_perform_scrape,
+}
+
+
+def _cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def run_round(name: str, base_url: str, options: dict, conn) -> None:
+    """Child process: set the case up, wait for the parent's go, run it timed."""
+    output = contextlib.nullcontext() if options["verbose"] else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with output:
+        timed = CASES[name](base_url, options)
+        conn.send("ready")
+        conn.recv()
+        cpu_start = _cpu_seconds()
+        start = time.perf_counter()
+        items = timed()
+        seconds = time.perf_counter() - start
+        cpu_seconds = _cpu_seconds() - cpu_start
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != "darwin" else 1024 ** 2)
+    conn.send({"seconds": seconds, "cpu_seconds": cpu_seconds, "peak_rss_mb": peak, "items": items})
+
+
+def measure(name: str, site: FixtureSite, options: dict) -> dict:
+    context = multiprocessing.get_context("spawn")
+    rounds = []
+    for _ in range(options["rounds"]):
+        with tempfile.TemporaryDirectory(prefix="scrape-bench-") as workdir:
+            parent, child = context.Pipe()
+            process = context.Process(target=run_round, args=(name, site.base_url, {**options, "workdir": workdir}, child))
+            process.start()
+            if not parent.poll(600) or parent.recv() != "ready":
+                process.kill()
+                raise RuntimeError(f"{name}: setup did not finish")
+            requests, errors = site.requests, site.errors
+            parent.send("go")
+            result = parent.recv()
+            result.update(pages=site.requests - requests, injected_errors=site.errors - errors)
+            process.join()
+            rounds.append(result)
+
+    seconds = [r["seconds"] for r in rounds]
+    median = statistics.median(seconds)
+    pages = statistics.median(r["pages"] for r in rounds)
+    return {
+        "rounds": len(rounds),
+        "items": rounds[-1]["items"],
+        "pages": pages,
+        "injected_errors": statistics.median(r["injected_errors"] for r in rounds),
+        "min_seconds": round(min(seconds), 4),
+        "median_seconds": round(median, 4),
+        "mean_seconds": round(statistics.mean(seconds), 4),
+        "stdev_seconds": round(statistics.stdev(seconds), 4) if len(seconds) > 1 else 0.0,
+        "pages_per_sec": round(pages / median, 1) if median else 0.0,
+        "cpu_seconds": round(statistics.median(r["cpu_seconds"] for r in rounds), 4),
+        "peak_rss_mb": round(max(r["peak_rss_mb"] for r in rounds), 1),
+    }
+
+
+# --- reporting ---
+
+COLUMNS = ("items", "pages", "median_seconds", "stdev_seconds", "pages_per_sec", "cpu_seconds", "peak_rss_mb")
+# for these a higher value is an improvement
+HIGHER_IS_BETTER = {"pages_per_sec"}
+
+
+def print_table(results: dict) -> None:
+    print(f"{'case':<30}" + "".join(f"{column:>16}" for column in COLUMNS))
+    for name, result in results.items():
+        print(f"{name:<30}" + "".join(f"{result[column]:>16}" for column in COLUMNS))
+
+
+def print_comparison(results: dict, baseline: dict) -> None:
+    compared = ("median_seconds", "pages_per_sec", "cpu_seconds", "peak_rss_mb")
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta']['created_at']}):")
+    print(f"{'case':<30}" + "".join(f"{column:>16}" for column in compared))
+    for name, result in results.items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            continue
+        cells = []
+        for column in compared:
+            if not before[column]:
+                cells.append(f"{'n/a':>16}")
+                continue
+            change = (result[column] - before[column]) / before[column] * 100
+            worse = change < 0 if column in HIGHER_IS_BETTER else change > 0
+            cells.append(f"{change:>+14.1f}%{'!' if worse and abs(change) >= 10 else ' '}")
+        print(f"{name:<30}" + "".join(cells))
+    print("(! = at least 10% worse)")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--recording", help="replay the pages saved by benchmarks.recorder in this directory")
+    parser.add_argument("--books", type=int, default=1000, help="size of the synthetic catalogue")
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--fetch-books", type=int, default=100, help="product pages of the fetch_book case")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file saved by an earlier --save run")
+    parser.add_argument("--verbose", action="store_true", help="show the scraper's output")
+    args = parser.parse_args()
+
+    source = RecordedSite(args.recording) if args.recording else Catalogue(args.books, args.categories)
+    options = {"rounds": args.rounds, "fetch_books": args.fetch_books, "verbose": args.verbose}
+    results = {}
+    with FixtureSite(source, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                     error_rate=args.error_rate) as site:
+        for name in args.cases:
+            results[name] = measure(name, site, options)
+            print(name, results[name], flush=True)
+
+    print()
+    print_table(results)
+
+    meta = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "source": args.recording or f"synthetic {args.books} books / {args.categories} categories",
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"meta": meta, "cases": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import httpx
+
+from scripts.parsers import get_parser, parse_page
+from scripts.scrape_books import BASE_URL
+
+USER_AGENT = "book-scraper-api/0.1"
+
+# Returned by fetch() when a conditional request finds the page unchanged
+UNCHANGED = object()
+
+
+class StageTimings:
+    """
+    Calls, busy time and wall span of each stage of a scrape. Stages overlap in the
+    pipeline, so ``busy_seconds`` (summed over concurrent calls) can exceed the
+    stage's ``wall_seconds`` (first start to last end); their ratio is the
+    stage's average concurrency.
+    """
+
+    def __init__(self):
+        self.stages: dict[str, dict] = {}
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            timing = self.stages.setdefault(stage, {"calls": 0, "busy": 0.0, "first_start": start, "last_end": end})
+            timing["calls"] += 1
+            timing["busy"] += end - start
+            timing["last_end"] = max(timing["last_end"], end)
+
+    def as_dict(self) -> dict:
+        return {
+            stage: {
+                "calls": timing["calls"],
+                "busy_seconds": round(timing["busy"], 4),
+                "wall_seconds": round(timing["last_end"] - timing["first_start"], 4),
+            }
+            for stage, timing in self.stages.items()
+        }
+
+
+class AsyncCrawler:
+    """
+    Asyncio crawler for books.toscrape.com.
+
+    Every request goes through a single ``httpx.AsyncClient`` so connections are
+    pooled and kept alive across category, listing and product pages. The pool is
+    bounded by ``max_connections`` and each host is further limited to
+    ``per_host_limit`` concurrent requests. ``crawl`` feeds book URLs through
+    bounded queues, so a slow consumer pauses the fetchers instead of piling up
+    pages in memory.
+
+    Passing ``page_states`` (URL -> stored ``etag``/``last_modified``/
+    ``content_hash``/``links``) turns on incremental mode: pages are requested
+    conditionally, unchanged ones are neither parsed nor returned, and category
+    pagination stops at the first listing page holding a book of ``known_books``.
+    The validators of changed pages that parsed are collected in ``page_updates``.
+
+    Pages are parsed off the event loop by the ``parser`` backend (see
+    ``scripts.parsers``): in a pool of ``parse_workers`` processes, so parsing
+    scales with cores instead of sharing the GIL with the fetchers, or in a
+    worker thread when ``parse_workers`` is 0. ``None`` starts one process per
+    core left over by the event loop.
+
+    Besides the ``stats`` counters, a crawl records the ``timings`` of its stages
+    (``category``, ``listing``, ``fetch``, ``parse``; callers add their own), a
+    histogram of HTTP statuses (``status_counts``, transport errors included) and
+    the first ``max_failures`` pages it gave up on (``failed``).
+    """
+
+    def __init__(self,
+                 base_url: str = BASE_URL,
+                 max_connections: int = 20,
+                 per_host_limit: int = 10,
+                 queue_size: int = 100,
+                 timeout: float = 30.0,
+                 retries: int = 2,
+                 page_delay: float = 0.0,
+                 page_states: dict[str, dict] | None = None,
+                 known_books: set[str] | None = None,
+                 parser: str | None = None,
+                 parse_workers: int | None = 0,
+                 max_failures: int = 100):
+        self.base_url = base_url
+        self.parser = get_parser(parser)
+        if parse_workers is None:
+            parse_workers = max((os.cpu_count() or 1) - 1, 0)
+        self.parse_workers = parse_workers
+        self._executor: ProcessPoolExecutor | None = None
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retries = retries
+        self.page_delay = page_delay
+        self.incremental = page_states is not None
+        self.page_states = page_states or {}
+        self.known_books = known_books or set()
+        self.page_updates: dict[str, dict] = {}
+        self.client: httpx.AsyncClient | None = None
+        self._host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host_limit))
+        self.stats = {"requests": 0, "failures": 0, "retries": 0, "bytes": 0,
+                      "pages_changed": 0, "pages_skipped": 0}
+        self.timings = StageTimings()
+        self.status_counts: Counter = Counter()
+        self.failed: list[dict] = []
+        self.max_failures = max_failures
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            timeout=self.timeout,
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+        )
+        if self.parse_workers:
+            # spawn: forking a process that runs threads (uvicorn, the scheduler) is unsafe
+            self._executor = ProcessPoolExecutor(
+                self.parse_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        self.client = None
+        if self._executor is not None:
+            await asyncio.to_thread(self._executor.shutdown, cancel_futures=True)
+            self._executor = None
+
+    async def parse(self, kind: str, html: str, url: str):
+        """Run the parser's ``kind`` function (``categories``, ``listing`` or ``book``)."""
+        if self._executor is not None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, parse_page, self.parser.name, kind, html, url)
+        return await asyncio.to_thread(getattr(self.parser, kind), html, url)
+
+    def _conditional_headers(self, url: str) -> dict:
+        state = self.page_states.get(url) if self.incremental else None
+        headers = {}
+        if state and state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state and state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    def record_failure(self, stage: str, url: str, reason: str) -> None:
+        self.stats["failures"] += 1
+        if stage == "parse":
+            # without its validators the next incremental run fetches the page again
+            # instead of getting a 304 for a page it never stored
+            self.page_updates.pop(url, None)
+        if len(self.failed) < self.max_failures:
+            self.failed.append({"stage": stage, "url": url, "reason": reason})
+        print(f"Falha ao {'processar' if stage == 'parse' else 'buscar'} {url}: {reason}")
+
+    async def fetch(self, url: str, stage: str = "fetch"):
+        """
+        GET ``url`` and return its body, or ``None`` once the retries are exhausted.
+        In incremental mode ``UNCHANGED`` is returned for a 304 or a body whose hash
+        matches the stored one.
+        """
+        host = urlsplit(url).netloc
+        reason = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                await asyncio.sleep(0.5 * attempt)
+            try:
+                async with self._host_limits[host]:
+                    self.stats["requests"] += 1
+                    resp = await self.client.get(url, headers=self._conditional_headers(url))
+                self.status_counts[str(resp.status_code)] += 1
+                if resp.status_code >= 500:
+                    reason = f"HTTP {resp.status_code}"
+                    continue
+                if resp.status_code == 304:
+                    self.stats["pages_skipped"] += 1
+                    return UNCHANGED
+                resp.raise_for_status()
+                self.stats["bytes"] += len(resp.content)
+                return self._check_changed(url, resp)
+            except httpx.TransportError as e:
+                self.status_counts[type(e).__name__] += 1
+                reason = f"{type(e).__name__}: {e}"
+                continue
+            except httpx.HTTPStatusError as e:
+                reason = f"HTTP {e.response.status_code}"
+                break
+        else:
+            reason = f"{reason} após {self.retries + 1} tentativas"
+        self.record_failure(stage, url, reason)
+        return None
+
+    def _check_changed(self, url: str, resp: httpx.Response):
+        if self.incremental:
+            content_hash = hashlib.blake2b(resp.content, digest_size=16).hexdigest()
+            state = self.page_states.get(url)
+            if state and state["content_hash"] == content_hash:
+                self.stats["pages_skipped"] += 1
+                return UNCHANGED
+            self.stats["pages_changed"] += 1
+            self.page_updates[url] = {
+                "etag": resp.headers.get("etag"),
+                "last_modified": resp.headers.get("last-modified"),
+                "content_hash": content_hash,
+                "links": None,
+            }
+        return resp.content.decode("utf-8", errors="replace")
+
+    def _stored_links(self, url: str):
+        links = self.page_states.get(url, {}).get("links")
+        return json.loads(links) if links else None
+
+    def _store_links(self, url: str, links) -> None:
+        if url in self.page_updates:
+            self.page_updates[url]["links"] = json.dumps(links)
+
+    async def list_categories(self) -> list[dict]:
+        with self.timings.measure("category"):
+            return await self._list_categories()
+
+    async def _list_categories(self) -> list[dict]:
+        html = await self.fetch(self.base_url, "category")
+        if html is UNCHANGED and (categories := self._stored_links(self.base_url)) is not None:
+            return categories
+        if html is UNCHANGED:
+            # validators without links (e.g. state saved by an older version)
+            self.page_states.pop(self.base_url, None)
+            html = await self.fetch(self.base_url, "category")
+        if html is None:
+            print("⛔ Não foi possível acessar a homepage. Abortando job.")
+            return []
+        categories = await self.parse("categories", html, self.base_url)
+        self._store_links(self.base_url, categories)
+        return categories
+
+    async def list_books_urls_by_category(self, category_link: str) -> list[str]:
+        books_urls = []
+        page_url = category_link
+        while page_url:
+            with self.timings.measure("listing"):
+                html = await self.fetch(page_url, "listing")
+                if html is UNCHANGED and (links := self._stored_links(page_url)) is not None:
+                    page_books, next_url = links
+                elif html is UNCHANGED:
+                    self.page_states.pop(page_url, None)
+                    continue
+                elif html is None:
+                    break
+                else:
+                    try:
+                        page_books, next_url = await self.parse("listing", html, page_url)
+                    except Exception as e:
+                        # like a book page: recorded, and the category keeps what it has so far
+                        self.record_failure("parse", page_url, f"{type(e).__name__}: {e}")
+                        break
+                    self._store_links(page_url, [page_books, next_url])
+            books_urls.extend(page_books)
+
+            if self.incremental and self.known_books.intersection(page_books):
+                # the rest of the category was already crawled
+                break
+            page_url = next_url
+            if page_url and self.page_delay:
+                await asyncio.sleep(self.page_delay)
+        return books_urls
+
+    async def fetch_book(self, book_url: str) -> dict | None:
+        html = await self.fetch(book_url)
+        if html is None or html is UNCHANGED:
+            return None
+        return await self.parse("book", html, book_url)
+
+    async def crawl(self, categories: list[dict], fetch_workers: int | None = None):
+        """
+        Async generator yielding the parsed book dict of every book in ``categories``.
+
+        Runs as a pipeline of stages joined by queues of ``queue_size`` items:
+        one task per category walks the listing pages, ``fetch_workers`` tasks
+        (``max_connections`` by default) download the book pages and the parse
+        stage turns them into dicts (see ``parse``). A slow stage, including the
+        caller consuming the generator, pauses the ones before it.
+        """
+        fetch_workers = fetch_workers or self.max_connections
+        # keep every process busy while the next pages are pickled over
+        parse_tasks = 2 * self.parse_workers or 4
+        urls: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        done = object()
+
+        async def stage(workers, queue: asyncio.Queue, consumers: int):
+            tasks = [asyncio.create_task(worker) for worker in workers]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                # after a failure too, so the next stages and the consumer stop instead
+                # of waiting forever; the error is then raised by gather(*tasks) below.
+                # Not when the crawl itself is being cancelled: nobody reads any more.
+                if not asyncio.current_task().cancelling():
+                    for _ in range(consumers):
+                        await queue.put(done)
+
+        async def walk(category):
+            for url in await self.list_books_urls_by_category(category["link"]):
+                await urls.put(url)
+
+        async def fetch_pages():
+            while (url := await urls.get()) is not done:
+                with self.timings.measure("fetch"):
+                    html = await self.fetch(url)
+                # None (failed, recorded by fetch) and UNCHANGED pages go no further
+                if isinstance(html, str):
+                    await pages.put((url, html))
+
+        async def parse_pages():
+            while (page := await pages.get()) is not done:
+                try:
+                    with self.timings.measure("parse"):
+                        book = await self.parse("book", page[1], page[0])
+                except Exception as e:
+                    self.record_failure("parse", page[0], f"{type(e).__name__}: {e}")
+                    continue
+                await results.put(book)
+
+        tasks = [
+            asyncio.create_task(stage([walk(c) for c in categories], urls, fetch_workers)),
+            asyncio.create_task(stage([fetch_pages() for _ in range(fetch_workers)], pages, parse_tasks)),
+            asyncio.create_task(stage([parse_pages() for _ in range(parse_tasks)], results, 1)),
+        ]
+        try:
+            while (result := await results.get()) is not done:
+                yield result
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,113 @@
+"""
+HTML parser backends for the books.toscrape.com pages.
+
+Every backend exposes the same three functions, taking the raw HTML and the page
+URL and returning exactly what the ``scrape_books`` helpers return:
+
+- ``categories(html, base_url)`` -> ``[{"name", "link"}, ...]``
+- ``listing(html, page_url)`` -> ``(book_urls, next_url | None)``
+- ``book(html, book_url)`` -> the book dict of ``fetch_book``
+
+``lxml`` evaluates precompiled XPath expressions on libxml2's C parser and is the
+default; ``bs4`` is the original BeautifulSoup/``html.parser`` implementation.
+Compare them with ``python -m benchmarks.parsers``.
+"""
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+from scripts import scrape_books
+
+DEFAULT_PARSER = "lxml"
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class SoupParser:
+    name = "bs4"
+
+    @staticmethod
+    def categories(html: str, base_url: str) -> list[dict]:
+        return scrape_books.parse_categories(scrape_books.make_soup(html), base_url)
+
+    @staticmethod
+    def listing(html: str, page_url: str) -> tuple[list[str], str | None]:
+        return scrape_books.parse_books_urls(scrape_books.make_soup(html), page_url)
+
+    @staticmethod
+    def book(html: str, book_url: str) -> dict:
+        return scrape_books.parse_book(scrape_books.make_soup(html), book_url)
+
+
+class LxmlParser:
+    name = "lxml"
+
+    # Same selectors as the BeautifulSoup helpers, compiled once
+    _category_links = etree.XPath(
+        f"//div[{_has_class('side_categories')}]//ul//li//ul//li//a"
+    )
+    _book_links = etree.XPath(f"//article[{_has_class('product_pod')}]/h3/a/@href")
+    _next_link = etree.XPath(f"(//li[{_has_class('next')}]//a/@href)[1]")
+    _title = etree.XPath(f"string((//div[{_has_class('product_main')}]//h1)[1])")
+    _price = etree.XPath(f"string((//p[{_has_class('price_color')}])[1])")
+    _rating = etree.XPath(f"string((//p[{_has_class('star-rating')}])[1]/@class)")
+    _availability = etree.XPath(f"string((//p[{_has_class('availability')}])[1])")
+    _category = etree.XPath(f"string((//ul[{_has_class('breadcrumb')}])[1]/li[3]/a)")
+    _image = etree.XPath(f"string((//div[{_has_class('carousel-inner')}]//img)[1]/@src)")
+
+    @staticmethod
+    def _tree(html: str):
+        return lxml.html.document_fromstring(html)
+
+    @classmethod
+    def categories(cls, html: str, base_url: str) -> list[dict]:
+        return [
+            {"name": link.text_content().strip(), "link": urljoin(base_url, link.get("href"))}
+            for link in cls._category_links(cls._tree(html))
+        ]
+
+    @classmethod
+    def listing(cls, html: str, page_url: str) -> tuple[list[str], str | None]:
+        tree = cls._tree(html)
+        books_urls = [urljoin(page_url, href) for href in cls._book_links(tree)]
+        next_href = cls._next_link(tree)
+        return books_urls, urljoin(page_url, next_href[0]) if next_href else None
+
+    @classmethod
+    def book(cls, html: str, book_url: str) -> dict:
+        tree = cls._tree(html)
+        rating = [c for c in cls._rating(tree).split() if c != "star-rating"][0]
+        title = cls._title(tree).strip()
+
+        return {
+            "title": title.encode('utf-8', errors='replace').decode(),
+            "price": scrape_books.parse_price(cls._price(tree).strip()),
+            "rating": scrape_books.rating_str_to_num(rating),
+            "availability": cls._availability(tree).strip(),
+            "category": cls._category(tree).strip(),
+            "image_url": urljoin(book_url, cls._image(tree)),
+            "detail_page": book_url,
+        }
+
+
+PARSERS = {parser.name: parser for parser in (LxmlParser, SoupParser)}
+
+
+def get_parser(name: str | None = None):
+    """Return the parser backend called ``name`` (``DEFAULT_PARSER`` when omitted)."""
+    try:
+        return PARSERS[name or DEFAULT_PARSER]
+    except KeyError:
+        raise ValueError(f"Unknown parser {name!r}; expected one of {sorted(PARSERS)}") from None
+
+
+def parse_page(parser: str, kind: str, html: str, url: str):
+    """
+    Run ``get_parser(parser).<kind>(html, url)``.
+
+    Module-level so it can be sent to a ``ProcessPoolExecutor`` worker.
+    """
+    return getattr(get_parser(parser), kind)(html, url)
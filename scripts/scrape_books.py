@@ -7,50 +7,73 @@ from requests.exceptions import RequestException
 
 BASE_URL = "https://books.toscrape.com/"
 
-def get_soup(url: str) -> BeautifulSoup:
+# Shared session so the synchronous helpers reuse keep-alive connections
+http = requests.Session()
+
+def get_html(url: str) -> str | None:
     try:
-        resp = requests.get(url)
+        resp = http.get(url)
         resp.raise_for_status()
         resp.encoding = 'utf-8'
-        return BeautifulSoup(resp.text, "html.parser")
+        return resp.text
     except RequestException as e:
         print(f"Falha ao buscar {url}: {e}")
         return None
 
-def list_categories():
-    categories = []
-    home = get_soup(BASE_URL)
-    if home is None:
-        print("⛔ Não foi possível acessar a homepage. Abortando job.")
-        return
+def get_soup(url: str) -> BeautifulSoup:
+    html = get_html(url)
+    return make_soup(html) if html is not None else None
+
+def get_parser(name: str | None = None):
+    # imported here because the parser backends reuse the helpers of this module
+    from scripts.parsers import get_parser
+    return get_parser(name)
+
+def make_soup(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, "html.parser")
 
-    categories_scrape = home.select("div.side_categories ul li ul li a")
+def parse_categories(soup: BeautifulSoup, base_url: str = BASE_URL) -> list[dict]:
+    categories = []
+    categories_scrape = soup.select("div.side_categories ul li ul li a")
     for cat in categories_scrape:
         cat_name = cat.text.strip()
-        cat_link = urljoin(BASE_URL, cat["href"])
+        cat_link = urljoin(base_url, cat["href"])
         categories.append({ 'name': cat_name, 'link': cat_link })
     return categories
 
-def list_books_urls_by_category(category_link: str):
+def parse_books_urls(soup: BeautifulSoup, page_url: str) -> tuple[list[str], str | None]:
+    """Return the book URLs of a listing page and the URL of the next page, if any."""
     books_urls = []
-    page_url = category_link
-    while True:
-        soup = get_soup(page_url)
-        if not soup:
-            break
+    for tag in soup.select("article.product_pod"):
+        book_url = urljoin(page_url, tag.h3.a["href"])
+        books_urls.append(book_url)
+
+    # Find the "Next" button, if it is unavailable it is the last page
+    next_btn = soup.select_one("li.next a")
+    if not next_btn:
+        return books_urls, None
+    return books_urls, urljoin(page_url, next_btn["href"])
+
+def list_categories(base_url: str = BASE_URL, parser: str | None = None):
+    home = get_html(base_url)
+    if home is None:
+        print("⛔ Não foi possível acessar a homepage. Abortando job.")
+        return
 
-        for tag in soup.select("article.product_pod"):
-            book_url = urljoin(page_url, tag.h3.a["href"])
-            books_urls.append(book_url)
+    return get_parser(parser).categories(home, base_url)
 
-        # Find the "Next" button, if it is unavailable it is the last page
-        next_btn = soup.select_one("li.next a")
-        if not next_btn:
+def list_books_urls_by_category(category_link: str, parser: str | None = None):
+    books_urls = []
+    page_url = category_link
+    while page_url:
+        html = get_html(page_url)
+        if not html:
             break
 
-        # Get the next page URL
-        page_url = urljoin(page_url, next_btn["href"])
-        time.sleep(0.05)
+        page_books, page_url = get_parser(parser).listing(html, page_url)
+        books_urls.extend(page_books)
+        if page_url:
+            time.sleep(0.05)
     return books_urls
 
 def rating_str_to_num(rating_str: str):
@@ -75,12 +98,7 @@ def parse_price(price_str: str) -> float:
         # Log or handle error appropriately
         return 0.0  # or raise a custom error if you prefer
 
-def fetch_book(book_url: str):
-    soup = get_soup(book_url)
-
-    if not soup:
-        return None
-
+def parse_book(soup: BeautifulSoup, book_url: str) -> dict:
     title = soup.select_one("div.product_main h1").text.strip()
     price = soup.select_one("p.price_color").text.strip()
     rating = [c for c in soup.select_one("p.star-rating")["class"] if c != "star-rating"][0]
@@ -102,3 +120,11 @@ def fetch_book(book_url: str):
         "image_url": image_url,
         "detail_page": book_url
     }
+
+def fetch_book(book_url: str, parser: str | None = None):
+    html = get_html(book_url)
+
+    if not html:
+        return None
+
+    return get_parser(parser).book(html, book_url)
@@ -9,12 +9,24 @@ try:
     response = requests.get(API_URL)
     data = response.json()
 
-    st.metric("Total Requests", data["total_requests"])
-    st.metric("Avg Response Time (ms)", data["average_response_time_ms"])
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Requests", data["total_requests"])
+    col2.metric("Errors (5xx)", data["errors"])
+    col3.metric("Workers", data["workers"])
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Avg Response Time (ms)", data["average_response_time_ms"])
+    col2.metric("p50 (ms)", data["p50_ms"])
+    col3.metric("p95 (ms)", data["p95_ms"])
+    col4.metric("p99 (ms)", data["p99_ms"])
 
     st.subheader("Per Endpoint Metrics")
-    for path, stats in data["per_path"].items():
-        st.write(f"**{path}** — {stats['count']} requests, {stats['average_time_ms']} ms avg")
+    st.table([
+        {"endpoint": path, "requests": stats["count"], "errors": stats["errors"],
+         "avg (ms)": stats["average_time_ms"], "p50 (ms)": stats["p50_ms"],
+         "p95 (ms)": stats["p95_ms"], "p99 (ms)": stats["p99_ms"]}
+        for path, stats in data["per_path"].items()
+    ])
 
 except Exception as e:
     st.error(f"Could not fetch metrics: {e}")
\ No newline at end of file
@@ -0,0 +1,20 @@
+"""
+Test settings. ``api.config`` and ``api.db`` read the environment when they are
+imported, so it is set here, before any test module imports them: a throwaway
+SQLite database, model and metrics directories, and an unreachable scrape target.
+"""
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="book-api-tests-")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}",
+    DATABASE_REPLICA_URLS="",
+    SECRET_KEY="test",
+    ADMIN_PASSWORD="test",
+    MODEL_DIR=os.path.join(TEST_DIR, "models"),
+    METRICS_DIR=os.path.join(TEST_DIR, "metrics"),
+    CACHE_SQLITE_PATH=os.path.join(TEST_DIR, "response_cache.db"),
+    SCRAPE_BASE_URL="http://127.0.0.1:9/",
+)
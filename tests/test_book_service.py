@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, select
+
+from api.db import engine, init_db
+from api.models.book import Book
+from api.services.book_service import BookService
+
+
+def book_row(n: int, **overrides) -> dict:
+    return {
+        "title": f"Upserted book {n}",
+        "price": 20.0 + n,
+        "rating": n % 5 + 1,
+        "availability": "In stock (5 available)",
+        "category": "Upsert",
+        "image_url": f"https://example.com/upsert/{n}.jpg",
+        "detail_page": f"https://example.com/upsert/{n}/index.html",
+        **overrides,
+    }
+
+
+def stored(detail_page: str) -> Book:
+    with Session(engine) as session:
+        return session.exec(select(Book).where(Book.detail_page == detail_page)).one()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def database():
+    init_db()
+
+
+def upsert(rows: list[dict], changes: list | None = None) -> dict:
+    with Session(engine) as session:
+        return BookService(session).upsert_books(rows, changes)
+
+
+def test_new_changed_and_unchanged_books_are_counted():
+    assert upsert([book_row(n) for n in range(3)]) == {"inserted": 3, "updated": 0, "unchanged": 0}
+    before = stored(book_row(0)["detail_page"]).updated_at
+
+    changes = []
+    result = upsert([book_row(0, price=99.0), book_row(1), book_row(2), book_row(3)], changes)
+
+    assert result == {"inserted": 1, "updated": 1, "unchanged": 2}
+    assert stored(book_row(0)["detail_page"]).price == 99.0
+    assert stored(book_row(0)["detail_page"]).updated_at > before
+    assert [(old is None, new["detail_page"]) for old, new in changes] == [
+        (False, book_row(0)["detail_page"]), (True, book_row(3)["detail_page"]),
+    ]
+    assert changes[0][0]["price"] == 20.0
+
+
+def test_category_is_not_overwritten():
+    upsert([book_row(10)])
+    upsert([book_row(10, category="Moved", rating=5, price=1.0)])
+
+    book = stored(book_row(10)["detail_page"])
+    assert (book.category, book.rating, book.price) == ("Upsert", 5, 1.0)
+
+
+def test_duplicates_in_a_chunk_are_written_once():
+    result = upsert([book_row(20, price=1.0), book_row(20, price=2.0)])
+
+    assert result == {"inserted": 1, "updated": 0, "unchanged": 0}
+    assert stored(book_row(20)["detail_page"]).price == 2.0
+
+
+@pytest.mark.parametrize("n, price, refreshed", [(30, 25.0, False), (31, 40.0, True)])
+def test_row_inserted_concurrently_takes_the_conflict_path(n, price, refreshed):
+    row = book_row(n, price=price)
+    with Session(engine) as session:
+        execute = session.execute
+
+        def insert_first(statement, *args, **kwargs):
+            # another writer commits the book (at 25.0) between the SELECT and the INSERT
+            with Session(engine) as other:
+                other.add(Book(**{**row, "price": 25.0, "updated_at": datetime(2000, 1, 1)}))
+                other.commit()
+            session.execute = execute
+            return execute(statement, *args, **kwargs)
+
+        session.execute = insert_first
+        assert BookService(session).upsert_books([row]) == {"inserted": 1, "updated": 0, "unchanged": 0}
+
+    book = stored(row["detail_page"])
+    assert book.price == price
+    # the DO UPDATE only fires when a value differs
+    assert (book.updated_at.year > 2000) == refreshed
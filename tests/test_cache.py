@@ -0,0 +1,60 @@
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from api.cache import CacheEntry, MemoryCacheBackend, ResponseCache, SQLiteCacheBackend
+from api.db import init_db
+
+
+def make_client():
+    init_db()
+    cache = ResponseCache(MemoryCacheBackend(1 << 20))
+    app = FastAPI()
+    calls = {"ok": 0, "missing": 0}
+
+    @app.get("/ok")
+    @cache.cached()
+    def ok():
+        calls["ok"] += 1
+        return {"calls": calls["ok"]}
+
+    @app.get("/missing")
+    @cache.cached()
+    def missing():
+        calls["missing"] += 1
+        return JSONResponse({"detail": "not yet"}, status_code=404)
+
+    return TestClient(app), calls
+
+
+def test_ok_response_is_replayed():
+    client, calls = make_client()
+    first, second = client.get("/ok"), client.get("/ok")
+    assert first.status_code == second.status_code == 200
+    assert second.json() == {"calls": 1}
+    assert calls["ok"] == 1
+    assert client.get("/ok", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+
+def test_non_200_response_is_not_cached():
+    client, calls = make_client()
+    for _ in range(2):
+        response = client.get("/missing")
+        assert response.status_code == 404
+        assert "etag" not in response.headers
+    assert calls["missing"] == 2
+
+
+def test_sqlite_backend_keeps_entries_of_the_new_version(tmp_path):
+    # every worker sharing the file drops the stale entries when it sees the new version
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite"), 1 << 20)
+    for key in ("v9:/books?|", "v10:/books?|", "v11:/books?|", "v11:/books/1?|"):
+        backend.set(key, CacheEntry(etag='"e"', body=b"{}", media_type="application/json", headers={}))
+
+    backend.drop_older_than(11)
+    backend.drop_older_than(10)  # a worker still catching up
+
+    assert backend.get("v9:/books?|") is None
+    assert backend.get("v10:/books?|") is None
+    assert backend.get("v11:/books?|") is not None
+    assert backend.get("v11:/books/1?|") is not None
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fixture_site import Catalogue, FixtureSite
+from scripts.crawler import AsyncCrawler
+
+
+@pytest.fixture(scope="module")
+def site():
+    with FixtureSite(Catalogue(books=60, categories=3)) as site:
+        yield site
+
+
+async def crawl_all(crawler: AsyncCrawler) -> list[dict]:
+    async with crawler:
+        categories = await crawler.list_categories()
+        # a hang fails the test instead of blocking the suite
+        return await asyncio.wait_for(_collect(crawler, categories), timeout=30)
+
+
+async def _collect(crawler: AsyncCrawler, categories: list[dict]) -> list[dict]:
+    return [book async for book in crawler.crawl(categories, fetch_workers=4)]
+
+
+def test_crawl_yields_every_book(site):
+    books = asyncio.run(crawl_all(AsyncCrawler(site.base_url, queue_size=5)))
+    assert len(books) == 60
+
+
+def test_listing_parse_error_is_recorded(site):
+    crawler = AsyncCrawler(site.base_url, queue_size=5)
+    parse = crawler.parse
+
+    async def failing_parse(kind, html, url):
+        if kind == "listing" and "category-1" in url:
+            raise ValueError("broken listing")
+        return await parse(kind, html, url)
+
+    crawler.parse = failing_parse
+    books = asyncio.run(crawl_all(crawler))
+
+    assert 0 < len(books) < 60
+    assert crawler.stats["failures"] >= 1
+    assert crawler.failed[0]["stage"] == "parse"
+
+
+def test_stage_error_reaches_the_consumer(site):
+    crawler = AsyncCrawler(site.base_url, queue_size=5)
+
+    async def failing_listing(category_link):
+        raise RuntimeError("walk failed")
+
+    crawler.list_books_urls_by_category = failing_listing
+    with pytest.raises(RuntimeError, match="walk failed"):
+        asyncio.run(crawl_all(crawler))
+
+
+def test_validators_of_unparsed_pages_are_not_kept(site):
+    crawler = AsyncCrawler(site.base_url, queue_size=5, page_states={})
+    parse = crawler.parse
+    broken = {"book": set(), "listing": set()}
+
+    async def failing_parse(kind, html, url):
+        if kind == "book" and len(broken["book"]) < 3 or kind == "listing" and "category-1" in url:
+            broken[kind].add(url)
+            raise ValueError(f"broken {kind} page")
+        return await parse(kind, html, url)
+
+    crawler.parse = failing_parse
+    asyncio.run(crawl_all(crawler))
+
+    assert len(broken["book"]) == 3 and len(broken["listing"]) == 1
+    assert crawler.page_updates
+    assert (broken["book"] | broken["listing"]).isdisjoint(crawler.page_updates)
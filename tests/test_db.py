@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from api.config import settings
+from api.db import create_db_engine
+from api.metrics import pool_metrics
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'pragmas.db'}", name="test-pragmas")
+    yield engine
+    engine.dispose()
+
+
+def pragma(engine, name: str):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_sqlite_connections_use_the_configured_pragmas(sqlite_engine):
+    assert pragma(sqlite_engine, "journal_mode") == settings.SQLITE_JOURNAL_MODE.lower() == "wal"
+    assert pragma(sqlite_engine, "synchronous") == 1  # NORMAL
+    assert pragma(sqlite_engine, "mmap_size") == settings.SQLITE_MMAP_SIZE
+    assert pragma(sqlite_engine, "cache_size") == settings.SQLITE_CACHE_SIZE
+    assert pragma(sqlite_engine, "busy_timeout") == int(settings.SQLITE_BUSY_TIMEOUT_SECONDS * 1000)
+
+
+def test_writers_commit_while_a_read_is_open(sqlite_engine):
+    with sqlite_engine.begin() as connection:
+        connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO item VALUES (1)"))
+
+    with sqlite_engine.connect() as reader:
+        reader.execute(text("BEGIN"))
+        assert reader.execute(text("SELECT count(*) FROM item")).scalar() == 1
+        # with a rollback journal this commit would wait for the reader's lock
+        with sqlite_engine.begin() as writer:
+            writer.execute(text("INSERT INTO item VALUES (2)"))
+        # the open read keeps its snapshot
+        assert reader.execute(text("SELECT count(*) FROM item")).scalar() == 1
+        reader.execute(text("COMMIT"))
+
+    assert pragma(sqlite_engine, "journal_mode") == "wal"
+    with sqlite_engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM item")).scalar() == 2
+
+
+def test_checkout_waits_and_timeouts_are_recorded(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT_SECONDS", 0.1)
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", name="test-pool")
+    try:
+        with engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+        with engine.connect():
+            pass
+    finally:
+        engine.dispose()
+
+    series = pool_metrics.local_series()[("checkout", "test-pool")]
+    assert series.count == 3
+    assert series.errors == 1
+    assert series.quantile(0.99) >= 0.05
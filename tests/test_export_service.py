@@ -0,0 +1,24 @@
+import pytest
+
+from api.services.export_service import CSV_MEDIA_TYPE, NDJSON_MEDIA_TYPE, negotiate_export
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, None),
+    ("", None),
+    ("application/json", None),
+    ("*/*", None),
+    ("image/png", None),
+    ("text/csv", CSV_MEDIA_TYPE),
+    ("application/x-ndjson", NDJSON_MEDIA_TYPE),
+    ("text/*", CSV_MEDIA_TYPE),
+    ("application/json;q=0.1, text/csv;q=0", None),
+    ("text/csv;q=0, */*", None),
+    ("application/json;q=0.5, text/csv", CSV_MEDIA_TYPE),
+    ("text/csv;q=0.4, application/x-ndjson;q=0.8", NDJSON_MEDIA_TYPE),
+    ("application/json, text/csv", None),
+    ("TEXT/CSV; Q=0.9", CSV_MEDIA_TYPE),
+    ("text/csv;q=oops", None),
+])
+def test_negotiate_export(accept, expected):
+    assert negotiate_export(accept) == expected
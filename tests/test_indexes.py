@@ -0,0 +1,29 @@
+import pytest
+
+from api.db import engine, init_db
+from api.migrations import explain_book_queries, is_full_scan
+
+
+@pytest.fixture(scope="module")
+def plans() -> dict[str, list[str]]:
+    # the test database from conftest: a temporary SQLite file
+    init_db()
+    return explain_book_queries(engine)
+
+
+def test_every_query_is_explained(plans):
+    assert all(plans.values())
+
+
+@pytest.mark.parametrize("query", [
+    "get_by_detail_page",
+    "get_top_books",
+    "filter_by_price_range",
+    "get_overview_stats",
+    "get_category_stats",
+    "search_books",
+    "get_predicted_books",
+])
+def test_query_uses_an_index(plans, query):
+    full_scans = [line for line in plans[query] if is_full_scan(line)]
+    assert not full_scans, f"{query}: {plans[query]}"
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pytest
+
+from api import metrics
+from api.metrics import BUCKET_BOUNDS, RequestMetrics, Series
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RequestMetrics(str(tmp_path), flush_seconds=60)
+
+
+def test_quantiles_are_within_one_bucket():
+    series = Series()
+    for ms in range(1, 1001):
+        series.record(200, ms / 1000)
+
+    # one bucket is 2 ** (1/4) wide: estimates are within ~19% of the true value
+    for q, expected in ((0.50, 0.5), (0.95, 0.95), (0.99, 0.99)):
+        assert series.quantile(q) == pytest.approx(expected, rel=0.19)
+    assert series.count == 1000
+    assert series.total_time == pytest.approx(500.5)
+
+
+def test_status_classes_and_errors():
+    series = Series()
+    for status in (200, 201, 304, 404, 500, 503):
+        series.record(status, 0.01)
+    assert series.statuses == [0, 2, 1, 1, 2]
+    assert series.errors == 2
+
+
+def test_shards_of_exited_threads_are_retired(store):
+    def worker():
+        for _ in range(10):
+            store.record("GET", "/api/v1/books/", 200, 0.002)
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.record("GET", "/api/v1/books/", 500, 0.004)
+
+    # only the live (main) thread keeps a shard; the others were folded in
+    assert len(store._shards) == 1
+    series = store.local_series()[("GET", "/api/v1/books/")]
+    assert series.count == 201
+    assert series.errors == 1
+
+
+def test_other_workers_are_merged_from_their_files(store, tmp_path):
+    store.record("GET", "/api/v1/books/", 200, 0.002)
+    # a file left by another live worker, here this test runner's parent
+    other = RequestMetrics(str(tmp_path), flush_seconds=60)
+    other.record("GET", "/api/v1/books/", 200, 0.003)
+    other.flush()
+    (tmp_path / f"{os.getpid()}.json").rename(tmp_path / f"{os.getppid()}.json")
+
+    series, processes = store.collect()
+    assert processes == 2
+    assert series[("GET", "/api/v1/books/")].count == 2
+
+
+def test_prometheus_histogram_is_cumulative(store, monkeypatch):
+    for duration in (0.0005, 0.003, 0.003, 2.0):
+        store.record("GET", "/api/v1/books/{book_id}", 200, duration)
+    monkeypatch.setattr(metrics, "request_metrics", store)
+    monkeypatch.setattr(metrics, "pool_metrics", RequestMetrics(store.directory + "/db-pool", 60))
+
+    text = metrics.prometheus_text()
+
+    labels = 'method="GET",route="/api/v1/books/{book_id}"'
+    assert f'http_requests_total{{{labels},status="2xx"}} 4' in text
+    assert f"http_request_duration_seconds_count{{{labels}}} 4" in text
+    buckets = [
+        (line.split('le="')[1].split('"')[0], int(line.rsplit(" ", 1)[1]))
+        for line in text.splitlines()
+        if line.startswith("http_request_duration_seconds_bucket")
+    ]
+    counts = [count for _, count in buckets]
+    assert counts == sorted(counts)
+    assert buckets[-1] == ("+Inf", 4)
+    assert dict(buckets)[f"{BUCKET_BOUNDS[24]:.6g}"] == 3  # le=6.4ms
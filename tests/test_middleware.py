@@ -0,0 +1,74 @@
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from structlog.testing import capture_logs
+
+from api.metrics import UNMATCHED_ROUTE, RequestMetrics
+from api.middleware import ObservabilityMiddleware
+
+
+def make_client(tmp_path, sample_rate: float) -> tuple[TestClient, RequestMetrics]:
+    metrics = RequestMetrics(str(tmp_path), flush_seconds=60)
+    app = FastAPI()
+    app.add_middleware(ObservabilityMiddleware, metrics=metrics, sample_rate=sample_rate)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter(["a", "b"]), media_type="text/plain")
+
+    return TestClient(app, raise_server_exceptions=False), metrics
+
+
+def test_requests_are_recorded_per_route_template(tmp_path):
+    client, metrics = make_client(tmp_path, sample_rate=1.0)
+    with capture_logs() as logs:
+        for item_id in (1, 2, 3):
+            assert client.get(f"/items/{item_id}").status_code == 200
+        assert client.get("/stream").text == "ab"
+        assert client.get("/missing").status_code == 404
+
+    series = metrics.local_series()
+    assert series[("GET", "/items/{item_id}")].count == 3
+    assert series[("GET", "/stream")].count == 1
+    assert series[("GET", UNMATCHED_ROUTE)].statuses[3] == 1
+    assert [(log["path"], log["route"], log["status_code"]) for log in logs] == [
+        ("/items/1", "/items/{item_id}", 200),
+        ("/items/2", "/items/{item_id}", 200),
+        ("/items/3", "/items/{item_id}", 200),
+        ("/stream", "/stream", 200),
+        ("/missing", UNMATCHED_ROUTE, 404),
+    ]
+    assert all(log["duration_ms"] >= 0 and log["event"] == "api_call" for log in logs)
+
+
+def test_unhandled_errors_count_as_5xx_and_are_always_logged(tmp_path):
+    client, metrics = make_client(tmp_path, sample_rate=0.0)
+    with capture_logs() as logs:
+        assert client.get("/items/1").status_code == 200
+        assert client.get("/boom").status_code == 500
+
+    series = metrics.local_series()
+    assert series[("GET", "/boom")].errors == 1
+    assert series[("GET", "/items/{item_id}")].count == 1
+    # sampled out, except the error
+    assert [log["path"] for log in logs] == ["/boom"]
+
+
+def test_access_log_is_sampled(tmp_path, monkeypatch):
+    draws = iter([0.1, 0.5, 0.2, 0.9])
+    monkeypatch.setattr("api.middleware.random.random", lambda: next(draws))
+    client, metrics = make_client(tmp_path, sample_rate=0.25)
+    with capture_logs() as logs:
+        for item_id in range(4):
+            client.get(f"/items/{item_id}")
+
+    assert [log["path"] for log in logs] == ["/items/0", "/items/2"]
+    assert metrics.local_series()[("GET", "/items/{item_id}")].count == 4
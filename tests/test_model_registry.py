@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from api.services import model_registry as registry_module
+from api.services.model_registry import ModelNotFoundError, ModelRegistry
+
+
+def fitted(seed: int) -> LogisticRegression:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(40, 4))
+    return LogisticRegression().fit(X, (X[:, 0] > 0).astype(int))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path), "model", keep=3)
+
+
+def test_empty_registry_has_no_model(registry):
+    with pytest.raises(ModelNotFoundError):
+        registry.get()
+    with pytest.raises(ModelNotFoundError):
+        registry.get(1)
+
+
+def test_save_activates_a_new_version(registry):
+    first = registry.save(fitted(1))
+    second = registry.save(fitted(2))
+
+    assert (first.version, second.version) == (1, 2)
+    assert registry.versions() == [1, 2]
+    assert registry.get().version == 2
+    assert registry.get(1).n_features == 4
+
+
+def test_rollback_is_seen_by_other_workers(registry, tmp_path):
+    registry.save(fitted(1))
+    registry.save(fitted(2))
+    other = ModelRegistry(str(tmp_path), "model", keep=3)
+    assert other.get().version == 2
+
+    registry.activate(1)
+
+    assert other.get().version == 1
+    X = np.zeros((1, 4))
+    assert (other.get().estimator.predict(X) == registry.get(1).estimator.predict(X)).all()
+
+
+def test_old_versions_are_pruned_but_the_active_one_is_kept(registry):
+    registry.save(fitted(1))
+    registry.activate(1)
+    for seed in range(2, 6):
+        registry.save(fitted(seed))
+    assert registry.versions() == [3, 4, 5]
+
+    registry.activate(3)
+    registry.save(fitted(6))
+    assert registry.versions() == [4, 5, 6]
+    assert registry.get().version == 6
+
+
+def test_a_version_is_only_listed_once_complete(registry, monkeypatch):
+    registry.save(fitted(1))
+    dump = registry_module.joblib.dump
+    seen = []
+
+    def observed_dump(value, f):
+        # another worker looking while the artifact is still being written
+        seen.append(registry.versions())
+        dump(value, f)
+
+    monkeypatch.setattr(registry_module.joblib, "dump", observed_dump)
+    registry.save(fitted(2))
+
+    assert seen == [[1]]
+    assert registry.versions() == [1, 2]
+    assert not [name for name in os.listdir(registry.model_dir) if name.startswith(".tmp-")]
+
+
+def test_concurrent_saves_get_distinct_versions(registry, tmp_path, monkeypatch):
+    other = ModelRegistry(str(tmp_path), "model", keep=3)
+    dump = registry_module.joblib.dump
+    interrupted = []
+
+    def save_other_first(value, f):
+        # the other worker publishes while this one is still writing
+        if not interrupted:
+            interrupted.append(None)
+            interrupted[0] = other.save(fitted(9))
+        dump(value, f)
+
+    monkeypatch.setattr(registry_module.joblib, "dump", save_other_first)
+    model = registry.save(fitted(1))
+
+    assert sorted([model.version, interrupted[0].version]) == [1, 2]
+    assert registry.versions() == [1, 2]
+    for version in (1, 2):
+        assert other.get(version).n_features == 4
@@ -0,0 +1,48 @@
+import io
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from api.db import init_db
+from api.main import app
+from api.negotiation import JSON_MEDIA_TYPE, negotiate
+from api.security import create_access_token
+from api.services.feature_service import NPY_MEDIA_TYPE, NPZ_MEDIA_TYPE
+
+OFFERS = [JSON_MEDIA_TYPE, NPY_MEDIA_TYPE]
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, JSON_MEDIA_TYPE),
+    ("application/x-npy", NPY_MEDIA_TYPE),
+    ("application/x-npy;q=0", JSON_MEDIA_TYPE),
+    ("application/x-npy;q=0, application/json;q=0.1", JSON_MEDIA_TYPE),
+    ("application/json;q=0.2, application/x-npy;q=0.9", NPY_MEDIA_TYPE),
+    ("application/*", JSON_MEDIA_TYPE),
+    ("application/*;q=0.5, application/x-npy", NPY_MEDIA_TYPE),
+    ("image/png", JSON_MEDIA_TYPE),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept, OFFERS) == expected
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_db()
+    token = create_access_token({"sub": "test"})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+@pytest.mark.parametrize("path, media_type", [
+    ("/api/v1/ml/features", NPY_MEDIA_TYPE),
+    ("/api/v1/ml/training-data", NPZ_MEDIA_TYPE),
+])
+def test_refused_binary_format_falls_back_to_json(client, path, media_type):
+    response = client.get(path, headers={"Accept": f"{media_type};q=0"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(JSON_MEDIA_TYPE)
+
+    binary = client.get(path, headers={"Accept": media_type})
+    assert binary.headers["content-type"] == media_type
+    np.load(io.BytesIO(binary.content))
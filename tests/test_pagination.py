@@ -0,0 +1,58 @@
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from api.db import init_db
+from api.main import app
+from api.pagination import decode_cursor, encode_cursor
+from api.security import create_access_token
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor((4.5, 12))) == (4.5, 12)
+    assert decode_cursor(encode_cursor((7,)), length=1) == (7,)
+    assert decode_cursor(None) is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    raw_cursor({"a": 1}),
+    raw_cursor([1]),
+    raw_cursor([1, 2, 3]),
+    raw_cursor([{"a": 1}, 1]),
+    raw_cursor(["x", "y"]),
+    raw_cursor([None, 1]),
+    raw_cursor([True, 1]),
+    raw_cursor([[1], 1]),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_db()
+    token = create_access_token({"sub": "test"})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+@pytest.mark.parametrize("path, cursor", [
+    ("/api/v1/books/top-rated", raw_cursor([{"a": 1}, 1])),
+    ("/api/v1/books/price-range", raw_cursor(["x", "y"])),
+    ("/api/v1/books/search?title=book", raw_cursor([{"a": 1}, 1])),
+    ("/api/v1/scraping/runs", raw_cursor(["x"])),
+])
+def test_routes_answer_400_to_malformed_cursors(client, path, cursor):
+    separator = "&" if "?" in path else "?"
+    response = client.get(f"{path}{separator}cursor={cursor}")
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
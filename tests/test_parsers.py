@@ -0,0 +1,86 @@
+import pytest
+
+from benchmarks.fixture_site import Catalogue, _page
+from scripts.parsers import LxmlParser, SoupParser, get_parser, parse_page
+
+BASE_URL = "http://books.example/"
+catalogue = Catalogue(books=45, categories=2)
+
+
+def book_url(book: dict) -> str:
+    return f"{BASE_URL}catalogue/{book['slug']}/index.html"
+
+
+def test_default_parser_is_lxml():
+    assert get_parser() is LxmlParser
+    assert get_parser("bs4") is SoupParser
+    with pytest.raises(ValueError, match="Unknown parser"):
+        get_parser("regex")
+
+
+def test_categories_match():
+    html = catalogue.home()
+    categories = LxmlParser.categories(html, BASE_URL)
+
+    assert categories == SoupParser.categories(html, BASE_URL)
+    assert categories[0] == {"name": "Category 0",
+                             "link": f"{BASE_URL}catalogue/category/books/category-0_2/index.html"}
+
+
+@pytest.mark.parametrize("page_name", ["index.html", "page-2.html"])
+def test_listings_match(page_name):
+    page_url = f"{BASE_URL}catalogue/category/books/category-0_2/{page_name}"
+    html = catalogue.listing("category-0_2", page_name)
+
+    urls, next_url = LxmlParser.listing(html, page_url)
+
+    assert (urls, next_url) == SoupParser.listing(html, page_url)
+    assert urls[0].startswith(f"{BASE_URL}catalogue/book-")
+    assert next_url == (page_url.replace("index.html", "page-2.html") if page_name == "index.html" else None)
+
+
+@pytest.mark.parametrize("index", [0, 7, 44])
+def test_books_match(index):
+    book = catalogue.books[index]
+    html = catalogue.product(book)
+
+    parsed = LxmlParser.book(html, book_url(book))
+
+    assert parsed == SoupParser.book(html, book_url(book))
+    assert parsed["title"] == book["title"]
+    assert parsed["category"] == book["category"]["name"]
+    assert parsed["detail_page"] == book_url(book)
+
+
+def test_entities_and_accents_in_titles_match():
+    book = {**catalogue.books[0], "title": "Tom &amp; Jerry: L&#39;été à Paris"}
+    html = catalogue.product(book)
+
+    parsed = LxmlParser.book(html, book_url(book))
+
+    assert parsed == SoupParser.book(html, book_url(book))
+    assert parsed["title"] == "Tom & Jerry: L'été à Paris"
+
+
+def test_classes_are_matched_as_words():
+    html = _page(
+        '<ul class="breadcrumb"><li>Home</li><li>Books</li><li><a href="#">Poetry</a></li></ul>'
+        '<div class="product_main col-sm-6"><h1>  Spaced  </h1>'
+        '<p class=" price_color ">£51.77</p><p class="not-price_color">£0.00</p>'
+        '<p class="instock  availability">In stock (22 available)</p>'
+        '<p class="star-rating   Three"></p></div>'
+        '<div class="carousel-inner"><img src="../../media/cover.jpg"></div>'
+    )
+    url = f"{BASE_URL}catalogue/spaced_1/index.html"
+
+    parsed = LxmlParser.book(html, url)
+
+    assert parsed == SoupParser.book(html, url)
+    assert (parsed["title"], parsed["price"], parsed["rating"]) == ("Spaced", 51.77, 3)
+    assert parsed["image_url"] == f"{BASE_URL}media/cover.jpg"
+
+
+def test_parse_page_dispatches_by_name():
+    book = catalogue.books[3]
+    html = catalogue.product(book)
+    assert parse_page("lxml", "book", html, book_url(book)) == parse_page("bs4", "book", html, book_url(book))
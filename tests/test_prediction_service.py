@@ -0,0 +1,142 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.linear_model import LogisticRegression
+from sqlmodel import Session
+
+from api.db import engine, init_db
+from api.main import app
+from api.routers import ml
+from api.security import create_access_token
+from api.services.book_service import BookService
+from api.services.catalogue_service import catalogue_version
+from api.services.model_registry import LoadedModel, model_registry
+from api.services.prediction_service import MicroBatcher
+
+
+class CountingEstimator:
+    """A fitted model that records the size of every predict_proba call."""
+
+    def __init__(self, fail: bool = False):
+        X = np.random.default_rng(0).normal(size=(40, 4))
+        self.model = LogisticRegression().fit(X, (X[:, 0] > 0).astype(int))
+        self.classes_ = self.model.classes_
+        self.n_features_in_ = 4
+        self.calls = []
+        self.fail = fail
+
+    def predict_proba(self, X):
+        self.calls.append(len(X))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return self.model.predict_proba(X)
+
+
+def loaded(estimator, version: int = 1) -> LoadedModel:
+    return LoadedModel(version=version, estimator=estimator, path="", n_features=4)
+
+
+def rows(n: int) -> np.ndarray:
+    return np.arange(n * 4, dtype=np.float64).reshape(n, 4)
+
+
+async def predict_all(batcher: MicroBatcher, requests: list[tuple[LoadedModel, np.ndarray]]):
+    return await asyncio.gather(*(batcher.predict_proba(model, X) for model, X in requests))
+
+
+def test_concurrent_requests_share_one_call():
+    estimator = CountingEstimator()
+    batcher = MicroBatcher(max_rows=100, max_wait_ms=50)
+    model = loaded(estimator)
+
+    results = asyncio.run(predict_all(batcher, [(model, rows(n)) for n in (1, 2, 3)]))
+
+    assert estimator.calls == [6]
+    assert [len(r) for r in results] == [1, 2, 3]
+    # each request gets its own rows back
+    for result, X in zip(results, (rows(1), rows(2), rows(3))):
+        np.testing.assert_allclose(result, estimator.model.predict_proba(X))
+
+
+def test_batch_is_flushed_at_max_rows():
+    estimator = CountingEstimator()
+    batcher = MicroBatcher(max_rows=4, max_wait_ms=10_000)
+    model = loaded(estimator)
+
+    asyncio.run(asyncio.wait_for(predict_all(batcher, [(model, rows(2)), (model, rows(2))]), timeout=5))
+
+    assert estimator.calls == [4]
+
+
+def test_large_requests_and_other_versions_are_not_mixed():
+    estimator = CountingEstimator()
+    batcher = MicroBatcher(max_rows=4, max_wait_ms=20)
+    v1, v2 = loaded(estimator, 1), loaded(estimator, 2)
+
+    asyncio.run(predict_all(batcher, [(v1, rows(10)), (v1, rows(1)), (v2, rows(1))]))
+
+    assert sorted(estimator.calls) == [1, 1, 10]
+    assert batcher.batches == 3 and batcher.requests == 3
+
+
+def test_model_error_reaches_every_request():
+    batcher = MicroBatcher(max_rows=100, max_wait_ms=20)
+    model = loaded(CountingEstimator(fail=True))
+
+    async def both():
+        return await asyncio.gather(batcher.predict_proba(model, rows(1)),
+                                    batcher.predict_proba(model, rows(1)), return_exceptions=True)
+
+    errors = asyncio.run(both())
+    assert [str(e) for e in errors] == ["model crashed", "model crashed"]
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_db()
+    with Session(engine) as session:
+        BookService(session).upsert_books([{
+            "title": "Predicted book", "price": 12.5, "rating": 4, "availability": "In stock (3 available)",
+            "category": "Prediction", "image_url": "https://example.com/p.jpg",
+            "detail_page": "https://example.com/prediction/index.html",
+        }])
+    # as a scrape does, so the cached feature matrix includes the book
+    catalogue_version.bump()
+    X = np.random.default_rng(3).normal(loc=[30, 3, 10, 5], scale=[10, 1, 5, 3], size=(60, 4))
+    model_registry.save(LogisticRegression().fit(X, (X[:, 1] >= 3).astype(int)))
+    token = create_access_token({"sub": "test"})
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def test_book_predictions_encode_off_the_event_loop(client, monkeypatch):
+    encode_books = ml.encode_books
+    on_loop = []
+
+    def recording(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return encode_books(*args)
+
+    monkeypatch.setattr(ml, "encode_books", recording)
+    response = client.post("/api/v1/ml/predictions/books", json={"books": [
+        {"price": "£45.17", "rating": "Two", "availability": "In stock (19 available)", "category": "Prediction"},
+    ]})
+
+    assert response.status_code == 200
+    assert response.json()["predictions"][0] in (0, 1)
+    assert on_loop == [False]
+
+
+def test_book_predictions_by_detail_page(client):
+    response = client.post("/api/v1/ml/predictions/books",
+                           json={"detail_pages": ["https://example.com/prediction/index.html"]})
+    assert response.status_code == 200
+    assert len(response.json()["probabilities"]) == 1
+
+    missing = client.post("/api/v1/ml/predictions/books", json={"ids": [10 ** 9]})
+    assert missing.status_code == 404
@@ -0,0 +1,118 @@
+import pytest
+from sqlmodel import Session, SQLModel
+
+from api.db import ReadReplicas, create_db_engine
+from api.models.catalogue_state import CatalogueState
+
+
+def make_engine(path, name: str, version: int):
+    engine = create_db_engine(f"sqlite:///{path}", name=name)
+    SQLModel.metadata.create_all(engine, tables=[CatalogueState.__table__])
+    set_version(engine, version)
+    return engine
+
+
+def set_version(engine, version: int) -> None:
+    # stands in for the replication of catalogue_state
+    with Session(engine) as session:
+        session.merge(CatalogueState(id=1, version=version))
+        session.commit()
+
+
+def picks(replicas: ReadReplicas, count: int = 4) -> list[str]:
+    return [replicas.engine().pool.logging_name for _ in range(count)]
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary = make_engine(tmp_path / "primary.db", "primary", version=3)
+    first = make_engine(tmp_path / "replica-1.db", "replica-1", version=3)
+    second = make_engine(tmp_path / "replica-2.db", "replica-2", version=3)
+    yield primary, first, second
+    for engine in (primary, first, second):
+        engine.dispose()
+
+
+def read_replicas(primary, replicas) -> ReadReplicas:
+    router = ReadReplicas(primary, replicas, max_lag_seconds=5.0, check_seconds=0.0)
+
+    def primary_version() -> int:
+        with Session(primary) as session:
+            return session.get(CatalogueState, 1).version
+
+    router.version_source = primary_version
+    return router
+
+
+def test_round_robin_across_fresh_replicas(databases):
+    primary, first, second = databases
+    assert picks(read_replicas(primary, [first, second])) == ["replica-1", "replica-2", "replica-1", "replica-2"]
+
+
+def test_without_replicas_reads_go_to_the_primary(databases):
+    primary, _, _ = databases
+    assert picks(read_replicas(primary, [])) == ["primary"] * 4
+
+
+def test_replica_behind_the_catalogue_version_is_skipped(databases):
+    primary, first, second = databases
+    router = read_replicas(primary, [first, second])
+    set_version(primary, 4)
+    set_version(first, 4)
+    assert picks(router) == ["replica-1"] * 4
+
+    set_version(primary, 5)
+    assert picks(router) == ["primary"] * 4
+
+
+def test_unreachable_replica_is_skipped(databases, tmp_path):
+    primary, first, _ = databases
+    unreachable = create_db_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}", name="replica-2")
+    assert picks(read_replicas(primary, [first, unreachable])) == ["replica-1"] * 4
+    assert picks(read_replicas(primary, [unreachable])) == ["primary"] * 4
+
+
+def test_replica_that_catches_up_gets_reads_again(databases):
+    primary, first, second = databases
+    router = read_replicas(primary, [first, second])
+    set_version(primary, 4)
+    assert picks(router) == ["primary"] * 4
+
+    set_version(second, 4)
+    assert picks(router) == ["replica-2"] * 4
+    set_version(first, 4)
+    assert sorted(picks(router)) == ["replica-1", "replica-1", "replica-2", "replica-2"]
+
+
+def checked_once(router: ReadReplicas) -> ReadReplicas:
+    # later calls keep the results of this check
+    router.engine()
+    router.check_seconds = 3600.0
+    return router
+
+
+def test_replica_lagging_in_time_is_skipped(databases):
+    primary, first, second = databases
+    router = checked_once(read_replicas(primary, [first, second]))
+
+    # what the Postgres replay-lag query reports
+    router.replicas[0].lag_seconds = 5.0
+    router.replicas[1].lag_seconds = 5.1
+    assert picks(router) == ["replica-1"] * 4
+
+    router.replicas[0].lag_seconds = 30.0
+    assert picks(router) == ["primary"] * 4
+
+
+def test_replicas_are_only_checked_every_check_seconds(databases):
+    primary, first, second = databases
+    router = checked_once(read_replicas(primary, [first, second]))
+
+    set_version(primary, 4)
+    set_version(first, 4)
+    set_version(second, 4)
+    # the replicas caught up, but until the next check their last versions stand
+    assert picks(router) == ["primary"] * 4
+
+    router.check_seconds = 0.0
+    assert sorted(picks(router)) == ["replica-1", "replica-1", "replica-2", "replica-2"]
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sqlmodel import Session, func, select
+
+from api.db import engine, init_db
+from api.models.book import Book
+from api.services.book_service import BookService
+from api.services.model_registry import model_registry
+from api.services import scoring_service
+from api.services.scoring_service import score_catalogue
+
+
+def book_row(n: int, category: str = "Scoring", price: float = 10.0) -> dict:
+    return {
+        "title": f"Scored book {n}",
+        "price": price + n,
+        "rating": n % 5 + 1,
+        "availability": f"In stock ({n} available)",
+        "category": category,
+        "image_url": f"https://example.com/{n}.jpg",
+        "detail_page": f"https://example.com/scoring/{category}/{n}/index.html",
+    }
+
+
+def upsert(rows: list[dict]) -> None:
+    with Session(engine) as session:
+        BookService(session).upsert_books(rows)
+
+
+def train(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(loc=[30, 3, 10, 5], scale=[10, 1, 5, 3], size=(60, 4))
+    model_registry.save(LogisticRegression().fit(X, (X[:, 1] >= 3).astype(int)))
+
+
+def book_count() -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(Book)).one()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def scored_catalogue():
+    init_db()
+    upsert([book_row(n) for n in range(12)])
+    train(1)
+    score_catalogue()
+
+
+def test_up_to_date_books_are_not_scored_again():
+    assert score_catalogue() == 0
+
+
+def test_only_changed_books_are_scored():
+    upsert([book_row(n, price=50.0) for n in range(3)])
+
+    assert score_catalogue() == 3
+
+    with Session(engine) as session:
+        books = session.exec(select(Book).where(Book.category == "Scoring")).all()
+    assert all(book.prediction in (0, 1) for book in books)
+    assert len({book.scored_at for book in books}) == 2
+
+
+def test_stale_books_are_scored_in_chunks(monkeypatch):
+    estimator = model_registry.current().estimator
+    predict_proba = estimator.predict_proba
+    sizes = []
+
+    def counted(X):
+        sizes.append(len(X))
+        return predict_proba(X)
+
+    matrix_from_columns = scoring_service.matrix_from_columns
+    loaded = []
+
+    def loaded_rows(ids, *columns, **kwargs):
+        loaded.append(len(ids))
+        return matrix_from_columns(ids, *columns, **kwargs)
+
+    monkeypatch.setattr(estimator, "predict_proba", counted)
+    monkeypatch.setattr(scoring_service, "matrix_from_columns", loaded_rows)
+    upsert([book_row(n, price=70.0) for n in range(5)])
+
+    assert score_catalogue(chunk_size=2) == 5
+    # read from the database a chunk at a time too, not all at once
+    assert loaded == sizes == [2, 2, 1]
+
+
+def test_new_model_version_scores_every_book():
+    train(2)
+    version = model_registry.current().version
+
+    assert score_catalogue() == book_count()
+    with Session(engine) as session:
+        assert set(session.exec(select(Book.model_version).distinct()).all()) == {version}
+
+
+def test_new_category_scores_every_book():
+    upsert([book_row(0, category="Scoring new")])
+
+    assert score_catalogue() == book_count()
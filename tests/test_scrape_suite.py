@@ -0,0 +1,20 @@
+import pytest
+
+from benchmarks.fixture_site import Catalogue, FixtureSite
+from benchmarks.scrape_suite import CASES, measure
+
+
+@pytest.fixture(scope="module")
+def site():
+    with FixtureSite(Catalogue(books=40, categories=4)) as site:
+        yield site
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_case_runs(site, name):
+    # one spawned round per case: a smoke test of the benchmark, not a timing
+    result = measure(name, site, {"rounds": 1, "fetch_books": 10, "verbose": False})
+    assert result["rounds"] == 1
+    assert result["items"] > 0
+    assert result["pages"] > 0
+    assert result["median_seconds"] > 0
@@ -0,0 +1,65 @@
+import pytest
+from sqlmodel import Session, select
+
+from api.db import engine, init_db
+from api.models.book import Book
+from api.services.book_service import BookService
+
+TITLES = {
+    "Le Café Zéphyrine": "Quixotic Tales",
+    "Zéphyrine Returns": "Cuisine Française",
+    "Unrelated Volume": "Quixotic Tales",
+}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def catalogue():
+    init_db()
+    with Session(engine) as session:
+        BookService(session).upsert_books([
+            {"title": title, "price": 10.0, "rating": 3, "availability": "In stock (1 available)",
+             "category": category, "image_url": f"https://example.com/search/{n}.jpg",
+             "detail_page": f"https://example.com/search/{n}/index.html"}
+            for n, (title, category) in enumerate(TITLES.items())
+        ])
+
+
+def search(title: str | None = None, category: str | None = None) -> list[str]:
+    with Session(engine) as session:
+        return [book.title for book in BookService(session).search_books(title=title, category=category, limit=50)]
+
+
+@pytest.mark.parametrize("query", ["zéphyrine", "zephyrine", "ZEPH", "zep"])
+def test_title_terms_match_as_accent_insensitive_prefixes(query):
+    assert sorted(search(title=query)) == ["Le Café Zéphyrine", "Zéphyrine Returns"]
+
+
+def test_every_term_must_match():
+    assert search(title="cafe zeph") == ["Le Café Zéphyrine"]
+    assert search(title="zeph nowhere") == []
+
+
+def test_category_terms_search_the_category_only():
+    assert sorted(search(category="quixo")) == ["Le Café Zéphyrine", "Unrelated Volume"]
+    assert search(category="francaise") == ["Zéphyrine Returns"]
+    assert search(title="quixotic") == []
+
+
+def test_title_and_category_combine():
+    assert search(title="zeph", category="quix") == ["Le Café Zéphyrine"]
+
+
+def test_query_syntax_is_not_interpreted():
+    assert search(title='zeph" OR "unrelated') == []
+    assert search(title="*") == search()
+
+
+def test_renamed_books_are_reindexed():
+    with Session(engine) as session:
+        book = session.exec(select(Book).where(Book.title == "Unrelated Volume")).one()
+        book.title = "Renamed Zéphyrine"
+        session.add(book)
+        session.commit()
+
+    assert "Renamed Zéphyrine" in search(title="zephyrine")
+    assert search(title="unrelated") == []
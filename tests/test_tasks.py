@@ -0,0 +1,177 @@
+import asyncio
+import json
+
+import pytest
+from sqlmodel import Session, select
+
+from api import tasks
+from api.config import settings
+from api.db import engine, init_db
+from api.models.scrape_run import ScrapeRun
+from api.services.scrape_run_service import run_view
+from api.services.catalogue_service import catalogue_version
+from api.services.stats_service import compute_aggregates, latest_snapshot, publish_snapshot
+from benchmarks.fixture_site import Catalogue, FixtureSite
+
+
+@pytest.fixture
+def site(monkeypatch):
+    init_db()
+    with FixtureSite(Catalogue(books=60, categories=3)) as site:
+        monkeypatch.setattr(settings, "SCRAPE_BASE_URL", site.base_url)
+        monkeypatch.setattr(settings, "SCRAPE_PARSE_WORKERS", 0)
+        monkeypatch.setattr(settings, "SCRAPE_INGEST_CHUNK_SIZE", 5)
+        monkeypatch.setattr(settings, "SCRAPE_WRITE_QUEUE_SIZE", 1)
+        yield site
+
+
+def scrape(incremental: bool = False):
+    # a hang fails the test instead of blocking the suite
+    asyncio.run(asyncio.wait_for(tasks.perform_scrape(incremental=incremental), timeout=30))
+
+
+def last_run() -> ScrapeRun:
+    with Session(engine) as session:
+        return session.exec(select(ScrapeRun).order_by(ScrapeRun.id.desc())).first()
+
+
+def test_failed_write_fails_the_run(site, monkeypatch):
+    def locked(rows, changes):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(tasks, "write_books", locked)
+    with pytest.raises(RuntimeError, match="database is locked"):
+        scrape()
+
+    run = last_run()
+    assert run.status == "failed"
+    assert "database is locked" in run.error
+
+
+def fail_after(chunks: int):
+    """A write_books whose first ``chunks`` calls succeed."""
+    write_books = tasks.write_books
+    calls = []
+
+    def flaky(rows, changes):
+        calls.append(rows)
+        if len(calls) > chunks:
+            raise RuntimeError("database is locked")
+        return write_books(rows, changes)
+
+    return flaky
+
+
+def test_failed_run_publishes_the_committed_chunks(site, monkeypatch):
+    with Session(engine) as session:
+        publish_snapshot(session)
+
+    monkeypatch.setattr(tasks, "write_books", fail_after(2))
+    with pytest.raises(RuntimeError):
+        scrape()
+
+    assert_snapshot_matches_the_books()
+
+
+def assert_snapshot_matches_the_books():
+    with Session(engine) as session:
+        published = json.loads(latest_snapshot(session).aggregates)
+        rebuilt = compute_aggregates(session)
+    assert published["total_books"] == rebuilt["total_books"]
+    assert {rating: count for rating, count in published["ratings"].items() if count} == rebuilt["ratings"]
+    assert published["price_sum"] == pytest.approx(rebuilt["price_sum"])
+    assert {name: count for name, (count, _) in published["categories"].items() if count} == \
+        {name: count for name, (count, _) in rebuilt["categories"].items()}
+
+
+def test_failed_run_bumps_the_catalogue_version(site, monkeypatch):
+    before = catalogue_version.get()
+
+    monkeypatch.setattr(tasks, "write_books", fail_after(1))
+    with pytest.raises(RuntimeError):
+        scrape()
+
+    assert catalogue_version.get() > before
+
+
+def test_failed_snapshot_still_bumps_the_catalogue_version(site, monkeypatch):
+    def broken_snapshot(session, changes=None):
+        raise RuntimeError("snapshot failed")
+
+    before = catalogue_version.get()
+    monkeypatch.setattr(tasks, "publish_snapshot", broken_snapshot)
+    with pytest.raises(RuntimeError, match="snapshot failed"):
+        scrape()
+
+    assert catalogue_version.get() > before
+    assert last_run().status == "failed"
+
+
+def test_incremental_deltas_match_a_full_recompute(site):
+    with Session(engine) as session:
+        publish_snapshot(session)
+    scrape(incremental=True)
+
+    for book in site.catalogue.books[:10]:
+        book["price"] = "£99.99"
+        book["rating"] = "Five"
+    scrape(incremental=True)
+
+    assert last_run().updated == 10
+    assert_snapshot_matches_the_books()
+
+
+def test_full_scrape_rebuilds_a_drifted_snapshot(site):
+    with Session(engine) as session:
+        publish_snapshot(session, [(None, {"price": 1.0, "rating": 1, "category": "Ghost"})])
+
+    scrape()
+
+    assert_snapshot_matches_the_books()
+
+
+def test_overlapping_scrapes_run_one_at_a_time(site, monkeypatch):
+    with Session(engine) as session:
+        publish_snapshot(session)
+    ingest_books = tasks.ingest_books
+    running, overlaps = [], []
+
+    async def tracked(*args):
+        running.append(None)
+        overlaps.append(len(running))
+        try:
+            await ingest_books(*args)
+        finally:
+            running.pop()
+
+    async def hourly_and_nightly():
+        await asyncio.gather(tasks.perform_scrape(incremental=True), tasks.perform_scrape(incremental=True))
+
+    monkeypatch.setattr(tasks, "ingest_books", tracked)
+    asyncio.run(asyncio.wait_for(hourly_and_nightly(), timeout=60))
+
+    assert overlaps == [1, 1]
+    assert_snapshot_matches_the_books()
+
+
+def test_run_telemetry_is_recorded(site):
+    missing = site.catalogue.books[0]
+    del site.catalogue.by_slug[missing["slug"]]
+
+    scrape()
+
+    run = run_view(last_run())
+    assert run["status"] == "succeeded" and run["error"] is None
+    assert run["finished_at"] is not None and run["duration_seconds"] > 0
+    assert (run["categories"], run["books_crawled"], run["inserted"]) == (3, 59, 59)
+    # the home page, one listing page per category and every product page
+    assert run["requests"] == 1 + 3 + 60
+    assert run["status_counts"] == {"200": 63, "404": 1}
+    assert run["failures"] == 1
+    assert run["failed_pages"] == [{"stage": "fetch", "url": f"{site.base_url}catalogue/{missing['slug']}/index.html",
+                                    "reason": "HTTP 404"}]
+    stages = run["stages"]
+    assert set(stages) == {"category", "listing", "fetch", "parse", "write"}
+    assert stages["fetch"]["calls"] == 60 and stages["parse"]["calls"] == 59
+    assert stages["write"]["calls"] == 12  # chunks of 5
+    assert all(stage["busy_seconds"] >= 0 and stage["wall_seconds"] >= 0 for stage in stages.values())
@@ -0,0 +1,102 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session
+
+from api.config import settings
+from api.db import engine, init_db
+from api.models.training_job import TrainingJob
+from api.services import training_service
+from api.services.training_service import TrainingJobManager
+
+
+class FakeExecutor:
+    """Stands in for the process pool: records submissions, never runs them."""
+
+    def __init__(self, *args, broken: bool = False, **kwargs):
+        self.broken = broken
+        self.futures = []
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool("A child process terminated abruptly")
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    init_db()
+    monkeypatch.setattr(training_service, "ProcessPoolExecutor", FakeExecutor)
+    return TrainingJobManager(workers=1)
+
+
+def test_identical_requests_share_the_active_job(manager):
+    job, created = manager.submit(test_size=0.2, seed=101)
+    again, created_again = manager.submit(test_size=0.2, seed=101)
+    other, created_other = manager.submit(test_size=0.3, seed=101)
+
+    assert created and not created_again and created_other
+    assert again.id == job.id
+    assert other.id != job.id
+    assert len(manager._executor.futures) == 2
+
+
+def test_stale_job_is_failed_and_replaced(manager):
+    job, _ = manager.submit(test_size=0.2, seed=102)
+    with Session(engine) as session:
+        row = session.get(TrainingJob, job.id)
+        row.updated_at = datetime.now(timezone.utc) - timedelta(seconds=settings.TRAINING_JOB_TIMEOUT_SECONDS + 1)
+        session.add(row)
+        session.commit()
+
+    replacement, created = manager.submit(test_size=0.2, seed=102)
+
+    assert created and replacement.id != job.id
+    stale = manager.get(job.id)
+    assert stale.status == "failed"
+    assert stale.active_key is None
+
+
+def test_broken_pool_is_replaced_on_submit(manager):
+    broken = FakeExecutor(broken=True)
+    manager._executor = broken
+
+    job, created = manager.submit(test_size=0.2, seed=103)
+
+    assert created and job.status == "queued"
+    assert broken.shut_down
+    assert manager._executor is not broken
+    assert len(manager._executor.futures) == 1
+
+
+def test_failed_submit_fails_the_job_and_frees_its_key(manager, monkeypatch):
+    monkeypatch.setattr(training_service, "ProcessPoolExecutor", lambda *a, **k: FakeExecutor(broken=True))
+
+    job, created = manager.submit(test_size=0.2, seed=104)
+
+    assert created
+    assert job.status == "failed"
+    assert job.active_key is None
+    retry, created_retry = manager.submit(test_size=0.2, seed=104)
+    assert created_retry and retry.id != job.id
+
+
+def test_crashed_worker_fails_the_job_and_discards_the_pool(manager):
+    job, _ = manager.submit(test_size=0.2, seed=105)
+    pool = manager._executor
+
+    pool.futures[0].set_exception(BrokenProcessPool("A child process terminated abruptly"))
+
+    crashed = manager.get(job.id)
+    assert crashed.status == "failed"
+    assert crashed.active_key is None
+    assert pool.shut_down
+    assert manager._executor is None